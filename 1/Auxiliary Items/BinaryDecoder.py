@@ -1,30 +1,65 @@
 import sys
 import argparse
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from pathlib import Path
 
+# The dot/dash codec lives next to converter.py, which produced these strings
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "2" / "artifacts_lab2" / "HideFiles"))
+from dotdash import decode_text
 
-def get_binary(data: str, group_size: int = 8) -> str:
-    res = []
-    for i, c in enumerate(data):
-        if i % group_size == 0 and i != 0:
-            res.append(" ")
-        res.append("0" if c == "." else "1")
-    return "".join(res)
+# Relative frequency of space and letters in English text, used to score decoded candidates
+ENGLISH_FREQ = {
+    " ": 0.1918, "e": 0.1041, "t": 0.0729, "a": 0.0651, "o": 0.0596, "n": 0.0564, "i": 0.0558,
+    "s": 0.0515, "r": 0.0497, "h": 0.0492, "d": 0.0350, "l": 0.0331, "u": 0.0225, "c": 0.0217,
+    "m": 0.0202, "f": 0.0198, "w": 0.0171, "g": 0.0158, "y": 0.0146, "p": 0.0138, "b": 0.0128,
+    "v": 0.0080, "k": 0.0055, "x": 0.0014, "j": 0.0010, "q": 0.0009, "z": 0.0007,
+}
+MAX_GROUP_SIZE = 16
+CHAR_FREQ = np.zeros(2**MAX_GROUP_SIZE, dtype=np.float32)
+for ch, freq in ENGLISH_FREQ.items():
+    CHAR_FREQ[ord(ch)] = CHAR_FREQ[ord(ch.upper())] = freq
+EXPECTED_FREQ = sum(f * f for f in ENGLISH_FREQ.values())  # mean CHAR_FREQ of English text
+PRINTABLE = np.zeros(2**MAX_GROUP_SIZE, dtype=bool)
+PRINTABLE[32:127] = PRINTABLE[[9, 10, 13]] = True
 
 
-def binary_to_text(binary_string: str, group_size: int = 8, pad: bool = True) -> str:
-    text = []
-    for b in binary_string.split():
-        if len(b) < group_size:
-            if pad:
-                b = b.ljust(group_size, "0")
-            else:
-                continue
-        text.append(chr(int(b, 2)))
-    return "".join(text)
+def to_bits(data: str) -> np.ndarray:
+    return np.frombuffer(data.encode("ascii"), dtype=np.uint8) == ord("-")
 
 
-def main(image, debug=False):
-    if image == "barragemFagilde":
+def sweep_framings(bits: np.ndarray, group_sizes=range(1, MAX_GROUP_SIZE + 1)) -> list:
+    """Score every (group size, offset) framing of the bit stream, best first.
+
+    Each group size gets one windowed dot product giving the value of the group starting
+    at every bit; offset o then just takes every group_size-th value from o on.
+    """
+    candidates = []
+    for group_size in group_sizes:
+        if len(bits) < group_size:
+            continue
+        weights = 1 << np.arange(group_size - 1, -1, -1)
+        values = sliding_window_view(bits, group_size) @ weights
+        for offset in range(group_size):
+            chars = values[offset::group_size]
+            printable = float(PRINTABLE[chars].mean())
+            language = float(CHAR_FREQ[chars].mean()) / EXPECTED_FREQ
+            candidates.append((printable + language, group_size, offset, printable, language, chars))
+    candidates.sort(key=lambda c: c[0], reverse=True)
+    return candidates
+
+
+def print_sweep(data: str, top: int = 10):
+    print(f"{'size':>4} {'offset':>6} {'printable':>9} {'language':>8}  text")
+    for score, group_size, offset, printable, language, chars in sweep_framings(to_bits(data))[:top]:
+        preview = "".join(chr(c) if PRINTABLE[c] and c >= 32 else "." for c in chars[:60])
+        print(f"{group_size:>4} {offset:>6} {printable:>9.1%} {language:>8.2f}  {preview}")
+
+
+def main(image, debug=False, sweep=False, top=10, input_path=None, offset=0):
+    if input_path is not None:
+        data = (sys.stdin.read() if input_path == "-" else Path(input_path).read_text(encoding="ascii")).strip()
+    elif image == "barragemFagilde":
         data = "..--...-..--.-.-..--.-.-.--..-....--...-..--.-.-..--.-......-.-...----....-.......-.......-.......-...--..-......--....-.--..-...---.--..--....-.--.---..--...--.--..-.-.--..-....-......---..-..---.-.-.--.--...--..-.-..-.......--...-....-.-...----....-.......-.......-......---.-...--..-.-.---..--.---.-...--..-.-.---..-..-.-----.---.....--.--...--....-.---.-...--..-.-.---..--..-.......----.-..-......--.--...--.----.--....-.--..-...-.-----.---.-...--..-.-.---..--.---.-...--..-.-.---..-..-.-----.---.....--.--...--....-.---.-...--..-.-.---..--.-.-----.--..--..---..-..--.----.--.--.-.-.-----.--..-...--...-...-.-.....-.-..-....-.-...----....-.......-.......-......--.-..-.--..--...-......--...--.---.-.-.---..-..---..-..--..-.-.--.---..---.-...-.-----.---.-...---..-..--....-.--.---..---..--.--....-.--...--.---.-...--.-..-.--.----.--.---...-.---..---.....--.--...--....-.---.-...--..-.-..-......--.-..-.--.---...-......---.-...--..-.-.---..--.---.-...--..-.-.---..-..-.-----.---.....--.--...--....-.---.-...--..-.-.---..--..---.-.....-.-...----....-.......-.......-.......-.......-.......-.......-......--...--.---.-.-.---..-..---..-..--..-.-.--.---..---.-...-.-----.---.-...---..-..--....-.--.---..---..--.--....-.--...--.---.-...--.-..-.--.----.--.---...-.---..---.....---..-..--.-..-.--...--.--..-.-..-.......----.-..-.......--......-.---...--......-.......-.......-.......-...--..-......--...--.--.----.--.--.-.---.....---.-.-.---.-...--..-.-.-.-----.--..-...----..-.--.---..--....-.--.--.-.--.-..-.--...--.-.-----.---.....---..-..--.-..-.--...--.--..-.-..-.-....--...--.---.-.-.---..-..---..-..--..-.-.--.---..---.-...-.-----.---.-...---..-..--....-.--.---..---..--.--....-.--...--.---.-...--.-..-.--.----.--.---...-.-..-....-.-...----....-.......-.......-.........-.-...----....-.......-.......-.......-...--..-......--....-.--..-...---.--..--....-.--.---..--...--.--..-.-.--..-....-......---..-..---.-.-.--.--...--..-.-..-.......--..-.....-.-...----....-.......-.......-......--.-..-.--..--...-.......-.-....--...--.---.-.-.---..-..---..-..--..-.-.--.---..---.-...-.-----.---.-...---..-..--....-.--.---..---..--.--....-.--...--.---.-...--.-..-.--.----.--.---...-.---..---.....--.--...--."
         offset = 0
     elif image == "barragemOdelouca":
@@ -34,26 +69,31 @@ def main(image, debug=False):
         print("Image not found")
         sys.exit(1)
 
+    if sweep:
+        print_sweep(data, top)
+        return
+
     if debug:
         print("Data before offset:\n", data, "\n")
-    data = data[offset:]
     if debug:
-        print(f"Data after offset (= {offset}):\n", data, "\n")
+        print(f"Data after offset (= {offset}):\n", data[offset:], "\n")
+        print("\nBinary (size 8):\n", data[offset:].translate(str.maketrans(".-", "01")), "\n")
 
-    # group_sizes = list(range(1, 17))
-    group_sizes = [8]
-    for group_size in group_sizes:
-        binary = get_binary(data, group_size)
-        if debug:
-            print(f"\nBinary (size {group_size}):\n", binary, "\n")
-        text = binary_to_text(binary, group_size)
-        print(f"\nText (size {group_size}):\n", text)
+    # Other group sizes and offsets: see --sweep
+    text = decode_text(data, offset).decode("latin-1")
+    print("\nText (size 8):\n", text)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Decode encoded image data.")
-    parser.add_argument("image", help="Image name (e.g., barragemOdelouca)")
+    parser.add_argument("image", nargs="?", help="Image name (e.g., barragemOdelouca)")
+    parser.add_argument("-i", "--input", help="Read the dot/dash data from a file ('-' for stdin) instead of a known image")
+    parser.add_argument("--offset", type=int, default=0, help="Symbols to skip with --input")
     parser.add_argument("--debug", action="store_true", help="Enable debug output")
+    parser.add_argument("--sweep", action="store_true", help="Rank every offset and group size (1-16) instead of the fixed framing")
+    parser.add_argument("--top", type=int, default=10, help="Number of framings to show with --sweep")
 
     args = parser.parse_args()
-    main(args.image, args.debug)
+    if args.image is None and args.input is None:
+        parser.error("give an image name or --input")
+    main(args.image, args.debug, args.sweep, args.top, args.input, args.offset)
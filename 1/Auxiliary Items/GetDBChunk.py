@@ -1,4 +1,5 @@
-import struct, os
+import struct, os, mmap, argparse
+from typing import NamedTuple
 
 WAV = "/Users/vasco/Library/CloudStorage/OneDrive-UniversidadedeLisboa/Universidade/4ºAno/1ºSemestre/CiberSegurancaForense/Projeto/Lab1/zyra.csf.syssec.dpss.inesc-id.pt/resources/MingleGame.wav"         # change if needed
 OUT_CHUNK = "../Outputs/MingleGame_SQLi_chunk.bin"
@@ -6,61 +7,139 @@ OUT_DB    = "../Outputs/MingleGame_hidden.db"
 
 CANONICAL_HDR = b"SQLite format 3\x00"  # 16 bytes
 
-def extract_sql_chunk(wav_path):
-    data = open(wav_path, "rb").read()
-    if data[:4] != b"RIFF":
+class Chunk(NamedTuple):
+    fourcc: bytes
+    offset: int      # of the 8-byte chunk header
+    size: int        # declared payload size (ds64 value for RF64 placeholders)
+    start: int       # payload range actually present in the file
+    end: int
+    anomalies: tuple
+
+
+def read_ds64(mm, offset):
+    """Parse an RF64/BW64 ds64 chunk: 64-bit RIFF and data sizes plus the per-fourcc size table."""
+    riff_size, data_size, _sample_count, table_len = struct.unpack_from("<QQQI", mm, offset + 8)
+    sizes = {b"data": data_size}
+    for i in range(table_len):
+        fourcc, size = struct.unpack_from("<4sQ", mm, offset + 36 + 12 * i)
+        sizes[fourcc] = size
+    return riff_size, sizes
+
+
+def index_riff(mm):
+    """Walk every chunk header of a RIFF/RF64 file without copying chunk data.
+
+    Keeps going past the declared RIFF size (data appended after it is a classic hiding place)
+    and records anything unusual about each chunk in its anomalies.
+    """
+    form = mm[:4]
+    if form not in (b"RIFF", b"RF64", b"BW64"):
         raise SystemExit("Not a RIFF file")
-    # skip RIFF header (12 bytes)
-    offset = 12
-    while offset + 8 <= len(data):
-        fourcc = data[offset:offset+4]
-        size = struct.unpack("<I", data[offset+4:offset+8])[0]
+    riff_size = struct.unpack_from("<I", mm, 4)[0]
+    ds64_sizes = {}
+    if form != b"RIFF" and mm[12:16] == b"ds64":
+        riff_size, ds64_sizes = read_ds64(mm, 12)
+    riff_end = 8 + riff_size
+
+    chunks = []
+    offset = 12  # skip RIFF header
+    while offset + 8 <= len(mm):
+        fourcc, size = struct.unpack_from("<4sI", mm, offset)
+        anomalies = []
+        if size == 0xFFFFFFFF and fourcc in ds64_sizes:
+            size = ds64_sizes[fourcc]
+        if offset >= riff_end:
+            anomalies.append("after RIFF end")
+        if not all(32 <= c < 127 for c in fourcc):
+            anomalies.append("non-ASCII fourcc")
         start = offset + 8
         end = start + size
-        if fourcc == b"SQLi":
-            return data[start:end]
+        if end > len(mm):
+            anomalies.append(f"size exceeds file by {end - len(mm)}")
+            end = len(mm)
+        elif size & 1:
+            if end == len(mm):
+                anomalies.append("missing pad byte")
+            elif mm[end] != 0:
+                anomalies.append("non-zero pad byte")
+        chunks.append(Chunk(fourcc, offset, size, start, end, tuple(anomalies)))
         # move to next chunk (chunks are word-aligned)
-        offset = end + (size & 1)  # pad if size odd
+        offset = start + size + (size & 1)  # pad if size odd
+    if offset < len(mm):
+        chunks.append(Chunk(b"", offset, len(mm) - offset, offset, len(mm), ("trailing bytes",)))
+    return chunks
+
+
+def chunk_view(mm, chunk):
+    return memoryview(mm)[chunk.start:chunk.end]
+
+
+def print_chunks(chunks):
+    print(f"{'fourcc':<8} {'offset':>12} {'size':>12}  anomalies")
+    for c in chunks:
+        print(f"{c.fourcc.decode('latin-1')!r:<8} {c.offset:>12} {c.size:>12}  {', '.join(c.anomalies)}")
+
+
+def extract_sql_chunk(wav_path):
+    with open(wav_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for chunk in index_riff(mm):
+            if chunk.fourcc == b"SQLi":
+                return mm[chunk.start:chunk.end]
     return None
 
 def repair_and_write(chunk_bytes, out_db_path):
     # Try to find the substring "format 3\x00" inside the chunk.
     needle = b"format 3\x00"
-    pos = chunk_bytes.find(needle)
+    head = bytes(chunk_bytes[:64])  # the header sits at the start; don't copy the whole chunk
+    pos = head.find(needle)
     if pos != -1:
         # the chunk already contains "format 3\0" starting at pos, so
         # header prefix should be CANONICAL_HDR[:pos]
         prefix_needed = CANONICAL_HDR[:pos]
         print(f"Found 'format 3\\x00' at offset {pos} inside chunk; will prepend {len(prefix_needed)} byte(s).")
-        repaired = prefix_needed + chunk_bytes
     else:
         # fallback: if chunk already begins with 'ormat 3' (shifted)
-        if chunk_bytes.startswith(b"ormat 3"):
+        if head.startswith(b"ormat 3"):
             # e.g., our case. 'SQLite f' length is len("SQLite f") == 8
             prefix_needed = CANONICAL_HDR[:8]  # "SQLite f"
             print("Chunk starts with 'ormat 3' — will prepend first 8 bytes of canonical header ('SQLite f').")
-            repaired = prefix_needed + chunk_bytes
         else:
             # If detection fails, prepend the entire canonical header (may duplicate if present)
             print("No obvious 'format 3' found. Prepending full canonical header (may produce invalid DB if wrong).")
-            repaired = CANONICAL_HDR + chunk_bytes
+            prefix_needed = CANONICAL_HDR
 
     with open(out_db_path, "wb") as f:
-        f.write(repaired)
+        f.write(prefix_needed)
+        f.write(chunk_bytes)
     print(f"Wrote repaired DB to: {out_db_path}")
     return out_db_path
 
 def main():
-    if not os.path.exists(WAV):
-        raise SystemExit(f"{WAV} not found.")
-    chunk = extract_sql_chunk(WAV)
-    if not chunk:
-        raise SystemExit("No SQLi chunk found in WAV.")
-    print("Extracted SQLi chunk length:", len(chunk))
-    with open(OUT_CHUNK, "wb") as f:
-        f.write(chunk)
-    print("Saved raw chunk to", OUT_CHUNK)
-    repair_and_write(chunk, OUT_DB)
+    parser = argparse.ArgumentParser(description="Index RIFF/RF64 chunks and recover the hidden SQLite DB.")
+    parser.add_argument("wav", nargs="?", default=WAV, help="WAV file to inspect")
+    parser.add_argument("-l", "--list", action="store_true", help="Only print the chunk table")
+    parser.add_argument("-e", "--export", metavar="FOURCC", help="Write the payload of the first chunk with this fourcc to --output")
+    parser.add_argument("-o", "--output", default=OUT_CHUNK, help="Where --export writes")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.wav):
+        raise SystemExit(f"{args.wav} not found.")
+    with open(args.wav, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        chunks = index_riff(mm)
+        print_chunks(chunks)
+        if args.list:
+            return
+        fourcc = (args.export or "SQLi").encode("latin-1").ljust(4)
+        chunk = next((c for c in chunks if c.fourcc == fourcc), None)
+        if chunk is None:
+            raise SystemExit(f"No {fourcc.decode('latin-1')} chunk found in WAV.")
+        with chunk_view(mm, chunk) as data:
+            print(f"Extracted {fourcc.decode('latin-1')} chunk length:", len(data))
+            with open(args.output, "wb") as f:
+                f.write(data)
+            print("Saved raw chunk to", args.output)
+            if not args.export:
+                repair_and_write(data, OUT_DB)
 
 if __name__ == "__main__":
     main()
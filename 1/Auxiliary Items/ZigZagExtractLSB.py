@@ -3,49 +3,64 @@ import numpy as np
 from pathlib import Path
 import sys
 
-
-def diagonal_topfirst_bottomstart_indices(rows, cols):
-    """
-    Diagonals ordered from top-left (top row left→right, then right column top→bottom),
-    but within each diagonal start at its bottom-left and move up-right.
-    """
-    idx = []
-    total_diagonals = rows + cols - 1
-    for s in range(total_diagonals):
-        r = min(s, rows - 1)  # bottom-most row on this diagonal
-        c = s - r  # corresponding col
-        while r >= 0 and c < cols:
-            idx.append((r, c))
-            r -= 1
-            c += 1
-    return np.array(idx, dtype=np.int64)
-
-
-def extract_lsb4_stream(img_array, channel_order="RGB", nibble_pair="highfirst"):
-    """Return bytes packed from 4 LSBs of each channel in zig-zag pixel order."""
-    h, w, *_ = img_array.shape  # Fixed: was img*array.shape
+# Shared traversal orders live next to lsb.py
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "2" / "artifacts_lab2" / "HideFiles"))
+from traversal import diagonal_band
+
+
+BAND_PIXELS = 1 << 20  # upper bound on pixels gathered per band of anti-diagonals
+
+
+def open_pixels(img_path):
+    """Memory-map the RGB pixels when the file stores them raw (PPM, uncompressed TIFF/BMP/TGA),
+    otherwise decode the image into RAM."""
+    img = Image.open(img_path)
+    w, h = img.size
+    if img.mode == "RGB" and len(img.tile) == 1:
+        codec, extents, offset, args = img.tile[0]
+        args = (args,) if isinstance(args, str) else tuple(args)
+        rawmode, stride, orientation = args + (0, 1)[len(args) - 1 :]
+        if codec == "raw" and rawmode in ("RGB", "BGR") and tuple(extents) == (0, 0, w, h):
+            rows = np.memmap(img_path, dtype=np.uint8, mode="r", offset=offset, shape=(h, stride or w * 3))
+            arr = rows[:, : w * 3].reshape(h, w, 3)
+            if orientation < 0:
+                arr = arr[::-1]
+            return arr[..., ::-1] if rawmode == "BGR" else arr
+    return np.array(img.convert("RGB"), dtype=np.uint8)
+
+
+def lsb4_blocks(img_array, channel_order="RGB", nibble_pair="highfirst", band_pixels=BAND_PIXELS):
+    """Yield bytes packed from 4 LSBs of each channel in zig-zag pixel order, one band of
+    anti-diagonals at a time, so memory stays bounded by band_pixels whatever the image size."""
+    h, w, *_ = img_array.shape
     order_map = {"R": 0, "G": 1, "B": 2}
     ch_idx = [order_map[c] for c in channel_order]
 
-    # Zig-zag pixel order
-    coords = diagonal_topfirst_bottomstart_indices(h, w)
+    # Every anti-diagonal holds at most min(h, w) pixels
+    step = max(1, band_pixels // min(h, w))
+    carry = np.empty(0, dtype=np.uint8)
+    for first in range(0, h + w - 1, step):
+        # Zig-zag pixel order: diagonals from top-left, each walked from its bottom-left up-right
+        y, x = np.divmod(diagonal_band(h, w, first, min(first + step, h + w - 1)), w)
 
-    # Reorder pixels and channels to a (N_pixels*3,) flat array
-    zz = img_array[coords[:, 0], coords[:, 1]][:, ch_idx].reshape(-1).astype(np.uint8)
+        # Reorder pixels and channels to a flat array and keep only low 4 bits (nibbles)
+        nibs = np.concatenate((carry, (img_array[y, x][:, ch_idx] & 0x0F).reshape(-1)))
 
-    # Keep only low 4 bits (nibbles)
-    nibs = zz & 0x0F
+        # Pack two nibbles -> one byte, carrying an odd nibble over to the next band
+        carry = nibs[len(nibs) - len(nibs) % 2 :]
+        nibs = nibs[: len(nibs) - len(nibs) % 2]
 
-    # Pack two nibbles -> one byte
-    if len(nibs) % 2 == 1:
-        nibs = nibs[:-1]
+        if nibble_pair == "highfirst":
+            by = (nibs[0::2] << 4) | nibs[1::2]
+        else:
+            by = (nibs[1::2] << 4) | nibs[0::2]
 
-    if nibble_pair == "highfirst":
-        by = (nibs[0::2] << 4) | nibs[1::2]
-    else:
-        by = (nibs[1::2] << 4) | nibs[0::2]
+        yield by.tobytes()
 
-    return by.tobytes()
+
+def extract_lsb4_stream(img_array, channel_order="RGB", nibble_pair="highfirst"):
+    """Return bytes packed from 4 LSBs of each channel in zig-zag pixel order."""
+    return b"".join(lsb4_blocks(img_array, channel_order, nibble_pair))
 
 
 def main():
@@ -62,19 +77,20 @@ def main():
         except ValueError:
             crop = None
 
-    img = Image.open(img_path).convert("RGB")
-    arr = np.array(img, dtype=np.uint8)
+    arr = open_pixels(img_path)
 
     if crop is not None:
         arr = arr[:crop, :crop, :]
 
-    data = extract_lsb4_stream(arr, channel_order="RGB", nibble_pair="highfirst")
-
     out_dir = Path("../Outputs")
     out_dir.mkdir(parents=True, exist_ok=True)
-    Path(out_dir / "RaceCar_hidden.bin").write_bytes(data)
+    written = 0
+    with open(out_dir / "RaceCar_hidden.bin", "wb") as out:
+        for block in lsb4_blocks(arr, channel_order="RGB", nibble_pair="highfirst"):
+            out.write(block)
+            written += len(block)
 
-    print(f"Wrote {len(data)} bytes to {out_dir / 'RaceCar_hidden.bin'} (crop={crop})")
+    print(f"Wrote {written} bytes to {out_dir / 'RaceCar_hidden.bin'} (crop={crop})")
 
 
 if __name__ == "__main__":
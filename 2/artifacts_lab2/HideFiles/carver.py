@@ -0,0 +1,172 @@
+import mmap
+import os
+import re
+import struct
+from argparse import ArgumentParser
+from bisect import bisect_left, bisect_right
+from lsb import jpeg_structure
+from wav_hider import copy_range
+
+# One signature per file type: header magic plus either a footer (and how far past it the file
+# ends), a function reading the length from the header itself, or a structure parser from
+# lsb.py walking the file to its end. Footer policy "first" ends the file at the first footer
+# after the header, "last" at the last one before the next header of the same type (PDF
+# incremental updates add more %%EOF markers). A "label" function names the type from the
+# header, or rejects it.
+
+def sqlite_length(head: bytes):
+    page_size, = struct.unpack_from(">H", head, 16)
+    page_count, = struct.unpack_from(">I", head, 28)
+    return (65536 if page_size == 1 else page_size) * page_count or None
+
+def riff_length(head: bytes):
+    return struct.unpack_from("<I", head, 4)[0] + 8
+
+RIFF_FORMS = {b"WAVE": "wav", b"AVI ": "avi", b"WEBP": "webp"}
+
+def riff_form(head: bytes):
+    return RIFF_FORMS.get(head[8:12])
+
+def zip_footer_length(tail: bytes):
+    # end of central directory record: 22 bytes + comment
+    return 22 + struct.unpack_from("<H", tail, 20)[0]
+
+SIGNATURES = {
+    "png": {"headers": [b"\x89PNG\r\n\x1a\n"], "footer": b"IEND\xaeB`\x82", "policy": "first"},
+    # SOI followed by the markers real JPEGs start with (APPn, DQT, DHT, SOF0, COM); walked
+    # segment by segment, as the EXIF thumbnail in APP1 has an FFD9 of its own
+    "jpg": {"headers": [b"\xff\xd8\xff" + bytes([m]) for m in (0xE0, 0xE1, 0xE2, 0xE8, 0xED, 0xEE, 0xDB, 0xC4, 0xC0, 0xFE)], "structure": jpeg_structure},
+    "gif": {"headers": [b"GIF87a", b"GIF89a"], "footer": b"\x00\x3b", "policy": "first"},
+    "pdf": {"headers": [b"%PDF-"], "footer": b"%%EOF", "policy": "last"},
+    "zip": {"headers": [b"PK\x03\x04"], "footer": b"PK\x05\x06", "policy": "first", "footer_length": zip_footer_length},
+    "db": {"headers": [b"SQLite format 3\x00"], "length": sqlite_length},
+    "riff": {"headers": [b"RIFF"], "length": riff_length, "label": riff_form},
+}
+HEAD_BYTES = 64  # enough header to compute lengths from
+READ_BYTES = 1 << 16  # read size when walking a file's structure
+WINDOW = 1 << 28  # bytes mapped at a time, a multiple of mmap.ALLOCATIONGRANULARITY
+MAX_CARVE = 1 << 30  # ignore footers further than this from their header
+
+PATTERNS = {}
+for kind, sig in SIGNATURES.items():
+    for header in sig["headers"]:
+        PATTERNS[header] = (kind, "header")
+    if "footer" in sig:
+        PATTERNS[sig["footer"]] = (kind, "footer")
+# Longest first, so a pattern that prefixes another can't shadow it
+SCANNER = re.compile(b"|".join(re.escape(p) for p in sorted(PATTERNS, key=len, reverse=True)))
+OVERLAP = max(len(p) for p in PATTERNS) - 1
+
+
+def scan(fd, size: int, window: int = WINDOW):
+    """Yield (offset, kind, role) for every header/footer hit, mapping the input one window at a
+    time; windows overlap by OVERLAP bytes so hits across a boundary aren't lost."""
+    for start in range(0, size, window):
+        length = min(window + OVERLAP, size - start)
+        with mmap.mmap(fd, length, offset=start, access=mmap.ACCESS_READ) as mm:
+            for m in SCANNER.finditer(mm):
+                if m.start() < window:  # hits starting in the overlap belong to the next window
+                    yield (start + m.start(), *PATTERNS[m.group()])
+
+
+def structure_end(structure, fd, offset: int, limit: int):
+    """Drive a structure parser from lsb.py over the file at offset, reading as it asks for
+    more; the file's end, or None if it isn't one or runs past limit."""
+    buf = bytearray()
+    parser = structure(buf)
+    try:
+        needed = next(parser)
+        while True:
+            while len(buf) < needed:
+                chunk = os.pread(fd, min(max(needed - len(buf), READ_BYTES), limit - offset - len(buf)), offset + len(buf))
+                if not chunk:
+                    return None
+                buf += chunk
+            needed = parser.send(None)
+    except StopIteration as done:
+        return None if done.value is None else offset + done.value
+    except (IndexError, struct.error):  # a parser reading past what it asked for: not that file
+        return None
+
+
+def carve(fd, size: int, window: int = WINDOW) -> list:
+    """Single pass over the input, then pair headers with footers/lengths per type.
+
+    Returns (offset, length, kind) for every embedded object, ordered by offset.
+    """
+    headers = {kind: [] for kind in SIGNATURES}
+    footers = {kind: [] for kind in SIGNATURES}
+    for offset, kind, role in scan(fd, size, window):
+        (headers if role == "header" else footers)[kind].append(offset)
+
+    objects = []
+    for kind, sig in SIGNATURES.items():
+        ends = footers[kind]
+        covered = -1
+        for i, offset in enumerate(headers[kind]):
+            if offset < covered:  # e.g. the local file headers inside a zip already carved
+                continue
+            limit = min(size, offset + MAX_CARVE)
+            head = os.pread(fd, HEAD_BYTES, offset).ljust(HEAD_BYTES, b"\0")
+            label = sig["label"](head) if "label" in sig else kind
+            if label is None:
+                continue
+            if "length" in sig:
+                length = sig["length"](head)
+                if not length or offset + length > size:
+                    continue
+                end = offset + length
+            elif "structure" in sig:
+                end = structure_end(sig["structure"], fd, offset, limit)
+                if end is None:
+                    continue
+            else:
+                first = bisect_left(ends, offset + len(sig["headers"][0]))
+                if sig["policy"] == "last":
+                    next_header = headers[kind][i + 1] if i + 1 < len(headers[kind]) else size
+                    last = bisect_right(ends, min(next_header, limit) - len(sig["footer"])) - 1
+                    footer = ends[last] if last >= first else None
+                else:
+                    footer = ends[first] if first < len(ends) and ends[first] < limit else None
+                if footer is None:
+                    continue
+                if "footer_length" in sig:
+                    end = footer + sig["footer_length"](os.pread(fd, HEAD_BYTES, footer).ljust(HEAD_BYTES, b"\0"))
+                else:
+                    end = footer + len(sig["footer"])
+                end = min(end, size)
+            objects.append((offset, end - offset, label))
+            covered = end
+    return sorted(objects)
+
+
+def readable_size(value: int) -> str:
+    if value < 1024:
+        return f"{value}B"
+    elif value < 1024**2:
+        return f"{value/1024:.2f}KB"
+    elif value < 1024**3:
+        return f"{value/1024**2:.2f}MB"
+    else:
+        return f"{value/1024**3:.2f}GB"
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Carve embedded files (png, jpg, gif, pdf, zip, sqlite, wav, avi, webp) out of any input in one pass.")
+    parser.add_argument("input", help="File, disk image or memory dump to scan")
+    parser.add_argument("-x", "--extract", help="Directory to write the carved objects to")
+    args = parser.parse_args()
+
+    with open(args.input, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        objects = carve(f.fileno(), size) if size else []
+        print(f"{'offset':>12} {'length':>12}  type")
+        for offset, length, kind in objects:
+            print(f"{offset:>12} {length:>12}  {kind} ({readable_size(length)})")
+        if args.extract:
+            os.makedirs(args.extract, exist_ok=True)
+            for offset, length, kind in objects:
+                path = os.path.join(args.extract, f"{offset:012d}.{kind}")
+                with open(path, "wb") as out:
+                    copy_range(f.fileno(), out.fileno(), offset, length)
+            print(f"Extracted {len(objects)} object(s) to {args.extract}")
@@ -1,23 +1,10 @@
 from argparse import ArgumentParser
+from dotdash import encode_stream
 
-def hide(input_file: str) -> str:
-    try:
-        # Read the file in binary mode
-        with open(input_file, 'rb') as f:
-            content = f.read()
-
-        # Convert bytes to binary string
-        binary = ''.join(format(byte, '08b') for byte in content)
-
-        # Replace 0s with '.' and 1s with '-'
-        converted = binary.replace('0', '.').replace('1', '-')
-
-        return converted
-
-    except FileNotFoundError:
-        return "Error: File not found."
-    except Exception as e:
-        return f"Error: {str(e)}"
+def hide(input_file: str, output_file: str) -> int:
+    # Stream the file through the codec: each byte becomes 8 symbols, '.' for 0 and '-' for 1
+    with open(input_file, 'rb') as src, open(output_file, 'wb') as dst:
+        return encode_stream(src, dst)
 
 if __name__ == "__main__":
     parser = ArgumentParser()
@@ -25,10 +12,10 @@ if __name__ == "__main__":
     parser.add_argument("-o", "--output", type=str, help="Output file path", required=True)
     args = parser.parse_args()
 
-    result = hide(args.input)
     try:
-        with open(args.output, "w", encoding="ascii") as f:
-            f.write(result)
+        hide(args.input, args.output)
         print(f"Successful save in {args.output}")
+    except FileNotFoundError:
+        print("Error: File not found.")
     except Exception as e:
-        print(f"Error saving file: {str(e)}")
\ No newline at end of file
+        print(f"Error saving file: {str(e)}")
@@ -0,0 +1,75 @@
+import io
+import sys
+from argparse import ArgumentParser
+import numpy as np
+
+# Bytes <-> the '.' (0) / '-' (1) text produced by converter.py and decoded by BinaryDecoder.py.
+# Both directions work on fixed-size chunks, so memory stays flat whatever the input size.
+
+CHUNK_SIZE = 1 << 20
+DOT, DASH = ord("."), ord("-")
+
+# Row b holds the 8 symbols for byte b, MSB first
+ENCODE_TABLE = np.where(np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1), DASH, DOT).astype(np.uint8)
+
+
+def encode_stream(src, dst, chunk_size: int = CHUNK_SIZE) -> int:
+    """Write the dot/dash form of every byte read from src to dst; returns symbols written."""
+    written = 0
+    while chunk := src.read(chunk_size):
+        dst.write(ENCODE_TABLE[np.frombuffer(chunk, dtype=np.uint8)].tobytes())
+        written += len(chunk) * 8
+    return written
+
+
+def decode_stream(src, dst, offset: int = 0, pad: bool = True, chunk_size: int = CHUNK_SIZE) -> int:
+    """Pack the dot/dash symbols read from src back into bytes on dst; returns bytes written.
+
+    Anything other than '.' and '-' (newlines, spaces) is skipped, the first offset symbols are
+    dropped, and a trailing partial byte is zero-padded when pad is set.
+    """
+    written = 0
+    pending = np.empty(0, dtype=bool)
+    while chunk := src.read(chunk_size):
+        symbols = np.frombuffer(chunk, dtype=np.uint8)
+        bits = symbols[(symbols == DOT) | (symbols == DASH)] == DASH
+        if offset:
+            skipped = min(offset, len(bits))
+            bits = bits[skipped:]
+            offset -= skipped
+        bits = np.concatenate((pending, bits))
+        whole = len(bits) - len(bits) % 8
+        dst.write(np.packbits(bits[:whole]).tobytes())
+        written += whole // 8
+        pending = bits[whole:]
+    if len(pending) and pad:
+        dst.write(np.packbits(pending).tobytes())
+        written += 1
+    return written
+
+
+def decode_text(data: str, offset: int = 0, pad: bool = True) -> bytes:
+    out = io.BytesIO()
+    decode_stream(io.BytesIO(data.encode("ascii")), out, offset, pad)
+    return out.getvalue()
+
+
+def open_binary(path: str, mode: str):
+    if path == "-":
+        return open((sys.stdin if "r" in mode else sys.stdout).fileno(), mode, closefd=False)
+    return open(path, mode)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Convert files to and from dot/dash binary text.")
+    parser.add_argument("mode", choices=["encode", "decode"])
+    parser.add_argument("-i", "--input", type=str, help="Input file path (Default: stdin)", default="-")
+    parser.add_argument("-o", "--output", type=str, help="Output file path (Default: stdout)", default="-")
+    parser.add_argument("--offset", type=int, help="(decode) Symbols to skip before the first byte", default=0)
+    args = parser.parse_args()
+
+    with open_binary(args.input, "rb") as src, open_binary(args.output, "wb") as dst:
+        if args.mode == "encode":
+            encode_stream(src, dst)
+        else:
+            decode_stream(src, dst, args.offset)
@@ -1,7 +1,11 @@
 from PIL import Image, ImageColor
-from bitstring import BitArray
+import numpy as np
 from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
 import os
+import re
+import struct
+from traversal import traversal_order
 
 
 def readable_size(value: int) -> str:
@@ -17,149 +21,289 @@ def readable_size(value: int) -> str:
 
 def print_progress_bar(current: int, total: int):
     max_size = 80
-    bar_size = round(max_size * current / total)
+    bar_size = round(max_size * current / total) if total else max_size
     print(f'[{"■"*bar_size}{"-"*(max_size-bar_size)}] ({readable_size(current)}/{readable_size(total)}){" "*10}', end="\r", flush=True)
 
 
-def get_new_channel_value(red: int, payload_bits: BitArray, nlsb: int) -> int:
-    new_channel = BitArray(red.to_bytes(1, "big"))
-    new_channel.overwrite(payload_bits, 8 - nlsb)
-    return new_channel.uint
+DIRECTIONS = ["horizontal", "vertical", "diagonalup", "diagonaldown"]
+COLORMODES = ["r", "g", "b", "rg", "gr", "gb", "bg", "br", "rb", "rgb", "rbg", "grb", "gbr", "brg", "bgr"]
+CHUNK_PIXELS = 1 << 18  # multiple of 8, so every chunk starts on a payload byte boundary
 
 
-def colors_equal(color1: tuple, color2: tuple) -> bool:
-    for i in range(3):  # Ignore alpha channel
-        if color1[i] != color2[i]:
-            return False
-    return True
+def load_pixels(path: str):
+    image = Image.open(path)
+    pixels = np.array(image, dtype=np.uint8)
+    if pixels.ndim != 3:
+        exit(f"Unsupported image mode {image.mode}, expected an RGB(A) image")
+    return image, pixels.reshape(-1, pixels.shape[2])
 
 
-def color_in_list(color: tuple, color_list: list) -> bool:
-    for c in color_list:
-        if colors_equal(color, c):
-            return True
-    return False
+def carrier_order(pixels: np.ndarray, order: np.ndarray, ignored_colors: list) -> np.ndarray:
+    if not ignored_colors:
+        return order
+    ignored = np.zeros(len(pixels), dtype=bool)
+    for color in ignored_colors:  # Ignore alpha channel
+        ignored |= np.all(pixels[:, :3] == color[:3], axis=1)
+    return order[~ignored[order]]
 
 
-def hide_pixel(x: int, y: int, i: int, image: Image.Image, payload_bits: BitArray, nlsb: int, colormode: str, ignored_colors: list) -> int:
-    pixel_color = image.getpixel((x, y))
-    if color_in_list(pixel_color, ignored_colors):
-        return i
-    idxs = colormode_idxs(colormode)
-    new_pixel_color = pixel_color
-    for color_idx in idxs:
-        new_channel_value = get_new_channel_value(pixel_color[color_idx], payload_bits[i : i + nlsb], nlsb)
-        print_progress_bar(i // 8, payload_bits.length // 8)
-        new_pixel_color = new_pixel_color[:color_idx] + (new_channel_value,) + new_pixel_color[color_idx + 1 :]
-        i += nlsb
-        if i >= len(payload_bits):
-            break
-    image.putpixel((x, y), new_pixel_color)
-    return i
+def embed_bits(values: np.ndarray, bits: np.ndarray, nlsb: int):
+    """Overwrite the nlsb low bits of values with bits, MSB first; a short last slot keeps its lowest bits."""
+    nslots = len(values)
+    fields = np.zeros(nslots * nlsb, dtype=np.uint8)
+    fields[: len(bits)] = bits
+    fields = np.packbits(fields.reshape(nslots, nlsb), axis=1)[:, 0] >> (8 - nlsb)
+    tail = nslots * nlsb - len(bits)
+    if tail:
+        fields[-1] |= values[-1] & ((1 << tail) - 1)
+    values[:] = (values & ((0xFF << nlsb) & 0xFF)) | fields
 
 
 def hide(path_to_original: str, path_to_payload: str, colormode: str, direction: str, nlsb: int, ignored_colors: list):
-    image = Image.open(path_to_original)
+    image, pixels = load_pixels(path_to_original)
     output_path = os.path.splitext(path_to_original)[0] + f".png"
-    with open(path_to_payload, mode="rb") as file:
-        payload_bits = BitArray(file.read())
+    payload = np.fromfile(path_to_payload, dtype=np.uint8)
+    payload_length = len(payload) * 8
 
     max_payload_size = image.width * image.height * nlsb * len(colormode)
 
-    if payload_bits.length > max_payload_size:
-        exit(f"Impossible to hide payload ({readable_size(payload_bits.length//8)}) in given file with nlsb={nlsb}, maximum is {readable_size(max_payload_size//8)}")
-
-    i = 0
-    if direction in ["horizontal", "vertical"]:
-        c1_max = image.width if direction == "vertical" else image.height
-        c2_max = image.height if direction == "vertical" else image.width
-        for c1 in range(c1_max):
-            for c2 in range(c2_max):
-                x = c1 if direction == "vertical" else c2
-                y = c2 if direction == "vertical" else c1
-                i = hide_pixel(x, y, i, image, payload_bits, nlsb, colormode, ignored_colors)
-                if i >= len(payload_bits):
-                    image.save(output_path)
-                    image.close()
-                    print("\nDone! Successfully encoded payload in image! See " + output_path)
-                    return
-    elif direction in ["diagonalup", "diagonaldown"]:
-        c1_max = image.width if direction == "diagonalup" else image.height
-        c2_max = image.height if direction == "diagonalup" else image.width
-        for diag in range(image.width + image.height - 1):
-            for c1 in range(c1_max):
-                c2 = diag - c1
-                if c2 < 0 or c2 >= c2_max:
-                    continue
-                x = c1 if direction == "diagonalup" else c2
-                y = c2 if direction == "diagonalup" else c1
-                i = hide_pixel(x, y, i, image, payload_bits, nlsb, colormode, ignored_colors)
-                if i >= len(payload_bits):
-                    image.save(output_path)
-                    image.close()
-                    print("\nDone! Successfully encoded payload in image! See " + output_path)
-                    return
-
-    print("\nUnable to encode full payload in image, saving what we can in " + output_path)
+    if payload_length > max_payload_size:
+        exit(f"Impossible to hide payload ({readable_size(payload_length//8)}) in given file with nlsb={nlsb}, maximum is {readable_size(max_payload_size//8)}")
+
+    idxs = colormode_idxs(colormode)
+    bits_per_pixel = nlsb * len(idxs)
+    carrier = carrier_order(pixels, traversal_order(image.height, image.width, direction), ignored_colors)
+    hidden_bits = min(payload_length, len(carrier) * bits_per_pixel)
+    used_pixels = -(-hidden_bits // bits_per_pixel)
+
+    for start in range(0, used_pixels, CHUNK_PIXELS):
+        idx = carrier[start : min(start + CHUNK_PIXELS, used_pixels)][:, None]
+        block = pixels[idx, idxs]
+        first_bit = start * bits_per_pixel
+        chunk_bits = min(len(block) * bits_per_pixel, hidden_bits - first_bit)
+        bits = np.unpackbits(payload[first_bit // 8 : (first_bit + chunk_bits + 7) // 8])[:chunk_bits]
+        values = block.reshape(-1)
+        embed_bits(values[: -(-chunk_bits // nlsb)], bits, nlsb)
+        pixels[idx, idxs] = block
+        print_progress_bar((first_bit + chunk_bits) // 8, payload_length // 8)
+
+    image.frombytes(pixels.tobytes())
     image.save(output_path)
     image.close()
+    if hidden_bits == payload_length:
+        print("\nDone! Successfully encoded payload in image! See " + output_path)
+    else:
+        print("\nUnable to encode full payload in image, saving what we can in " + output_path)
+
+
+def extract_blocks(pixels: np.ndarray, carrier: np.ndarray, idxs: list, nlsb: int, chunk_pixels: int = CHUNK_PIXELS):
+    """Yield the payload bytes hidden in the carrier pixels, one chunk of pixels at a time.
+
+    Chunks start at chunk_pixels (a power of two >= 8) and double up to CHUNK_PIXELS.
+    """
+    start = 0
+    while start < len(carrier):
+        values = pixels[carrier[start : start + chunk_pixels][:, None], idxs].reshape(-1)
+        bits = np.unpackbits(values[:, None], axis=1)[:, 8 - nlsb :].reshape(-1)
+        yield np.packbits(bits[: len(bits) - len(bits) % 8]).tobytes()
+        start += chunk_pixels
+        chunk_pixels = min(chunk_pixels * 2, CHUNK_PIXELS)
+
+
+# Structure parsers for --stream: generators over the growing payload buffer that yield
+# how many bytes they need before they can go on, and return where the file ends
+# (or None when the payload doesn't look like that format at all).
+
+def png_structure(buf: bytearray):
+    yield 8
+    if buf[:8] != b"\x89PNG\r\n\x1a\n":
+        return None
+    pos = 8
+    while True:
+        yield pos + 8
+        length, chunk_type = struct.unpack_from(">I4s", buf, pos)
+        pos += 12 + length  # length + type + data + crc
+        if chunk_type == b"IEND":
+            yield pos  # the IEND CRC too
+            return pos
+
+
+def jpeg_structure(buf: bytearray):
+    yield 2
+    if buf[:2] != b"\xFF\xD8":
+        return None
+    pos = 2
+    while True:
+        yield pos + 2
+        if buf[pos] != 0xFF:
+            return None
+        marker = buf[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker == 0xD9:
+            return pos + 2
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        yield pos + 4  # its segment length
+        pos += 2 + struct.unpack_from(">H", buf, pos + 2)[0]
+        if marker != 0xDA:
+            continue
+        # Entropy-coded data follows SOS: skip stuffed 0xFF00 and restart markers
+        while True:
+            i = buf.find(b"\xFF", pos, len(buf) - 1)
+            if i == -1:
+                pos = max(pos, len(buf) - 1)
+                yield len(buf) + 1
+                continue
+            if buf[i + 1] == 0x00 or 0xD0 <= buf[i + 1] <= 0xD7:
+                pos = i + 2
+                continue
+            pos = i
+            break
 
 
-def extract_payload_bits(color_value: int, nlsb: int) -> BitArray:
-    channel_bits = BitArray(color_value.to_bytes(1, "big"))
-    return channel_bits[8 - nlsb :]
+PDF_UPDATE = re.compile(rb"\s*(\d+\s+\d+\s+obj|xref)")
 
 
-def solve_pixel(x: int, y: int, image: Image.Image, payload_bits: BitArray, nlsb: int, colormode: str, ignored_colors: list):
-    pixel_color = image.getpixel((x, y))
-    if color_in_list(pixel_color, ignored_colors):
-        return
-    idxs = colormode_idxs(colormode)
-    for color_idx in idxs:
-        payload_bits.append(extract_payload_bits(pixel_color[color_idx], nlsb))
-
-
-def solve(path_to_stego: str, path_to_output: str, colormode: str, direction: str, file_ext: str, nlsb: int, ignored_colors: list):
-    original = Image.open(path_to_stego)
-    payload_bits = BitArray()
-
-    total_bytes = original.height * original.width * nlsb * len(colormode) // 8
-
-    if direction in ["horizontal", "vertical"]:
-        c1_max = original.width if direction == "vertical" else original.height
-        c2_max = original.height if direction == "vertical" else original.width
-        for c1 in range(c1_max):
-            for c2 in range(c2_max):
-                x = c1 if direction == "vertical" else c2
-                y = c2 if direction == "vertical" else c1
-                solve_pixel(x, y, original, payload_bits, nlsb, colormode, ignored_colors)
-                print_progress_bar(payload_bits.length // 8, total_bytes)
-    elif direction in ["diagonalup", "diagonaldown"]:
-        c1_max = original.width if direction == "diagonalup" else original.height
-        c2_max = original.height if direction == "diagonalup" else original.width
-        for diag in range(original.width + original.height - 1):
-            for c1 in range(c1_max):
-                c2 = diag - c1
-                if c2 < 0 or c2 >= c2_max:
-                    continue
-                x = c1 if direction == "diagonalup" else c2
-                y = c2 if direction == "diagonalup" else c1
-                solve_pixel(x, y, original, payload_bits, nlsb, colormode, ignored_colors)
-                print_progress_bar(payload_bits.length // 8, total_bytes)
+def pdf_structure(buf: bytearray):
+    yield 5
+    if buf[:5] != b"%PDF-":
+        return None
+    pos = 5
+    while True:
+        i = buf.find(b"%%EOF", pos)
+        if i == -1:
+            pos = max(pos, len(buf) - 4)
+            yield len(buf) + 1
+            continue
+        end = i + 5
+        yield end + 32
+        # An incremental update appends more objects after the first %%EOF
+        if not PDF_UPDATE.match(buf, end):
+            return end
+        pos = end
+
+
+STRUCTURE_PARSERS = {"png": png_structure, "jpg": jpeg_structure, "jpeg": jpeg_structure, "pdf": pdf_structure}
+STREAM_CHUNK_PIXELS = 1 << 12
+
+
+def payload_end(payload: bytes, file_ext: str) -> int:
+    if file_ext == "png":
+        return payload.rfind(b"\x49\x45\x4E\x44") + 8
+    elif file_ext in ["jpg", "jpeg"]:
+        return payload.rfind(b"\xFF\xD9") + 2
+    elif file_ext == "pdf":
+        return payload.rfind(b"\x25\x25\x45\x4F\x46") + 5
+    return len(payload)
+
+
+def decode_payload(pixels: np.ndarray, carrier: np.ndarray, colormode: str, nlsb: int, file_ext: str, stream: bool) -> bytearray:
+    total_bytes = len(carrier) * nlsb * len(colormode) // 8
+    payload = bytearray()
+    parser = STRUCTURE_PARSERS[file_ext](payload) if stream and file_ext in STRUCTURE_PARSERS else None
+    needed = next(parser) if parser else 0
+    endidx = None
+    chunk_pixels = STREAM_CHUNK_PIXELS if parser else CHUNK_PIXELS
+    for block in extract_blocks(pixels, carrier, colormode_idxs(colormode), nlsb, chunk_pixels):
+        payload += block
+        print_progress_bar(len(payload), total_bytes)
+        try:
+            while parser and len(payload) >= needed:
+                needed = parser.send(None)
+        except StopIteration as done:
+            parser = None
+            endidx = done.value
+            if endidx is not None:
+                print(f"\nPayload complete after {readable_size(endidx)}, stopped decoding")
+                break
+
+    if endidx is None:
+        endidx = payload_end(payload, file_ext)
+    return payload[:endidx]
+
+
+def solve(path_to_stego: str, path_to_output: str, colormode: str, direction: str, file_ext: str, nlsb: int, ignored_colors: list, stream: bool = False):
+    original, pixels = load_pixels(path_to_stego)
+    carrier = carrier_order(pixels, traversal_order(original.height, original.width, direction), ignored_colors)
+    payload = decode_payload(pixels, carrier, colormode, nlsb, file_ext, stream)
     with open(path_to_output, mode="wb") as file:
-        extra_bits = payload_bits.length % 8
-        if extra_bits != 0:
-            payload_bits = payload_bits[: payload_bits.length - extra_bits]
-
-        if file_ext == "png":
-            endidx = payload_bits.bytes.rfind(b"\x49\x45\x4E\x44") + 8
-        elif file_ext in ["jpg", "jpeg"]:
-            endidx = payload_bits.bytes.rfind(b"\xFF\xD9") + 2
-        elif file_ext == "pdf":
-            endidx = payload_bits.bytes.rfind(b"\x25\x25\x45\x4F\x46") + 5
-        else:
-            endidx = len(payload_bits.bytes)
-        file.write(payload_bits.bytes[:endidx])
+        file.write(payload)
+
+
+MAGIC_BYTES = {
+    b"\x89PNG\r\n\x1a\n": "png",
+    b"\xFF\xD8\xFF": "jpg",
+    b"%PDF-": "pdf",
+    b"GIF8": "gif",
+    b"PK\x03\x04": "zip",
+    b"SQLite format 3\x00": "db",
+    b"\x1f\x8b": "gz",
+    b"BZh": "bz2",
+    b"7z\xbc\xaf\x27\x1c": "7z",
+    b"Rar!": "rar",
+    b"\x7fELF": "elf",
+    b"RIFF": "wav",
+    b"%!PS": "ps",
+}
+SWEEP_SAMPLE = 4096  # decoded bytes scored per candidate
+
+_sweep_samples: dict = {}
+
+
+def _init_sweep(samples: dict):
+    global _sweep_samples
+    _sweep_samples = samples
+
+
+def detect_magic(data: bytes) -> str:
+    for magic, ext in MAGIC_BYTES.items():
+        if data.startswith(magic):
+            return ext
+    return ""
+
+
+def byte_entropy(data: bytes) -> float:
+    counts = np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256)
+    p = counts[counts > 0] / max(len(data), 1)
+    return float(-(p * np.log2(p)).sum())
+
+
+def score_candidate(candidate: tuple) -> tuple:
+    """Score one (direction, colormode, nlsb) on the first SWEEP_SAMPLE bytes it decodes to."""
+    direction, colormode, nlsb = candidate
+    sample_pixels = _sweep_samples[direction]
+    used = min(len(sample_pixels), -(-SWEEP_SAMPLE * 8 // (nlsb * len(colormode))))
+    sample = b"".join(extract_blocks(sample_pixels, np.arange(used), colormode_idxs(colormode), nlsb))
+    ext = detect_magic(sample)
+    entropy = byte_entropy(sample)
+    # Known magic wins outright; otherwise anything less random than pixel noise ranks higher
+    return (8 if ext else 0) + 8 - entropy, direction, colormode, nlsb, ext, entropy
+
+
+def sweep(path_to_stego: str, output_dir: str, ignored_colors: list, top: int):
+    image, pixels = load_pixels(path_to_stego)
+    carriers = {d: carrier_order(pixels, traversal_order(image.height, image.width, d), ignored_colors) for d in DIRECTIONS}
+    # nlsb=1 on a single channel needs the most pixels for a full sample
+    samples = {d: pixels[carrier[: SWEEP_SAMPLE * 8]] for d, carrier in carriers.items()}
+    candidates = [(d, c, n) for d in DIRECTIONS for c in COLORMODES for n in range(1, 9)]
+
+    with ProcessPoolExecutor(initializer=_init_sweep, initargs=(samples,)) as pool:
+        results = sorted(pool.map(score_candidate, candidates, chunksize=16), reverse=True)
+
+    print(f"{'#':>3}  {'direction':<13} {'colormode':<9} {'nlsb':>4}  {'magic':<5} {'entropy':>7} {'score':>6}")
+    for rank, (score, d, c, n, ext, entropy) in enumerate(results[: max(top, 10)], 1):
+        print(f"{rank:>3}  {d:<13} {c:<9} {n:>4}  {ext or '-':<5} {entropy:>7.3f} {score:>6.2f}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    for rank, (score, d, c, n, ext, entropy) in enumerate(results[:top], 1):
+        payload = decode_payload(pixels, carriers[d], c, n, ext, stream=True)
+        output_path = os.path.join(output_dir, f"{rank:02d}_{d}_{c}_{n}.{ext or 'bin'}")
+        with open(output_path, mode="wb") as file:
+            file.write(payload)
+        print(f"\nWrote {readable_size(len(payload))} to {output_path}")
 
 
 def colormode_idx(mode: str):
@@ -191,14 +335,16 @@ def parse_colors_csv(csv: str):
 
 if __name__ == "__main__":
     parser = ArgumentParser()
-    parser.add_argument("-m", "--mode", type=str, help="Mode to use (Default: hide)", choices=["hide", "solve"], default="hide")
-    parser.add_argument("-d", "--direction", type=str, help="Direction to use", choices=["horizontal", "vertical", "diagonalup", "diagonaldown"], default="horizontal")
-    parser.add_argument("-c", "--colormode", type=str, help="Color mode to use", required=True, choices=["r", "g", "b", "rg", "gr", "gb", "bg", "br", "rb", "rgb", "rbg", "grb", "gbr", "brg", "bgr"])
-    parser.add_argument("-n", "--nlsb", type=int, help="Number of least significant bits to use", required=True)
+    parser.add_argument("-m", "--mode", type=str, help="Mode to use (Default: hide)", choices=["hide", "solve", "sweep"], default="hide")
+    parser.add_argument("-d", "--direction", type=str, help="Direction to use", choices=DIRECTIONS, default="horizontal")
+    parser.add_argument("-c", "--colormode", type=str, help="Color mode to use", required=False, choices=COLORMODES)
+    parser.add_argument("-n", "--nlsb", type=int, help="Number of least significant bits to use", required=False)
     parser.add_argument("-i", "--ignore", type=str, help="Colors to ignore in CSV format: HEX;HEX;...", default="", required=False)
     parser.add_argument("-o", "--original", type=str, help="(h) Path to original image / (s) Path to stego image", required=True)
-    parser.add_argument("-p", "--payload", type=str, help="(h) Path to payload / (s) Path to output payload", required=False, default="payload")
+    parser.add_argument("-p", "--payload", type=str, help="(h) Path to payload / (s) Path to output payload / (w) Directory for the top hits", required=False, default="payload")
     parser.add_argument("-e", "--extension", type=str, help="(s) File extension of payload", required=False, default="")
+    parser.add_argument("-t", "--top", type=int, help="(w) Number of best candidates to write out (Default: 5)", required=False, default=5)
+    parser.add_argument("-s", "--stream", action="store_true", help="(s) Stop decoding once the payload's own structure (png/jpg/pdf) is complete")
     args = parser.parse_args()
 
     ignored_colors = parse_colors_csv(args.ignore)
@@ -208,9 +354,11 @@ if __name__ == "__main__":
             print("Missing required arguments")
             exit(1)
         hide(args.original, args.payload, args.colormode, args.direction, args.nlsb, ignored_colors)
+    elif args.mode == "sweep":
+        sweep(args.original, args.payload, ignored_colors, args.top)
     else:
         if args.original is None or args.payload is None or args.colormode is None or args.nlsb is None or args.direction is None:
             parser.print_help()
             print("Missing required arguments")
             exit(1)
-        solve(args.original, args.payload, args.colormode, args.direction, args.extension.lower(), args.nlsb, ignored_colors)
+        solve(args.original, args.payload, args.colormode, args.direction, args.extension.lower(), args.nlsb, ignored_colors, args.stream)
@@ -0,0 +1,46 @@
+import io
+import struct
+
+from PIL import Image
+
+import carver
+
+
+def jpeg_bytes(size=(40, 30), **save) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", size, (200, 40, 90)).save(out, "JPEG", **save)
+    return out.getvalue()
+
+
+def riff(form: bytes, body: bytes = b"\0" * 16) -> bytes:
+    return b"RIFF" + struct.pack("<I", 4 + len(body)) + form + body
+
+
+def carve_bytes(tmp_path, data: bytes) -> list:
+    path = tmp_path / "image.bin"
+    path.write_bytes(data)
+    with open(path, "rb") as f:
+        return carver.carve(f.fileno(), len(data))
+
+
+def test_jpeg_ending_at_eof(tmp_path):
+    jpg = jpeg_bytes()
+    assert carve_bytes(tmp_path, jpg) == [(0, len(jpg), "jpg")]
+
+
+def test_jpeg_with_exif_thumbnail_is_carved_whole(tmp_path):
+    thumbnail = jpeg_bytes((8, 8))
+    exif = b"Exif\0\0" + thumbnail  # not a real IFD, but it puts a second FFD9 inside APP1
+    jpg = jpeg_bytes(exif=exif)
+    data = b"\0" * 100 + jpg + b"\0" * 100
+    assert carve_bytes(tmp_path, data) == [(100, len(jpg), "jpg")]
+
+
+def test_riff_labelled_by_form_type(tmp_path):
+    wav, avi, webp, unknown = riff(b"WAVE"), riff(b"AVI "), riff(b"WEBP"), riff(b"XYZW")
+    data = wav + avi + unknown + webp
+    assert carve_bytes(tmp_path, data) == [
+        (0, len(wav), "wav"),
+        (len(wav), len(avi), "avi"),
+        (len(wav + avi + unknown), len(webp), "webp"),
+    ]
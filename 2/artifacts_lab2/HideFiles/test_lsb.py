@@ -0,0 +1,71 @@
+import io
+import struct
+import zlib
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import lsb
+
+
+def png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+def png_of_size(size: int) -> bytes:
+    """A PNG of exactly size bytes, its IDAT padded to fit."""
+    head = b"\x89PNG\r\n\x1a\n" + png_chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 0, 0, 0, 0))
+    end = png_chunk(b"IEND", b"")
+    return head + png_chunk(b"IDAT", b"\x00" * (size - len(head) - len(end) - 12)) + end
+
+
+def test_stream_waits_for_iend_crc_across_block_boundary():
+    # with rgb and 1 lsb the first stream block holds STREAM_CHUNK_PIXELS * 3 / 8 bytes;
+    # end the PNG 2 bytes after it, inside the IEND CRC
+    block = lsb.STREAM_CHUNK_PIXELS * 3 // 8
+    png = png_of_size(block + 2)
+    trailing = bytes(range(256)) * 32  # more hidden bytes after the file
+    trailing += bytes(-(len(png) + len(trailing)) % 3)
+    bits = np.unpackbits(np.frombuffer(png + trailing, dtype=np.uint8))
+    pixels = bits.reshape(-1, 3).astype(np.uint8)
+    carrier = np.arange(len(pixels))
+
+    payload = lsb.decode_payload(pixels, carrier, "rgb", 1, "png", stream=True)
+
+    assert bytes(payload) == png
+
+
+def test_jpeg_structure_never_asks_past_the_eoi():
+    out = io.BytesIO()
+    Image.new("RGB", (16, 16), (10, 120, 30)).save(out, "JPEG")
+    jpg = bytearray(out.getvalue())
+    parser = lsb.jpeg_structure(jpg)
+    with pytest.raises(StopIteration) as done:
+        while True:
+            assert next(parser) <= len(jpg)
+    assert done.value.value == len(jpg)
+
+
+def structure_end(structure, data: bytes):
+    """Drive a structure parser over data, growing the buffer just past what it asks for."""
+    buf = bytearray()
+    parser = structure(buf)
+    try:
+        needed = next(parser)
+        while needed <= len(data):
+            buf[:] = data[:needed + 1]
+            needed = parser.send(None)
+    except StopIteration as done:
+        return done.value
+    return "incomplete"
+
+
+def test_pdf_structure_follows_incremental_updates():
+    first = b"%PDF-1.4\n1 0 obj\n<<>>\nendobj\ntrailer\n<<>>\n%%EOF\n"
+    update = b"2 0 obj\n<<>>\nendobj\nxref\n0 1\ntrailer\n<<>>\n%%EOF\n"
+    junk = b"\x00\x17not part of it" * 4
+    assert structure_end(lsb.pdf_structure, first + update + junk) == len(first + update) - 1
+    assert structure_end(lsb.pdf_structure, first + junk) == len(first) - 1
+    assert structure_end(lsb.pdf_structure, b"GIF89a" + junk) is None
+    assert structure_end(lsb.pdf_structure, first[:-8]) == "incomplete"
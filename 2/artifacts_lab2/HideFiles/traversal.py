@@ -0,0 +1,53 @@
+from functools import lru_cache
+import numpy as np
+
+
+ORDERS = ["horizontal", "vertical", "diagonalup", "diagonaldown", "zigzag"]
+
+
+def index_dtype(height: int, width: int):
+    return np.int32 if height * width <= np.iinfo(np.int32).max else np.int64
+
+
+def diagonal_band(height: int, width: int, first: int, last: int, direction: str = "diagonalup") -> np.ndarray:
+    """Flat pixel indices (y * width + x) of anti-diagonals first..last-1 (x + y == diagonal).
+
+    diagonalup walks each diagonal with x ascending (bottom-left to top-right), diagonaldown
+    with y ascending, and zigzag alternates them starting with diagonalup on diagonal 0.
+    """
+    dtype = index_dtype(height, width)
+    c1_max, c2_max = (width, height) if direction != "diagonaldown" else (height, width)
+    diag = np.arange(first, last, dtype=dtype)
+    c1_first = np.maximum(0, diag - (c2_max - 1))
+    c1_last = np.minimum(diag, c1_max - 1)
+    counts = c1_last - c1_first + 1
+    starts = np.cumsum(counts, dtype=dtype) - counts
+    c1 = np.arange(counts.sum(), dtype=dtype)
+    c1 -= np.repeat(starts - c1_first, counts)
+    if direction == "zigzag":
+        odd = np.repeat(diag % 2 == 1, counts)
+        c1[odd] = np.repeat(c1_first + c1_last, counts)[odd] - c1[odd]
+    c2 = np.repeat(diag, counts) - c1
+    x, y = (c1, c2) if direction != "diagonaldown" else (c2, c1)
+    y *= width
+    y += x
+    return y
+
+
+@lru_cache(maxsize=16)
+def traversal_order(height: int, width: int, order: str) -> np.ndarray:
+    """Read-only flat pixel indices in the order the given traversal visits an height x width image.
+
+    Cached on (height, width, order), so images of the same size share one index array.
+    """
+    dtype = index_dtype(height, width)
+    if order == "horizontal":
+        indices = np.arange(height * width, dtype=dtype)
+    elif order == "vertical":
+        indices = np.arange(height * width, dtype=dtype).reshape(height, width).T.ravel()
+    elif order in ["diagonalup", "diagonaldown", "zigzag"]:
+        indices = diagonal_band(height, width, 0, height + width - 1, order)
+    else:
+        raise ValueError(f"Unknown traversal order {order}, expected one of {ORDERS}")
+    indices.setflags(write=False)
+    return indices
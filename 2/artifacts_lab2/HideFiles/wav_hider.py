@@ -1,56 +1,88 @@
 # script to hide and retrieve secret.pdf after the EOF of input.wav
 
 # program is invoked as follows:
-# python hide.py -h or -r <pdf_file> <wav_file>
+# python hide.py -h <pdf_file> <wav_file> <output> or -s <wav_file> [output]
 # -h: hide the pdf file in the wav file
-# -r: retrieve the pdf file from the wav file
+# -s: retrieve the pdf file from the wav file (default output: retrieved_parking.db)
 
 import sys
 import os
-import wave 
+import mmap
 
 # ...existing code...
 
-def hide(db_file, wav_file, filename):
-    f1 = open(wav_file, "rb")
-    f1_data = f1.read()
-    f1.close()
+COPY_CHUNK = 1 << 24  # bytes per copy call
+SCAN_WINDOW = 1 << 26  # bytes searched per window when looking for the magic
+
+# Kernel-side copies first (no data through user space), plain pread/write as the last resort
+def _copy_file_range(src_fd, dst_fd, offset, count):
+    return os.copy_file_range(src_fd, dst_fd, count, offset)
+
+def _sendfile(src_fd, dst_fd, offset, count):
+    return os.sendfile(dst_fd, src_fd, offset, count)
+
+def _pread_write(src_fd, dst_fd, offset, count):
+    return os.write(dst_fd, os.pread(src_fd, count, offset))
 
-    f2 = open(db_file, "rb")
-    f2_data = f2.read()
-    f2.close()
+def copy_range(src_fd, dst_fd, offset, count):
+    # copy count bytes from src_fd at offset to the current position of dst_fd
+    copiers = [_copy_file_range, _sendfile, _pread_write]
+    while count > 0:
+        try:
+            n = copiers[0](src_fd, dst_fd, offset, min(count, COPY_CHUNK))
+        except (AttributeError, OSError):
+            # not available on this platform / for these files: try the next one
+            if len(copiers) == 1:
+                raise
+            copiers.pop(0)
+            continue
+        if n == 0:
+            break
+        offset += n
+        count -= n
 
+def append_file(src_path, dst_fd):
+    with open(src_path, "rb") as src:
+        copy_range(src.fileno(), dst_fd, 0, os.fstat(src.fileno()).st_size)
+
+def hide(db_file, wav_file, filename):
     out_path = os.path.join(os.getcwd(), filename)
     with open(out_path, "wb") as out_file:
-        out_file.write(f1_data)
-        out_file.write(f2_data)
+        append_file(wav_file, out_file.fileno())
+        append_file(db_file, out_file.fileno())
 
     print(f"HIDE: SQLite database hidden in {out_path}")
 
-def show(wav_file):
-    f1 = open(wav_file, "rb")
-    f1_data = f1.read()
-    f1.close()
+def find_magic(mm, magic, window=SCAN_WINDOW):
+    # windows overlap by len(magic) - 1 so a magic across a boundary is still found
+    for start in range(0, len(mm), window):
+        index = mm.find(magic, start, min(start + window + len(magic) - 1, len(mm)))
+        if index != -1:
+            return index
+    return -1
 
+def show(wav_file, output='retrieved_parking.db'):
     # SQLite 3.x magic number
     magic = b'SQLite format 3\x00'
 
-    wav_data = bytearray(f1_data)
-    db_index = wav_data.find(magic)
-    if db_index == -1:
-        print('RETRIEVE: SQLite magic number not found')
-        return
-    else:
-        print('RETRIEVE: SQLite database found at index', db_index)
+    with open(wav_file, "rb") as f1:
+        size = os.fstat(f1.fileno()).st_size
+        if size == 0:
+            print('RETRIEVE: SQLite magic number not found')
+            return
+        with mmap.mmap(f1.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            db_index = find_magic(mm, magic)
+        if db_index == -1:
+            print('RETRIEVE: SQLite magic number not found')
+            return
+        else:
+            print('RETRIEVE: SQLite database found at index', db_index)
 
-    # extract the database data from the wav data
-    db_data = f1_data[db_index:]
+        # copy the database data from the wav file to the output file
+        with open(output, 'wb') as db_file:
+            copy_range(f1.fileno(), db_file.fileno(), db_index, size - db_index)
 
-    # write database data to output file
-    with open('retrieved_parking.db', 'wb') as db_file:
-        db_file.write(db_data)
-    
-    print('RETRIEVE: Database saved as retrieved_parking.db')
+    print(f'RETRIEVE: Database saved as {output}')
 
 # Update main section to handle database operations
 if __name__ == '__main__':
@@ -61,12 +93,10 @@ if __name__ == '__main__':
             hide(sys.argv[2], sys.argv[3], sys.argv[4])
         else:
             print('Invalid option')
-    elif len(sys.argv) == 3:    
-        if sys.argv[1] == '-s':
-            show(sys.argv[2])
-        elif sys.argv[1] == '-sdb':
-            show(sys.argv[2])
+    elif len(sys.argv) in (3, 4):
+        if sys.argv[1] in ('-s', '-sdb'):
+            show(*sys.argv[2:])
         else:
             print('Invalid option')
     else:
-        print('Usage: python script.py -h/-hdb <file> <wav_file> or python script.py -s/-sdb <wav_file>')
\ No newline at end of file
+        print('Usage: python script.py -h/-hdb <file> <wav_file> <output> or python script.py -s/-sdb <wav_file> [output]')
\ No newline at end of file
@@ -1,40 +1,254 @@
-import hashlib
-from typing import Dict
-
-
-seed0 = "TheByteOf78"
-seed76 = "6b508266ad2ab9fd7fef0ecfca4b9d874ed3e0362bbf92cf2b269b0f632f452b"
-
-
-timestamp_map = {
-    75: "1758588601",
-    74: "1758589201",
-    73: "1758588001",
-    72: "1758587401",
-    71: "1758586801",
-    70: "1758586202",
-    69: "1758585623",
-    68: "1758495226",
-}
-
-n_zip = tuple(timestamp_map.keys())
-
-
-def main() -> None:
-    s = seed0
-
-    out_path = "passwordsZips.txt"
-    with open(out_path, "w", encoding="utf-8") as f:
-        for i in range(1, 77):
-            s = hashlib.sha256(s.encode("utf-8")).hexdigest()
-            if i in n_zip:
-                ts = timestamp_map[i]
-                pw = hashlib.sha256((s + ts).encode("utf-8")).hexdigest()
-                print(f"i={i} pw: {pw}")
-                f.write(f"i={i} {pw}\n")
-
-    print("seed_76 matches target?", s == seed76)
-
-
-if __name__ == "__main__":
-    main()
+import hashlib
+import os
+import re
+import sys
+import time
+import zipfile
+import zlib
+from argparse import ArgumentParser
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import Dict
+
+
+seed0 = "TheByteOf78"
+seed76 = "6b508266ad2ab9fd7fef0ecfca4b9d874ed3e0362bbf92cf2b269b0f632f452b"
+
+
+timestamp_map = {
+    75: "1758588601",
+    74: "1758589201",
+    73: "1758588001",
+    72: "1758587401",
+    71: "1758586801",
+    70: "1758586202",
+    69: "1758585623",
+    68: "1758495226",
+}
+
+n_zip = tuple(timestamp_map.keys())
+
+CHECKPOINT_EVERY = 16
+CHUNK_SIZE = 512  # candidates per worker task; small, so a hit stops the search quickly
+BACKUP_TS = re.compile(r"backup_(\d+)\.zip$")
+
+
+class HashChain:
+    """s_0 = seed, s_i = sha256(s_{i-1}) (hex), as the obfuscator advances /tmp/seed.txt on
+    every backup. Every k-th link is kept, so s_i costs at most k - 1 hashes once the chain
+    has been walked past i."""
+
+    def __init__(self, seed: str = seed0, every: int = CHECKPOINT_EVERY):
+        self.every = every
+        self.checkpoints = [seed]  # s_0, s_k, s_2k, ...
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            raise IndexError(i)
+        while len(self.checkpoints) <= i // self.every:
+            self.checkpoints.append(self.walk(self.checkpoints[-1], self.every))
+        return self.walk(self.checkpoints[i // self.every], i % self.every)
+
+    @staticmethod
+    def walk(s: str, steps: int) -> str:
+        for _ in range(steps):
+            s = hashlib.sha256(s.encode("utf-8")).hexdigest()
+        return s
+
+
+def password(s: str, ts) -> str:
+    # obfuscator: sha256(seed + argv[1]), argv[1] being backup.sh's `date +%s`
+    return hashlib.sha256((s + str(ts)).encode("utf-8")).hexdigest()
+
+
+def crc_table() -> list:
+    table = []
+    for n in range(256):
+        for _ in range(8):
+            n = n >> 1 ^ 0xEDB88320 if n & 1 else n >> 1
+        table.append(n)
+    return table
+
+
+CRC_TABLE = crc_table()
+
+
+def test_member(path: str) -> zipfile.ZipInfo:
+    """The smallest encrypted file of the archive: the cheapest one to confirm a password on."""
+    with zipfile.ZipFile(path) as zf:
+        members = [i for i in zf.infolist() if i.flag_bits & 0x1 and not i.is_dir()]
+    if not members:
+        raise ValueError(f"{path} has no encrypted files")
+    return min(members, key=lambda i: i.compress_size)
+
+
+def encryption_header(zf: zipfile.ZipFile, info: zipfile.ZipInfo) -> tuple:
+    """(12-byte ZipCrypto header, the check byte its last byte decrypts to)."""
+    zf.fp.seek(info.header_offset)
+    local = zf.fp.read(30)
+    name_length, extra_length = int.from_bytes(local[26:28], "little"), int.from_bytes(local[28:30], "little")
+    zf.fp.seek(name_length + extra_length, os.SEEK_CUR)
+    if info.flag_bits & 0x8:  # sizes and CRC follow the data: the check is the DOS time's high byte
+        h, m, sec = info.date_time[3:6]
+        check = (h << 11 | m << 5 | sec // 2) >> 8
+    else:
+        check = info.CRC >> 24
+    return zf.fp.read(12), check
+
+
+def check_byte_matches(pw: bytes, header: bytes, check: int) -> bool:
+    # ZipCrypto's key schedule (APPNOTE 6.1), inlined: zipfile spends a function call per byte
+    table = CRC_TABLE
+    k0, k1, k2 = 0x12345678, 0x23456789, 0x34567890
+    for c in pw:
+        k0 = k0 >> 8 ^ table[(k0 ^ c) & 0xFF]
+        k1 = ((k1 + (k0 & 0xFF)) * 134775813 + 1) & 0xFFFFFFFF
+        k2 = k2 >> 8 ^ table[(k2 ^ k1 >> 24) & 0xFF]
+    for c in header:
+        t = k2 | 2
+        c ^= (t * (t ^ 1)) >> 8 & 0xFF
+        k0 = k0 >> 8 ^ table[(k0 ^ c) & 0xFF]
+        k1 = ((k1 + (k0 & 0xFF)) * 134775813 + 1) & 0xFFFFFFFF
+        k2 = k2 >> 8 ^ table[(k2 ^ k1 >> 24) & 0xFF]
+    return c == check
+
+
+def try_passwords(path: str, member: str, candidates) -> tuple:
+    """(i, ts, password) of the first candidate that opens member, or None. A wrong password
+    is nearly always rejected by the check byte; the 1 in 256 that pass it are confirmed by
+    decompressing the file and checking its CRC."""
+    with zipfile.ZipFile(path) as zf:
+        info = zf.getinfo(member)
+        header, check = encryption_header(zf, info)
+        for i, s, ts in candidates:
+            pw = password(s, ts).encode()
+            if not check_byte_matches(pw, header, check):
+                continue
+            try:
+                with zf.open(info, pwd=pw) as f:
+                    while f.read(1 << 20):
+                        pass
+            except (RuntimeError, zipfile.BadZipFile, zlib.error, EOFError):
+                continue
+            return i, ts, pw.decode()
+    return None
+
+def log_times(paths, pattern: str) -> list:
+    """Epoch seconds of the log lines matching pattern (see log_index.py)."""
+    from log_index import LogIndex
+
+    times = []
+    for path in paths:
+        index = LogIndex(path)
+        index.update()
+        column = index.column("times")
+        times.extend(int(column[row]) // 1_000_000 for row, _ in index.lines(index.query(), pattern.encode()))
+    return sorted(set(times))
+
+
+def candidates(chain: HashChain, indices, centres, window: int):
+    """(i, s_i, ts) for every ts within window seconds of a centre, nearest offsets first."""
+    links = [(i, chain[i]) for i in indices]
+    seen = set()
+    for offset in range(window + 1):
+        for centre in centres:
+            for ts in (centre + offset, centre - offset) if offset else (centre,):
+                if ts in seen:
+                    continue
+                seen.add(ts)
+                for i, s in links:
+                    yield i, s, ts
+
+
+def chunks(iterable, size: int):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def search(path: str, chain: HashChain, indices, centres, window: int, jobs: int = None):
+    """Sweep the candidates across worker processes; the first hit cancels the rest."""
+    member = test_member(path).filename
+    work = chunks(candidates(chain, indices, centres, window), CHUNK_SIZE)
+    jobs = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        # a couple of chunks per worker in flight, so the search stays in distance order
+        pending = set()
+        while True:
+            for chunk in islice(work, 2 * jobs - len(pending)):
+                pending.add(pool.submit(try_passwords, path, member, chunk))
+            if not pending:
+                return None
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.result():
+                    pool.shutdown(cancel_futures=True)
+                    return future.result()
+
+
+def parse_indices(text: str) -> list:
+    """'68-75,80' -> [68, ..., 75, 80]"""
+    indices = []
+    for part in text.split(","):
+        first, _, last = part.partition("-")
+        indices.extend(range(int(first), int(last or first) + 1))
+    return indices
+
+
+def main() -> None:
+    chain = HashChain()
+
+    out_path = "passwordsZips.txt"
+    with open(out_path, "w", encoding="utf-8") as f:
+        for i in sorted(n_zip):
+            ts = timestamp_map[i]
+            pw = password(chain[i], ts)
+            print(f"i={i} pw: {pw}")
+            f.write(f"i={i} {pw}\n")
+
+    print("seed_76 matches target?", chain[76] == seed76)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Backup zip passwords from the obfuscator's seed chain. Without --zip, "
+                                        "writes passwordsZips.txt for the known timestamps and checks seed_76.")
+    parser.add_argument("-z", "--zip", help="Find the password of this backup zip, trying timestamps around the centres")
+    parser.add_argument("-i", "--index", default=",".join(map(str, sorted(n_zip))), help="Chain indices to try, e.g. 68-75 (Default: the known ones)")
+    parser.add_argument("--around", action="append", type=int, default=[], help="Centre timestamp, epoch seconds (repeatable)")
+    parser.add_argument("--log", action="append", default=[], help="Take centres from this RFC 3339 log's lines matching --match (repeatable)")
+    parser.add_argument("--match", default=r"backup\.sh", help="Regex picking the --log lines (Default: backup\\.sh)")
+    parser.add_argument("-w", "--window", type=int, default=300, help="Seconds tried on either side of each centre (Default: 300)")
+    parser.add_argument("-j", "--jobs", type=int, help="Worker processes (Default: CPUs)")
+    parser.add_argument("-k", "--checkpoint-every", type=int, default=CHECKPOINT_EVERY, help=f"Chain links between checkpoints (Default: {CHECKPOINT_EVERY})")
+    args = parser.parse_args()
+
+    if not args.zip:
+        main()
+        sys.exit(0)
+
+    chain = HashChain(seed0, args.checkpoint_every)
+    if chain[76] != seed76:
+        sys.exit("[!] the chain doesn't reach seed_76")
+    centres = list(args.around)
+    named = BACKUP_TS.search(args.zip)
+    if named:  # backup.sh names the zip after the same `date +%s` it hands the obfuscator
+        centres.insert(0, int(named.group(1)))
+    if args.log:
+        centres += log_times(args.log, args.match)
+    centres = list(dict.fromkeys(centres))
+    if not centres:
+        parser.error("no timestamps to search around: give --around or --log, or a backup_<ts>.zip name")
+
+    indices = parse_indices(args.index)
+    start = time.perf_counter()
+    hit = search(args.zip, chain, indices, centres, args.window, args.jobs)
+    tried = f"{len(indices)} indices x {len(centres)} centres +-{args.window}s, {time.perf_counter() - start:.1f} s"
+    if hit is None:
+        sys.exit(f"[-] no password found ({tried})")
+    i, ts, pw = hit
+    print(f"[+] {args.zip}: i={i} ts={ts} pw: {pw} ({tried})")
@@ -0,0 +1,292 @@
+import json
+import mmap
+import os
+import re
+import sys
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+import numpy as np
+
+# Columnar index for RFC 3339 syslog-style logs ("<time> <host> <process>[pid]: message"),
+# so time-range / host / process / regex questions don't mean grepping the whole file again.
+#
+# The index is a directory next to the log (<log>.idx) holding one raw little-endian column
+# per field, in file order, plus the rows sorted by time:
+#   times.i8    epoch microseconds        offsets.i8  byte offset of each line
+#   hosts.i4    code into meta["hosts"]   procs.i4    code into meta["procs"]
+#   pids.i4     pid, -1 when absent
+#   sorted.i8   times in ascending order  order.i8    row of each sorted time
+# Columns are memory-mapped for queries and only appended to when the log grows; the sorted
+# pair is appended too when the new lines all come after the indexed ones (the usual case
+# for a log) and merged otherwise.
+
+CHUNK_SIZE = 1 << 26
+LINE_BLOCK = 1 << 16  # rows whose offsets are looked up at once when fetching lines
+HEAD_BYTES = 4096  # a log whose first bytes changed was replaced or rotated: rebuild
+COLUMNS = {"times": "<i8", "offsets": "<i8", "hosts": "<i4", "procs": "<i4", "pids": "<i4"}
+SORTED = {"sorted": "<i8", "order": "<i8"}
+
+# process token: name, then an optional [pid], then the colon
+PROCESS = re.compile(rb"(.*?)(?:\[(\d+)\])?:?$")
+# "YYYY-MM-DDTHH:MM:SS.ffffff+HH:MM", the form rsyslog writes, is decoded column-wise
+FIXED_STAMP = 32
+SEPARATORS = {4: b"-", 7: b"-", 10: b"T", 13: b":", 16: b":", 19: b".", 29: b":"}
+
+
+def days_from_civil(y, m, d):
+    """Days since 1970-01-01 of a proleptic Gregorian date, on numpy arrays."""
+    y = y - (m <= 2)
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * (m + np.where(m > 2, -3, 9)) + 2) // 5 + d - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+def parse_times(stamps: list) -> np.ndarray:
+    """Epoch microseconds for a list of timestamp tokens; -1 where one doesn't parse."""
+    out = np.full(len(stamps), -1, dtype=np.int64)
+    if not stamps:
+        return out
+    raw = np.array(stamps, dtype=f"S{FIXED_STAMP}")
+    chars = raw.view(np.uint8).reshape(len(stamps), FIXED_STAMP).astype(np.int64)
+    fixed = np.fromiter((len(s) == FIXED_STAMP for s in stamps), bool, len(stamps))
+    for pos, sep in SEPARATORS.items():
+        fixed &= chars[:, pos] == sep[0]
+    fixed &= (chars[:, 26] == ord("+")) | (chars[:, 26] == ord("-"))
+    digits = chars - ord("0")
+
+    def number(start, end):
+        value = np.zeros(len(stamps), dtype=np.int64)
+        for i in range(start, end):
+            value = value * 10 + digits[:, i]
+        return value
+
+    days = days_from_civil(number(0, 4), number(5, 7), number(8, 10))
+    seconds = days * 86400 + number(11, 13) * 3600 + number(14, 16) * 60 + number(17, 19)
+    offset = (number(27, 29) * 3600 + number(30, 32) * 60) * np.where(chars[:, 26] == ord("-"), -1, 1)
+    out[fixed] = ((seconds - offset) * 1_000_000 + number(20, 26))[fixed]
+    for i in np.flatnonzero(~fixed):
+        out[i] = parse_time(stamps[i].decode("ascii", errors="replace"))
+    return out
+
+
+def parse_time(text: str, default_date=None) -> int:
+    """Epoch microseconds of an ISO 8601 / RFC 3339 time (naive means UTC); a bare
+    HH:MM[:SS] is taken on default_date. -1 if it doesn't parse."""
+    try:
+        if default_date is not None and re.fullmatch(r"\d{1,2}:\d{2}(:\d{2}(\.\d+)?)?", text):
+            text = f"{default_date}T{text}"
+        when = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        return -1
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    delta = when - datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def format_time(micros: int) -> str:
+    return datetime.fromtimestamp(micros / 1e6, timezone.utc).isoformat()
+
+
+class LogIndex:
+    def __init__(self, log_path, index_dir=None):
+        self.log_path = log_path
+        self.dir = index_dir or f"{log_path}.idx"
+        self.meta = {"size": 0, "head": "", "hosts": [], "procs": [], "rows": 0}
+        meta_path = os.path.join(self.dir, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+        self.codes = {kind: {name: i for i, name in enumerate(self.meta[kind])} for kind in ("hosts", "procs")}
+
+    def path(self, column: str) -> str:
+        return os.path.join(self.dir, f"{column}.{(COLUMNS | SORTED)[column][1:]}")
+
+    def column(self, name: str) -> np.ndarray:
+        dtype = (COLUMNS | SORTED)[name]
+        if not self.meta["rows"]:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self.path(name), dtype=dtype, mode="r", shape=(self.meta["rows"],))
+
+    def head(self) -> str:
+        with open(self.log_path, "rb") as f:
+            return f.read(HEAD_BYTES).hex()
+
+    def code(self, kind: str, name: str) -> int:
+        codes = self.codes[kind]
+        if name not in codes:
+            codes[name] = len(self.meta[kind])
+            self.meta[kind].append(name)
+        return codes[name]
+
+    def parse(self, data: bytes, base: int, last_time: int):
+        """Columns for the complete lines in data, which starts at file offset base. Lines
+        without a timestamp (continuations) take the time of the line before them."""
+        lines = data.split(b"\n")[:-1]
+        starts = np.zeros(len(lines), dtype=np.int64)
+        if lines:
+            np.cumsum([len(line) + 1 for line in lines[:-1]], out=starts[1:])
+        stamps, hosts, procs, pids = [], [], [], []
+        host_code, proc_code = self.code, self.code
+        for line in lines:
+            parts = line.split(b" ", 3)
+            stamps.append(parts[0][:64])
+            if len(parts) < 3:
+                hosts.append(-1)
+                procs.append(-1)
+                pids.append(-1)
+                continue
+            hosts.append(host_code("hosts", parts[1].decode("utf-8", errors="replace")))
+            name, pid = PROCESS.match(parts[2]).groups()
+            procs.append(proc_code("procs", name.decode("utf-8", errors="replace")))
+            pids.append(int(pid) if pid else -1)
+        times = parse_times(stamps)
+        # carry the last good time forward over lines that have none
+        bad = times < 0
+        if bad.any():
+            good = np.where(bad, 0, np.arange(len(times)))
+            np.maximum.accumulate(good, out=good)
+            filled = np.where(bad[good], last_time, times[good])
+            times = np.where(bad, filled, times)
+        return {"times": times, "offsets": starts + base, "hosts": np.array(hosts, dtype=np.int32),
+                "procs": np.array(procs, dtype=np.int32), "pids": np.array(pids, dtype=np.int32)}
+
+    def append_sorted(self, times: np.ndarray, first_row: int):
+        order = np.argsort(times, kind="stable")
+        new_sorted, new_order = times[order], order + first_row
+        old_sorted = self.column("sorted")
+        if not len(old_sorted) or new_sorted[0] >= old_sorted[-1]:
+            with open(self.path("sorted"), "ab") as f:
+                f.write(new_sorted.astype("<i8").tobytes())
+            with open(self.path("order"), "ab") as f:
+                f.write(new_order.astype("<i8").tobytes())
+            return
+        # out-of-order lines: merge into the sorted pair and rewrite it
+        at = np.searchsorted(old_sorted, new_sorted, side="right")
+        merged_sorted = np.insert(np.asarray(old_sorted), at, new_sorted)
+        merged_order = np.insert(np.asarray(self.column("order")), at, new_order)
+        del old_sorted
+        for name, values in (("sorted", merged_sorted), ("order", merged_order)):
+            tmp = self.path(name) + ".tmp"
+            values.astype("<i8").tofile(tmp)
+            os.replace(tmp, self.path(name))
+
+    def update(self) -> int:
+        """Index whatever the log gained since the last update; returns the rows added."""
+        size = os.path.getsize(self.log_path)
+        head = self.head()
+        if size < self.meta["size"] or not head.startswith(self.meta["head"][:len(head)]) or \
+                (self.meta["size"] and not self.meta["head"]):
+            self.meta = {"size": 0, "head": "", "hosts": [], "procs": [], "rows": 0}
+            self.codes = {"hosts": {}, "procs": {}}
+        os.makedirs(self.dir, exist_ok=True)
+        if not self.meta["rows"]:
+            for name in COLUMNS | SORTED:
+                open(self.path(name), "wb").close()
+        added = 0
+        with open(self.log_path, "rb") as log:
+            log.seek(self.meta["size"])
+            while chunk := log.read(CHUNK_SIZE):
+                end = chunk.rfind(b"\n") + 1
+                if not end:
+                    if len(chunk) == CHUNK_SIZE:
+                        raise ValueError(f"line longer than {CHUNK_SIZE} bytes at offset {self.meta['size']}")
+                    break  # an unterminated last line waits for its newline
+                log.seek(self.meta["size"] + end)
+                last_time = int(self.column("times")[-1]) if self.meta["rows"] else 0
+                columns = self.parse(chunk[:end], self.meta["size"], last_time)
+                for name, values in columns.items():
+                    with open(self.path(name), "ab") as f:
+                        f.write(values.astype(COLUMNS[name]).tobytes())
+                self.append_sorted(columns["times"], self.meta["rows"])
+                rows = len(columns["times"])
+                self.meta["rows"] += rows
+                self.meta["size"] += end
+                added += rows
+        self.meta["head"] = head[:self.meta["size"] * 2]
+        tmp = os.path.join(self.dir, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, os.path.join(self.dir, "meta.json"))
+        return added
+
+    def query(self, since: int = None, until: int = None, host: str = None, process: str = None, pid: int = None):
+        """Rows in time order with since <= time < until, narrowed by host, process and pid."""
+        sorted_times = self.column("sorted")
+        lo = np.searchsorted(sorted_times, since, side="left") if since is not None else 0
+        hi = np.searchsorted(sorted_times, until, side="left") if until is not None else len(sorted_times)
+        rows = np.asarray(self.column("order")[lo:hi])
+        for kind, value in (("hosts", host), ("procs", process)):
+            if value is not None:
+                code = self.codes[kind].get(value)
+                if code is None:
+                    return rows[:0]
+                rows = rows[self.column(kind)[rows] == code]
+        if pid is not None:
+            rows = rows[self.column("pids")[rows] == pid]
+        return rows
+
+    def lines(self, rows, pattern: bytes = None):
+        """Yield (row, line) for the rows, read from the mmap'd log; with a pattern only the
+        lines it matches."""
+        if not len(rows):
+            return
+        regex = re.compile(pattern) if pattern else None
+        offsets = np.asarray(self.column("offsets"))
+        last = len(offsets) - 1
+        with open(self.log_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for block in range(0, len(rows), LINE_BLOCK):
+                chunk = np.asarray(rows[block:block + LINE_BLOCK])
+                # a line ends where the next one starts, the last one at the indexed size
+                ends = np.where(chunk < last, offsets[np.minimum(chunk + 1, last)], self.meta["size"]) - 1
+                for row, start, end in zip(chunk.tolist(), offsets[chunk].tolist(), ends.tolist()):
+                    line = mm[start:end]
+                    if regex is None or regex.search(line):
+                        yield row, line
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Index an RFC 3339 syslog/auth.log once, then query it by time, host, process and regex.")
+    parser.add_argument("log", help="Log file; its index lives in <log>.idx and is brought up to date on every run")
+    parser.add_argument("-i", "--index", help="Index directory (Default: <log>.idx)")
+    parser.add_argument("--since", help="Start time, inclusive: RFC 3339, or HH:MM[:SS] on the log's first day (UTC)")
+    parser.add_argument("--until", help="End time, exclusive, same forms as --since")
+    parser.add_argument("--host", help="Only lines from this host")
+    parser.add_argument("-p", "--process", help="Only lines from this process name (e.g. sshd, CRON, kernel)")
+    parser.add_argument("--pid", type=int, help="Only lines from this pid")
+    parser.add_argument("-e", "--regex", help="Only lines matching this regular expression")
+    parser.add_argument("-c", "--count", action="store_true", help="Print the number of matching lines instead")
+    parser.add_argument("--stats", action="store_true", help="Print the index summary and exit")
+    args = parser.parse_args()
+
+    index = LogIndex(args.log, args.index)
+    added = index.update()
+    if added:
+        print(f"[+] indexed {added} new lines ({index.meta['rows']} total) in {index.dir}", file=sys.stderr)
+    if args.stats:
+        times = index.column("sorted")
+        print(f"lines      {index.meta['rows']}")
+        if len(times):
+            print(f"first      {format_time(int(times[0]))}\nlast       {format_time(int(times[-1]))}")
+        procs = np.bincount(index.column("procs")[index.column("procs") >= 0], minlength=len(index.meta["procs"]))
+        print(f"hosts      {', '.join(index.meta['hosts'])}")
+        for code in np.argsort(procs)[::-1][:20]:
+            print(f"{procs[code]:>10} {index.meta['procs'][code]}")
+        sys.exit(0)
+
+    first_day = format_time(int(index.column("sorted")[0]))[:10] if index.meta["rows"] else None
+    bounds = []
+    for text in (args.since, args.until):
+        value = parse_time(text, first_day) if text else None
+        if value == -1:
+            parser.error(f"can't parse time {text!r}")
+        bounds.append(value)
+    rows = index.query(*bounds, host=args.host, process=args.process, pid=args.pid)
+    matches = index.lines(rows, args.regex.encode() if args.regex else None)
+    if args.count:
+        print(sum(1 for _ in matches) if args.regex else len(rows))
+    else:
+        out = sys.stdout.buffer
+        for _, line in matches:
+            out.write(line + b"\n")
@@ -0,0 +1,404 @@
+"""
+Super-timeline builder
+----------------------
+
+Merges the host artifacts into one timeline in the columns of
+`csf2425-lab2-template-timeline.xlsx` (Event #, Epoch Time, Timestamp, Description,
+Source, and an empty Notes), written as .xlsx or .csv.
+
+- Every source is a lazy generator of Events in time order, recognised by its content:
+  RFC 3339 logs (syslog, auth.log; read through their log_index.py index), apt's
+  history.log, recently-used.xbel, webhistory.txt (places.sqlite export), irssi logs and,
+  from lab 3, the IRC TCP stream exports (irc_timeline.py) and ChatGPT captures
+  (chatgpt_responses.py). bash_history.txt has no timestamps and is not a source.
+- The generators are merged by (UTC time, source, line) with a heap, so memory does not
+  grow with the number of events; the few small sources that aren't stored in order
+  (xbel, webhistory, ChatGPT) are sorted inside their generator.
+- The .xlsx is streamed straight into the zip with inline strings, one worksheet per
+  1,048,576 rows, instead of being built in memory by a spreadsheet library.
+
+    python3 super_timeline.py                                 # lab 2 artifacts -> timeline.xlsx
+    python3 super_timeline.py syslog auth.log ../../3/discoveries/chat.freenode.net/t*.txt -o t.csv
+"""
+
+import csv
+import heapq
+import importlib
+import io
+import re
+import sys
+import zipfile
+from argparse import ArgumentParser
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from glob import glob
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import unquote
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from log_index import LogIndex, parse_time
+
+SOURCES = ["syslog", "auth.log", "history.log", "recently-used.xbel", "webhistory.txt", "#*.log"]
+LAB3_SCRIPTS = Path(__file__).resolve().parents[2] / "3" / "scripts"
+TITLE = "Digital Forensics Timeline Lab2"
+HEADERS = ["Event #", "Epoch Time (optional)", "Timestamp", "Description", "Source", "Notes:"]
+WIDTHS = [8.66, 24.33, 24.33, 47.11, 36.44, 8.66]  # the template's column widths
+SHEET_ROWS = 1048576  # Excel's row limit
+CELL_CHARS = 32767  # Excel's cell text limit
+EXCEL_EPOCH = 25569  # serial day number of 1970-01-01
+PACKAGES_SHOWN = 3
+
+XBEL_NS = "{http://www.freedesktop.org/standards/desktop-bookmarks}"
+APT_ACTIONS = ("Install", "Upgrade", "Remove", "Purge", "Downgrade", "Reinstall")
+APT_PACKAGE = re.compile(r"(?:^|\), )([^ :(]+)")
+WEB_LINE = re.compile(rb"\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\|")
+RFC3339_LINE = re.compile(rb"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d")
+IRC_LINE = re.compile(rb"^(?:CAP LS|NICK |(?:@\S+ )?:\S+ (?:NOTICE|PRIVMSG|JOIN|\d{3}) )", re.M)
+IRSSI_LINE = re.compile(r"(\d\d):(\d\d) (?:< ?[@+]?([^>]+)> (.*)|-!- (.*)|\* (.*))")
+IRSSI_DATE = re.compile(r"--- (?:Log opened|Day changed) \w+ (\w+ +\d+)(?: (\d\d:\d\d:\d\d))? (\d{4})")
+# characters XML 1.0 can't carry, and the ones it needs escaped
+XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+XML_SPECIAL = re.compile("[&<>\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+
+class Event(NamedTuple):
+    time: int  # epoch microseconds, UTC
+    source: int
+    seq: int
+    description: str
+    origin: str  # the Source column: the artifact's file name
+
+
+def local_time(text: str, fmt: str, utc_offset: float) -> int:
+    """Epoch microseconds of a local time string, the host clock being utc_offset hours ahead of UTC."""
+    when = datetime.strptime(text, fmt).replace(tzinfo=timezone(timedelta(hours=utc_offset)))
+    return int(when.timestamp()) * 1_000_000 + when.microsecond
+
+
+def syslog_events(path, source: int, since=None, until=None, **_):
+    """'process[pid]: message' per line, in time order from the log's index."""
+    origin = Path(path).name
+    index = LogIndex(path)
+    index.update()
+    times = np.asarray(index.column("times"))
+    for seq, (row, line) in enumerate(index.lines(index.query(since, until))):
+        parts = line.decode("utf-8", errors="replace").split(" ", 2)
+        yield Event(int(times[row]), source, seq, parts[-1], origin)
+
+
+def apt_events(path, source: int, utc_offset: float = 0, **_):
+    """One event per apt run: its command line, who ran it and the packages it changed."""
+    origin = Path(path).name
+    seq = 0
+    entry = {}
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            key, sep, value = line.partition(": ")
+            if sep:
+                entry[key] = value.strip()
+            if key != "End-Date" or "Start-Date" not in entry:
+                continue
+            changes = []
+            for action in APT_ACTIONS:
+                if action in entry:
+                    names = APT_PACKAGE.findall(entry[action])
+                    more = f" +{len(names) - PACKAGES_SHOWN}" if len(names) > PACKAGES_SHOWN else ""
+                    changes.append(f"{action} {len(names)}: {', '.join(names[:PACKAGES_SHOWN])}{more}")
+            description = entry.get("Commandline", "apt")
+            if "Requested-By" in entry:
+                description += f" (by {entry['Requested-By']})"
+            if changes:
+                description += " - " + "; ".join(changes)
+            yield Event(local_time(" ".join(entry["Start-Date"].split()), "%Y-%m-%d %H:%M:%S", utc_offset),
+                        source, seq, description, origin)
+            seq += 1
+            entry = {}
+
+
+def xbel_events(path, source: int, **_):
+    """When each recently used file was first recorded and last opened by each application."""
+    events = []
+    for _, element in ElementTree.iterparse(path):
+        if element.tag != "bookmark":
+            continue
+        href = unquote(element.get("href", "")).removeprefix("file://")
+        if element.get("added"):
+            events.append((parse_time(element.get("added")), f"Recently used: {href} added"))
+        for app in element.iter(f"{XBEL_NS}application"):
+            if app.get("modified"):
+                count = app.get("count", "1")
+                events.append((parse_time(app.get("modified")),
+                               f"Recently used: {href} opened with {app.get('name')} ({count}x)"))
+        element.clear()
+    for seq, (time, description) in enumerate(sorted(events)):
+        yield Event(time, source, seq, description, Path(path).name)
+
+
+def web_events(path, source: int, utc_offset: float = 0, **_):
+    """'time|url|title|visit count' lines, newest first in the export."""
+    events = []
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("|", 2)
+            if len(fields) < 3:
+                continue
+            title, _, visits = fields[2].rpartition("|")
+            description = f"Visited {fields[1]}" + (f" ({title})" if title else "") + (f" [{visits} visits]" if visits not in ("", "1") else "")
+            events.append((local_time(fields[0], "%Y-%m-%d %H:%M:%S", utc_offset), description))
+    for seq, (time, description) in enumerate(sorted(events)):
+        yield Event(time, source, seq, description, Path(path).name)
+
+
+def irssi_events(path, source: int, utc_offset: float = 0, **_):
+    """Messages and channel events of an irssi log, at its minute precision."""
+    origin = Path(path).name
+    day = None
+    last = 0
+    seq = 0
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            m = IRSSI_DATE.match(line)
+            if m:
+                month_day, clock, year = m.groups()
+                day = f"{' '.join(month_day.split())} {year}"
+                if clock:
+                    last = max(last, local_time(f"{day} {clock}", "%b %d %Y %H:%M:%S", utc_offset))
+                continue
+            m = IRSSI_LINE.match(line.rstrip("\n"))
+            if not m or day is None:
+                continue
+            hour, minute, nick, text, notice, action = m.groups()
+            if notice is not None and notice.startswith("Irssi:"):
+                continue
+            description = f"{nick.strip()}: {text.rstrip()}" if nick else notice or f"* {action}"
+            # minute stamps can't go back before the "Log opened" second they follow
+            last = max(last, local_time(f"{day} {hour}:{minute}", "%b %d %Y %H:%M", utc_offset))
+            yield Event(last, source, seq, description, origin)
+            seq += 1
+
+
+def lab3(module: str):
+    if str(LAB3_SCRIPTS) not in sys.path:
+        sys.path.append(str(LAB3_SCRIPTS))
+    return importlib.import_module(module)
+
+
+def irc_events(path, source: int, **_):
+    """Messages and channel events of an IRC TCP stream export, by server time."""
+    irc = lab3("irc_timeline")
+    for event in irc.iter_events(path, source):
+        if event.kind == "END" or not event.time:
+            continue
+        where = f"{event.target} " if event.kind == "PRIVMSG" else ""
+        yield Event(parse_time(event.time), source, event.seq, where + irc.event_line(event), Path(path).name)
+
+
+def chatgpt_events(path, source: int, **_):
+    """The prompts and the start of each answer in a ChatGPT capture, by message create_time."""
+    engine = lab3("chatgpt_responses")
+    events = {}
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for event in engine.iter_data_events(f):
+            v = event.get("v") if isinstance(event, dict) else None
+            message = v.get("message") if isinstance(v, dict) else None
+            if not isinstance(message, dict) or not message.get("create_time") or message["id"] in events:
+                continue
+            role = message.get("author", {}).get("role")
+            content = message.get("content", {})
+            if role == "user":
+                text = " ".join(p for p in content.get("parts") or [] if isinstance(p, str))
+                events[message["id"]] = (message["create_time"], f"ChatGPT prompt: {text}")
+            elif role == "assistant" and content.get("content_type") == "text":
+                model = message.get("metadata", {}).get("model_slug")
+                events[message["id"]] = (message["create_time"], "ChatGPT answer" + (f" ({model})" if model else ""))
+    for seq, (time, description) in enumerate(sorted(events.values())):
+        yield Event(round(time * 1_000_000), source, seq, description, Path(path).name)
+
+
+def source_kind(path):
+    """Which generator reads path, from its first bytes; None if it isn't a known artifact."""
+    with open(path, "rb") as f:
+        head = f.read(4096)
+    if b"<xbel" in head:
+        return xbel_events
+    if head.lstrip().startswith(b"Start-Date:"):
+        return apt_events
+    if head.startswith(b"--- Log opened"):
+        return irssi_events
+    if head.startswith(b"PRI * HTTP/2.0"):
+        return chatgpt_events
+    if WEB_LINE.match(head):
+        return web_events
+    if RFC3339_LINE.match(head):
+        return syslog_events
+    if IRC_LINE.search(head):
+        return irc_events
+    return None
+
+
+def merge_sources(paths, since=None, until=None, utc_offset: float = 0):
+    """k-way merge of every source's events by (time, source, line) within [since, until)."""
+    streams = []
+    for i, path in enumerate(paths):
+        kind = source_kind(path)
+        if kind is None:
+            print(f"[-] {path}: not a known artifact, skipped", file=sys.stderr)
+            continue
+        streams.append(kind(path, i, since=since, until=until, utc_offset=utc_offset))
+    for event in heapq.merge(*streams):
+        if until is not None and event.time >= until:
+            break
+        if since is None or event.time >= since:
+            yield event
+
+
+def cell_text(value: str) -> str:
+    value = value[:CELL_CHARS]
+    if not XML_SPECIAL.search(value):
+        return value
+    return escape(XML_INVALID.sub("", value))
+
+
+class XlsxWriter:
+    """Write-only .xlsx in the template's layout: a title row, the header row, then one row per event."""
+
+    def __init__(self, path, title: str = TITLE, sheet_name: str = "Timeline"):
+        self.zip = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=1)
+        self.title = title
+        self.sheet_name = sheet_name
+        self.sheets = 0
+        self.sheet = None
+        self.row = SHEET_ROWS
+
+    def new_sheet(self):
+        self.close_sheet()
+        self.sheets += 1
+        entry = self.zip.open(f"xl/worksheets/sheet{self.sheets}.xml", "w", force_zip64=True)
+        self.sheet = io.TextIOWrapper(entry, encoding="utf-8")
+        cols = "".join(f'<col min="{i}" max="{i}" width="{w}" customWidth="1"/>' for i, w in enumerate(WIDTHS, 1))
+        self.sheet.write(
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            '<sheetViews><sheetView workbookViewId="0"><pane ySplit="2" topLeftCell="A3" activePane="bottomLeft" state="frozen"/>'
+            f'</sheetView></sheetViews><cols>{cols}</cols><sheetData>'
+            f'<row r="1"><c r="A1" t="inlineStr" s="2"><is><t>{cell_text(self.title)}</t></is></c></row><row r="2">'
+            + "".join(f'<c r="{col}2" t="inlineStr" s="2"><is><t>{cell_text(h)}</t></is></c>' for col, h in zip("ABCDEF", HEADERS))
+            + "</row>")
+        self.row = 2
+
+    def close_sheet(self):
+        if self.sheet is not None:
+            self.sheet.write("</sheetData></worksheet>")
+            self.sheet.close()
+            self.sheet = None
+
+    def write(self, number: int, event: Event):
+        if self.row >= SHEET_ROWS:
+            self.new_sheet()
+        self.row += 1
+        r = self.row
+        seconds = event.time / 1e6
+        self.sheet.write(
+            f'<row r="{r}"><c r="A{r}" t="inlineStr"><is><t>E{number}</t></is></c>'
+            f'<c r="B{r}"><v>{seconds:.6f}</v></c>'
+            f'<c r="C{r}" s="1"><v>{EXCEL_EPOCH + seconds / 86400!r}</v></c>'
+            f'<c r="D{r}" t="inlineStr"><is><t xml:space="preserve">{cell_text(event.description)}</t></is></c>'
+            f'<c r="E{r}" t="inlineStr"><is><t>{cell_text(event.origin)}</t></is></c></row>')
+
+    def close(self):
+        if not self.sheets:
+            self.new_sheet()
+        self.close_sheet()
+        sheets = range(1, self.sheets + 1)
+        names = [self.sheet_name if i == 1 else f"{self.sheet_name} ({i})" for i in sheets]
+        ns = "http://schemas.openxmlformats.org/"
+        self.zip.writestr("[Content_Types].xml",
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<Types xmlns="{ns}package/2006/content-types">'
+            f'<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            f'<Default Extension="xml" ContentType="application/xml"/>'
+            f'<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            f'<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            + "".join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>' for i in sheets)
+            + "</Types>")
+        self.zip.writestr("_rels/.rels",
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<Relationships xmlns="{ns}package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{ns}officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/></Relationships>')
+        self.zip.writestr("xl/workbook.xml",
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<workbook xmlns="{ns}spreadsheetml/2006/main" '
+            f'xmlns:r="{ns}officeDocument/2006/relationships"><sheets>'
+            + "".join(f'<sheet name="{escape(name)}" sheetId="{i}" r:id="rId{i}"/>' for i, name in zip(sheets, names))
+            + "</sheets></workbook>")
+        self.zip.writestr("xl/_rels/workbook.xml.rels",
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<Relationships xmlns="{ns}package/2006/relationships">'
+            + "".join(f'<Relationship Id="rId{i}" Type="{ns}officeDocument/2006/relationships/worksheet" Target="worksheets/sheet{i}.xml"/>' for i in sheets)
+            + f'<Relationship Id="rId{self.sheets + 1}" Type="{ns}officeDocument/2006/relationships/styles" Target="styles.xml"/></Relationships>')
+        # cell styles: 0 plain, 1 date and time, 2 bold (title and header)
+        self.zip.writestr("xl/styles.xml",
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<styleSheet xmlns="{ns}spreadsheetml/2006/main">'
+            '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy\\-mm\\-dd\\ hh:mm:ss"/></numFmts>'
+            '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+            '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+            '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+            '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+            '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+            '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+            '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles></styleSheet>')
+        self.zip.close()
+
+
+@lru_cache(maxsize=4096)
+def utc_second(seconds: int) -> str:
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+class CsvWriter:
+    """The same columns as CSV, with ISO 8601 UTC timestamps."""
+
+    def __init__(self, path, **_):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.csv = csv.writer(self.file)
+        self.csv.writerow(HEADERS)
+
+    def write(self, number: int, event: Event):
+        timestamp = f"{utc_second(event.time // 1_000_000)}.{event.time % 1_000_000:06d}+00:00"
+        self.csv.writerow([f"E{number}", f"{event.time / 1e6:.6f}", timestamp, event.description, event.origin, ""])
+
+    def close(self):
+        self.file.close()
+
+
+def write_timeline(events, writer) -> int:
+    count = 0
+    try:
+        for count, event in enumerate(events, 1):
+            writer.write(count, event)
+    finally:
+        writer.close()
+    return count
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Merge host artifacts into one timeline in the lab template's columns.")
+    parser.add_argument("sources", nargs="*", help=f"Artifacts, recognised by content (Default: {' '.join(SOURCES)})")
+    parser.add_argument("-o", "--output", default="timeline.xlsx", help="Output .xlsx or .csv (Default: timeline.xlsx)")
+    parser.add_argument("-t", "--title", default=TITLE, help=f"Title row of the .xlsx (Default: {TITLE})")
+    parser.add_argument("--since", help="Only events from this RFC 3339 time on")
+    parser.add_argument("--until", help="Only events before this RFC 3339 time")
+    parser.add_argument("--utc-offset", type=float, default=0, help="Hours the host clock was ahead of UTC, for the artifacts stamped in local time (Default: 0)")
+    args = parser.parse_args()
+
+    paths = args.sources or [p for pattern in SOURCES for p in sorted(glob(pattern))]
+    bounds = []
+    for text in (args.since, args.until):
+        value = parse_time(text) if text else None
+        if value == -1:
+            parser.error(f"can't parse time {text!r}")
+        bounds.append(value)
+    Writer = CsvWriter if args.output.lower().endswith(".csv") else XlsxWriter
+    count = write_timeline(merge_sources(paths, *bounds, args.utc_offset), Writer(args.output, title=args.title))
+    print(f"[+] {count} events from {len(paths)} sources -> {args.output}")
@@ -0,0 +1,74 @@
+import os
+
+import log_index
+from log_index import LogIndex, parse_time
+
+LINES = [
+    b"2025-09-18T10:00:00.000001+00:00 host-a sshd[100]: Accepted password for root",
+    b"2025-09-18T10:00:01.500000+00:00 host-a CRON[7]: (root) CMD (backup.sh)",
+    b"    continuation without a timestamp",
+    b"2025-09-18T12:00:02.000000+02:00 host-b sshd[101]: Failed password for admin",
+    b"2025-09-18T10:00:03Z host-b kernel: eth0 link up",
+]
+
+
+def write_log(path, lines, mode="wb"):
+    with open(path, mode) as f:
+        f.write(b"".join(line + b"\n" for line in lines))
+
+
+def new_index(tmp_path, lines):
+    log = tmp_path / "syslog"
+    write_log(log, lines)
+    index = LogIndex(str(log))
+    index.update()
+    return index
+
+
+def test_parse_times_matches_parse_time():
+    stamps = [line.split(b" ")[0] for line in LINES]
+    expected = [parse_time(s.decode()) for s in stamps]
+    assert log_index.parse_times(stamps).tolist() == expected
+    assert expected[2] == -1 and expected[3] == parse_time("2025-09-18T10:00:02")
+
+
+def test_query_by_time_host_process_and_pid(tmp_path):
+    index = new_index(tmp_path, LINES)
+    ten = parse_time("2025-09-18T10:00:00")
+
+    assert index.query().tolist() == [0, 1, 2, 3, 4]
+    assert index.query(since=ten + 1_000_000, until=ten + 3_000_000).tolist() == [1, 2, 3]
+    assert index.query(host="host-b").tolist() == [3, 4]
+    assert index.query(process="sshd").tolist() == [0, 3]
+    assert index.query(process="sshd", pid=101).tolist() == [3]
+    assert index.query(host="nowhere").tolist() == []
+    # the continuation line takes the time of the line before it
+    assert int(index.column("times")[2]) == int(index.column("times")[1])
+
+
+def test_lines_with_pattern(tmp_path):
+    index = new_index(tmp_path, LINES)
+    assert list(index.lines(index.query(), rb"password for")) == [(0, LINES[0]), (3, LINES[3])]
+    assert [line for _, line in index.lines(index.query())] == LINES
+
+
+def test_incremental_update_out_of_order_and_partial_line(tmp_path):
+    index = new_index(tmp_path, LINES)
+    log = tmp_path / "syslog"
+    early = b"2025-09-18T09:59:59.000000+00:00 host-a sshd[99]: Server listening"
+    write_log(log, [early], "ab")
+    with open(log, "ab") as f:
+        f.write(b"2025-09-18T10:00:04.000000+00:00 host-a sshd[1")  # still being written
+
+    index = LogIndex(str(log))  # reopened from the index on disk
+    assert index.update() == 1
+    assert index.query().tolist() == [5, 0, 1, 2, 3, 4]
+    assert list(index.lines([5])) == [(5, early)]
+    assert index.meta["size"] == os.path.getsize(log) - len(b"2025-09-18T10:00:04.000000+00:00 host-a sshd[1")
+
+
+def test_rewritten_log_is_reindexed(tmp_path):
+    index = new_index(tmp_path, LINES)
+    write_log(tmp_path / "syslog", LINES[3:])  # rotated: different head, smaller
+    assert index.update() == 2
+    assert [line for _, line in index.lines(index.query())] == LINES[3:]
@@ -0,0 +1,217 @@
+"""
+Hash manifest verifier
+----------------------
+
+`sha256sum -c` for every evidence manifest at once. The manifests (sha256*.txt,
+*_hashes.txt, *sha256*.txt) are found in the given directories and parsed (GNU
+`<digest>  <file>` / `<digest> *<file>` and BSD `SHA256 (<file>) = <digest>` lines, the
+algorithm following from the digest length); paths are relative to the manifest, as
+when `sha256sum -c` is run next to it.
+
+- Every file is hashed once however many manifests list it, by a pool of threads
+  reading 4 MiB blocks (hashlib releases the GIL while it hashes them).
+- Digests are cached by (device, inode, size, mtime), so evidence that hasn't changed is
+  not read again on the next run; any write to a file changes its key.
+- The result is a JSON report of every failed entry (mismatch or missing file) plus
+  totals; the exit status is 1 when anything failed, as with `sha256sum -c`.
+
+    python3 verify_hashes.py                       # manifests in this directory
+    python3 verify_hashes.py -r /mnt/evidence -j 8 -o report.json
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+MANIFESTS = ["sha256*.txt", "*_hashes.txt", "*sha256*.txt"]
+CACHE = ".hash_cache.json"
+BLOCK_SIZE = 1 << 22
+ALGORITHMS = {32: "md5", 40: "sha1", 56: "sha224", 64: "sha256", 96: "sha384", 128: "sha512"}
+
+GNU_LINE = re.compile(r"\\?([0-9a-fA-F]{32,128}) [ *](.+)")
+BSD_LINE = re.compile(r"\\?(MD5|SHA1|SHA224|SHA256|SHA384|SHA512) ?\((.+)\) ?= ?([0-9a-fA-F]{32,128})")
+
+
+class Entry(NamedTuple):
+    manifest: str
+    line: int
+    path: str  # as written in the manifest
+    file: str  # resolved against the manifest's directory
+    algorithm: str
+    expected: str
+
+
+def find_manifests(directories, recursive: bool = False) -> list:
+    found = set()
+    for directory in directories:
+        for pattern in MANIFESTS:
+            found.update((Path(directory).rglob if recursive else Path(directory).glob)(pattern))
+    return sorted(p for p in found if p.is_file())
+
+
+def unescape(name: str) -> str:
+    # sha256sum escapes '\' and newlines in names (and flags the line with a leading '\')
+    return re.sub(r"\\(.)", lambda m: "\n" if m.group(1) == "n" else m.group(1), name)
+
+
+def parse_manifest(manifest: Path) -> tuple:
+    """(entries, lines that aren't checksum lines) of one manifest."""
+    entries, malformed = [], []
+    with open(manifest, "r", encoding="utf-8", errors="replace") as f:
+        for number, line in enumerate(f, 1):
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.startswith("#"):
+                continue
+            m = GNU_LINE.fullmatch(line)
+            if m and len(m.group(1)) in ALGORITHMS:
+                digest, name = m.groups()
+                algorithm = ALGORITHMS[len(digest)]
+            else:
+                m = BSD_LINE.fullmatch(line)
+                if not m or ALGORITHMS.get(len(m.group(3))) != m.group(1).lower():
+                    malformed.append(number)
+                    continue
+                algorithm, name, digest = m.group(1).lower(), m.group(2), m.group(3)
+            if line.startswith("\\"):
+                name = unescape(name)
+            file = os.path.normpath(os.path.join(manifest.parent, name))
+            entries.append(Entry(str(manifest), number, name, file, algorithm, digest.lower()))
+    return entries, malformed
+
+
+def file_key(stat: os.stat_result) -> str:
+    return f"{stat.st_dev}:{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def digest_file(path: str, algorithms) -> dict:
+    """Digests of one file for each algorithm, from a single read."""
+    hashes = [hashlib.new(a) for a in algorithms]
+    buffer = bytearray(BLOCK_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while n := f.readinto(buffer):
+            for h in hashes:
+                h.update(view[:n])
+    return {a: h.hexdigest() for a, h in zip(algorithms, hashes)}
+
+
+def load_cache(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(path: Path, cache: dict):
+    # written aside and renamed, so an interrupted save never leaves half a cache
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(cache))
+    os.replace(tmp, path)
+
+
+def verify(manifests, cache: dict, jobs: int = None, ignore_missing: bool = False) -> dict:
+    """Check every entry of the manifests, updating cache; returns the report."""
+    start = time.perf_counter()
+    entries, malformed = [], []
+    for manifest in manifests:
+        found, bad = parse_manifest(manifest)
+        entries.extend(found)
+        malformed.extend({"manifest": str(manifest), "line": n} for n in bad)
+
+    # what each distinct file needs, and which of it the cache already answers
+    needed = {}
+    for entry in entries:
+        needed.setdefault(entry.file, set()).add(entry.algorithm)
+    digests, errors, work = {}, {}, []
+    for file, algorithms in needed.items():
+        try:
+            stat = os.stat(file)
+        except OSError as e:
+            errors[file] = e
+            continue
+        key = file_key(stat)
+        digests[file] = cache.get(key, {})
+        missing = sorted(algorithms - digests[file].keys())
+        if missing:
+            work.append((file, key, missing, stat.st_size))
+
+    # biggest first, so one large image doesn't start last and hold up the end
+    work.sort(key=lambda w: -w[3])
+    hashed_files = hashed_bytes = 0
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [(w, pool.submit(digest_file, w[0], w[2])) for w in work]
+        for (file, key, _, size), future in futures:
+            try:
+                result = future.result()
+            except OSError as e:
+                errors[file] = e
+                continue
+            cache[key] = digests[file] = {**digests[file], **result}
+            hashed_files += 1
+            hashed_bytes += size
+
+    failed, skipped = [], 0
+    for entry in entries:
+        actual = digests.get(entry.file, {}).get(entry.algorithm)
+        if actual == entry.expected:
+            continue
+        error = errors.get(entry.file)
+        status = "mismatch" if error is None else "missing" if isinstance(error, FileNotFoundError) else "unreadable"
+        if status == "missing" and ignore_missing:
+            skipped += 1
+            continue
+        failed.append({"status": status, "manifest": entry.manifest, "line": entry.line, "path": entry.path,
+                       "algorithm": entry.algorithm, "expected": entry.expected, "actual": actual,
+                       **({"error": error.strerror} if error else {})})
+    return {
+        "manifests": len(manifests),
+        "entries": len(entries),
+        "files": len(needed),
+        "ok": len(entries) - len(failed) - skipped,
+        "failed": len(failed),
+        "skipped_missing": skipped,
+        "hashed_files": hashed_files,
+        "cached_files": len(needed) - len(work) - sum(1 for f in errors if f not in digests),
+        "hashed_bytes": hashed_bytes,
+        "seconds": round(time.perf_counter() - start, 3),
+        "failures": failed,
+        "malformed": malformed,
+    }
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Verify every sha256sum-style manifest in the evidence directories.")
+    parser.add_argument("directories", nargs="*", default=["."], help="Where to look for manifests (Default: .)")
+    parser.add_argument("-m", "--manifest", action="append", default=[], help="Check this manifest too, whatever its name (repeatable)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Also look for manifests in subdirectories")
+    parser.add_argument("-j", "--jobs", type=int, default=min(8, os.cpu_count() or 1), help="Files hashed at once (Default: min(8, CPUs))")
+    parser.add_argument("-c", "--cache", default=CACHE, help=f"Digest cache (Default: {CACHE} in the first directory)")
+    parser.add_argument("--no-cache", action="store_true", help="Hash everything, and don't update the cache")
+    parser.add_argument("-o", "--output", help="Write the JSON report here (Default: stdout)")
+    parser.add_argument("--ignore-missing", action="store_true", help="Don't fail for files that don't exist")
+    args = parser.parse_args()
+
+    manifests = sorted(set(find_manifests(args.directories, args.recursive)) | {Path(m) for m in args.manifest})
+    cache_path = Path(args.cache) if os.path.dirname(args.cache) else Path(args.directories[0]) / args.cache
+    cache = {} if args.no_cache else load_cache(cache_path)
+    report = verify(manifests, cache, args.jobs, args.ignore_missing)
+    if not args.no_cache:
+        save_cache(cache_path, cache)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    print(f"[{'-' if report['failed'] else '+'}] {report['ok']}/{report['entries']} entries OK in {report['manifests']} manifests, "
+          f"{report['hashed_files']} files hashed ({report['hashed_bytes'] / 1e6:.1f} MB), {report['cached_files']} from cache, "
+          f"{report['seconds']} s", file=sys.stderr)
+    sys.exit(1 if report["failed"] else 0)
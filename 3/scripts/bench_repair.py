@@ -0,0 +1,124 @@
+"""
+Benchmark for chatgpt_responses.repair_line.
+
+Runs the responses of the t2/t3 captures through the current repair engine and through
+the original one (kept below as `legacy_repair_line`). The original with its pairwise
+rejoin swapped for the engine's segmentation must repair every response identically,
+or the benchmark fails: the compiled and merged passes are only a speed-up. It then
+reports how many responses the segmentation rejoins differently from the original
+pairwise joins and the throughput of each in MB/s. Startup is timed in fresh
+interpreters: the original script imported nltk and rebuilt the word set on every run,
+the current one loads the pickled lexicon on first use.
+
+    python3 bench_repair.py              # t2 + t3, 10 rounds
+    python3 bench_repair.py -r 50 ../discoveries/chatgpt/t3-tls_stream.txt
+"""
+
+from argparse import ArgumentParser
+import re
+import subprocess
+import sys
+import time
+
+from ftfy import fix_text
+
+import chatgpt_responses as engine
+
+CAPTURES = [f"../discoveries/chatgpt/t{n}-tls_stream.txt" for n in (2, 3)]
+
+LEGACY_STARTUP = """
+from ftfy import fix_text
+import nltk
+try:
+    from nltk.corpus import words as nltk_words
+    ENGLISH_WORDS = set(w.lower() for w in nltk_words.words())
+except Exception:
+    ENGLISH_WORDS = set()
+"""
+CURRENT_STARTUP = "import chatgpt_responses; chatgpt_responses.lexicon()"
+
+
+def legacy_repair_line(s: str, words, rejoin=None) -> str:
+    # repair_line as it was before the patterns were compiled and merged; rejoin replaces
+    # the two pairwise join passes
+    s = fix_text(s)
+    s = re.sub(r"[​‌‍﻿⁠ ]", "", s)
+    s = re.sub(r"\s+([,.:;?!%\)\]\}])", r"\1", s)
+    s = re.sub(r"([(\[\{])\s+", r"\1", s)
+    s = re.sub(r'([,.:;?!])([A-Za-z0-9"“‘])', r"\1 \2", s)
+    s = re.sub(r"\b([A-Za-z]+)\s*'\s*([A-Za-z]+)\b", r"\1'\2", s)
+
+    def join_contraction(m):
+        a, b = m.group(1), m.group(2)
+        candidate = f"{a}'{b}"
+        if candidate.lower() in words or b.lower() in {"m", "re", "ve", "ll", "d", "t", "s"}:
+            return candidate
+        return f"{a} {b}"
+
+    s = re.sub(r"\b([A-Za-z]+)\s+'?\s+([A-Za-z]+)\b", join_contraction, s)
+    s = re.sub(r"\b(?:[A-Za-z]\s){2,}[A-Za-z]\b", lambda m: m.group(0).replace(" ", ""), s)
+
+    def join_if_broken(m):
+        a, b = m.group(1), m.group(2)
+        if 2 <= len(a) <= 6 and 2 <= len(b) <= 6:
+            joined = a + b
+            if joined.lower() in words or (a.lower() not in words and b.lower() not in words):
+                return joined
+        return m.group(0)
+
+    if rejoin:
+        s = rejoin(s)
+    else:
+        for _ in range(2):
+            s = re.sub(r"\b([A-Za-z]{2,6})\s+([A-Za-z]{2,6})\b", join_if_broken, s)
+    s = re.sub(r"[ \t]{2,}", " ", s)
+    s = re.sub(r" ?\n ?", "\n", s)
+    return s.strip()
+
+
+def startup(code: str, runs: int) -> float:
+    """Best wall time of `runs` fresh interpreters executing code."""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def throughput(repair, responses, rounds: int) -> float:
+    size = sum(len(r.encode("utf-8")) for r in responses) * rounds
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for response in responses:
+            repair(response)
+    return size / (time.perf_counter() - start) / 1e6
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Compare the current repair_line against the original one.")
+    parser.add_argument("captures", nargs="*", default=CAPTURES, help="TLS stream captures (Default: t2 and t3)")
+    parser.add_argument("-r", "--rounds", type=int, default=10, help="Passes over the responses (Default: 10)")
+    parser.add_argument("-s", "--startup-runs", type=int, default=5, help="Interpreters started per variant (Default: 5)")
+    args = parser.parse_args()
+
+    responses = []
+    for path in args.captures:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            responses.extend(engine.iter_responses(f))
+    words = engine.lexicon()
+    for i, response in enumerate(responses):
+        if engine.repair_line(response) != legacy_repair_line(response, words, lambda s: engine.segment_runs(s, words)):
+            sys.exit(f"[!] response {i} repaired differently from the original pipeline")
+    rejoined = sum(legacy_repair_line(r, words) != engine.repair_line(r) for r in responses)
+    size = sum(len(r.encode("utf-8")) for r in responses)
+    print(f"{len(responses)} responses, {size / 1e3:.1f} kB, {len(words)} words: identical to the original pipeline, "
+          f"{rejoined} rejoined differently")
+
+    legacy = throughput(lambda r: legacy_repair_line(r, words), responses, args.rounds)
+    current = throughput(engine.repair_line, responses, args.rounds)
+    print(f"throughput  legacy {legacy:8.2f} MB/s   current {current:8.2f} MB/s   x{current / legacy:.1f}")
+
+    legacy = startup(LEGACY_STARTUP, args.startup_runs)
+    current = startup(CURRENT_STARTUP, args.startup_runs)
+    print(f"startup     legacy {legacy * 1e3:8.0f} ms     current {current * 1e3:8.0f} ms     x{legacy / current:.1f}")
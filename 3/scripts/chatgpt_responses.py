@@ -1,4 +1,4 @@
-"""
+r"""
 TLS Stream Response Cleaner
 ---------------------------
 
@@ -10,39 +10,56 @@ accidentally split tokens.
 
 Workflow
 1) Input selection
-   - Uses `stream` (2 or 3) to pick input/output paths:
+   - Captures given on the command line are cleaned in parallel, one worker process
+     each; `<name>.txt` is written to `<name>_cleaned_responses.txt` (next to it or
+     in `--out-dir`).
+   - Without arguments, uses `stream` (2 or 3) to pick input/output paths:
      - input:  ../discoveries/chatgpt/t{stream}-tls_stream.txt
      - output: ../discoveries/chatgpt/t{stream}-tls_stream_cleaned_responses.txt
-
-2) Fragment extraction
-   - Scans the log file line-by-line and identifies:
-     - `beggining` = 'data: {"o": "patch"' → starts a new response buffer.
-     - `middle`    = 'data: {"v": [{"p": "/message/create_t' → appends text fragments.
-   - Extracts double-quoted payloads from each matched line and concatenates them,
-     inserting spaces between tokens except when a single-char delimiter (`,` or `.`)
-     should be glued.
+   - `--follow` tails one capture that is still being written: complete lines are
+     parsed as they arrive and finished responses appended to the output. The byte
+     offset reached and the response still streaming are checkpointed to
+     `<output>.checkpoint`, so rerunning (or `--follow --once` from cron) only
+     processes the new bytes.
+
+2) Fragment extraction (`iter_responses`)
+   - Streams the log line by line and only looks at SSE `data:` lines (the text dump can
+     put segment junk such as `........'` in front of them).
+   - Decodes each payload with `json` and applies the JSON-patch delta ops: a `message`
+     add opens an assistant text response, `append` ops on `/message/content/parts/0`
+     add fragments to its list buffer, and ops that only carry `v` reuse the previous
+     op and path. Lines whose JSON is broken by capture junk fall back to a regex that
+     salvages just the append fragments.
+   - Yields each response, joined once, as soon as its stream ends (`[DONE]`,
+     `message_stream_complete` or the next message).
+   - With `--http2` the captures are raw HTTP/2 bytes instead of text dumps:
+     `http2_stream.py` parses the frames, decodes the HPACK headers and hands over the
+     body of every `text/event-stream` stream, in the order the streams end, so split
+     frames and DATA padding no longer break the `data:` lines.
 
 3) Text repair (`repair_line`)
-   - Decodes literal `\uXXXX` escapes when present.
-   - Normalizes Unicode (using `ftfy.fix_text`) and removes zero-width / NBSP chars.
+   - Normalizes Unicode (using `ftfy.fix_text`, only on the lines it could change) and
+     removes zero-width / NBSP chars.
    - Fixes spacing around punctuation (e.g., remove space before `, . : ; ? ! ) ] %`,
      ensure one space after punctuation when followed by alnum/quote).
    - Repairs contractions and split apostrophes: "can ' t" → "can't", "I ' m" → "I'm".
    - Collapses sequences of spaced single letters: "H y d r a" → "Hydra".
-   - Heuristically rejoins short broken subtokens using a dictionary check
-     (NLTK `words` corpus if available; otherwise a small fallback set). Runs twice
-     to catch multi-breaks: "com pan ies" → "companies".
+   - Re-segments runs of short (2-6 letter) tokens with a Viterbi search over unigram
+     word costs from a dictionary (NLTK `words` corpus, see `lexicon`; skipped with
+     the small fallback set), so splits of any depth are rejoined in one pass:
+     "com pan ies" → "companies". Tokens are only joined into a dictionary word that
+     not all of them already are, so valid words and unknown ones stay apart.
    - Collapses multiple spaces (preserves newlines) and trims.
+   - All patterns are compiled once at import, and the three punctuation-spacing passes
+     run as one alternation; `bench_repair.py` checks the engine against the original
+     implementation and times both.
 
 4) Output
    - Writes each reconstructed+repaired response to the output file, prefixed by a
      marker line `NEW RESPONSE`.
 
 Configuration
-- `stream`: choose which capture to process (2 or 3).
-- `beggining`, `middle`: line prefixes that identify the payload lines to parse.
-- `delimiters`: token list that should be attached without an extra space
-  when appended (default: [",", "."]).
+- `stream`: choose which capture to process when none is given (2 or 3).
 
 Dependencies
 - Python 3.8+
@@ -50,154 +67,463 @@ Dependencies
 - `nltk` (optional; used for dictionary-based token rejoin; falls back gracefully)
 
 Example
-    stream = 2
-    python3 clean_tls_responses.py
+    python3 chatgpt_responses.py                       # the `stream` capture
+    python3 chatgpt_responses.py ../discoveries/chatgpt/t*-tls_stream.txt -j 4
+    python3 chatgpt_responses.py -f live-tls_stream.txt -o ../discoveries/chatgpt
+    python3 chatgpt_responses.py --http2 server-side.bin
 
 Notes
 - The script does not modify the input file; it writes a cleaned, line-oriented
   output with clear response separators.
-- If NLTK's `words` corpus is missing, the script uses a small built-in set;
-  results still improve but may be slightly less accurate.
+- The word list is only loaded when the first response is repaired. The first run builds
+  it from NLTK's `words` corpus and pickles it to `.english_words.pickle` next to the
+  script; later runs load that and never import NLTK. Delete the file to rebuild it.
+- If NLTK's `words` corpus is missing, the script uses a small built-in set and
+  skips the re-segmentation, which needs a real dictionary; the other repairs still apply.
 """
 
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+from pathlib import Path
 from ftfy import fix_text
-import nltk
+import json
+import os
+import pickle
 import re
+import time
+
+from http2_stream import decoded_body, header, iter_streams
 
 # config
 stream = 2  # 2 or 3
 input = f"../discoveries/chatgpt/t{stream}-tls_stream.txt"
 output = f"../discoveries/chatgpt/t{stream}-tls_stream_cleaned_responses.txt"
-beggining = 'data: {"o": "patch"'
-middle = 'data: {"v": [{"p": "/message/create_t'
-delimiters = [",", "."]
-
-try:
-    from nltk.corpus import words as nltk_words
-
-    ENGLISH_WORDS = set(w.lower() for w in nltk_words.words())
-except Exception:
-    # Fallback: small built-in set if NLTK words not available
-    ENGLISH_WORDS = {
-        "the",
-        "and",
-        "is",
-        "in",
-        "it",
-        "shows",
-        "this",
-        "that",
-        "i",
-        "can't",
-        "cannot",
-        "totally",
-        "hydra",
-        "friendlier",
-        "ftp",
-        "hashcat",
-        "john",
-    }
+
+CONTENT_PATH = "/message/content/parts/0"
+DONE = "[DONE]"
+FOLLOW_INTERVAL = 2.0  # seconds between polls of a capture being followed
+# Text appends out of a data: line whose JSON the capture junk broke
+APPEND_RE = re.compile(r'"p": "/message/content/parts/0", "o": "append", "v": "((?:[^"\\]|\\.)*)"')
+
+# The NLTK words corpus, lowercased, is pickled here the first time it is built
+LEXICON_CACHE = Path(__file__).resolve().parent / ".english_words.pickle"
+# Fallback: small built-in set if NLTK words not available
+FALLBACK_WORDS = frozenset({
+    "the",
+    "and",
+    "is",
+    "in",
+    "it",
+    "shows",
+    "this",
+    "that",
+    "i",
+    "can't",
+    "cannot",
+    "totally",
+    "hydra",
+    "friendlier",
+    "ftp",
+    "hashcat",
+    "john",
+})
+
+# Most tokens one segmented word may be rebuilt from
+SEGMENT_WINDOW = 8
 
 # Common contractions to allow joining around apostrophes
 CONTRACTIONS = {"n't", "'re", "'ve", "'ll", "'d", "'m", "o'clock", "'s"}
-
-
-def repair_line(s: str) -> str:
-    # 1) Decode literal \uXXXX (if present)
+CONTRACTION_TAILS = {"m", "re", "ve", "ll", "d", "t", "s"}
+
+# repair_line patterns, compiled once
+# fix_text returns lines of printable ASCII and typographic dashes unchanged unless they hold
+# an HTML entity, so only lines matching this go through it
+NEEDS_FIX = re.compile(r"[^\t\n\x20-\x7e\u2010\u2011\u2013\u2014\u2022\u2026]|&#?[0-9A-Za-z]")
+LINE = re.compile(r"[^\n]*\n|[^\n]+")  # the segments fix_text itself works on
+INVISIBLE = re.compile(r"[\u200B\u200C\u200D\uFEFF\u2060\u00A0]")
+# Step 3 in one pass, dispatched on the group that matched (see _spacing): punctuation before a
+# word, with any space in front of it dropped | space before a closer | space after an opener.
+# The first branch stands for "drop the space, then add one after", which the separate passes did
+# in turn; the others can't create or remove matches for each other. The leading lookahead skips
+# the positions no branch can start at.
+SPACING = re.compile(r'(?=[\s,.:;?!(\[{])(?:\s*([,.:;?!])(?=[A-Za-z0-9"“‘])|\s+([,.:;?!%\)\]\}])|([(\[\{])\s+)')
+APOSTROPHE = re.compile(r"\b([A-Za-z]+)\s*'\s*([A-Za-z]+)\b")
+SPLIT_CONTRACTION = re.compile(r"\b([A-Za-z]+)\s+'?\s+([A-Za-z]+)\b")
+SPACED_LETTERS = re.compile(r"\b(?:[A-Za-z]\s){2,}[A-Za-z]\b")
+# Two or more 2-6 letter tokens on one line, not glued to a longer word or an apostrophe
+SHORT_RUN = re.compile(r"(?<![\w'])[A-Za-z]{2,6}(?:[ \t]+[A-Za-z]{2,6})+(?![\w'])")
+GAP = re.compile(r"([ \t]+)")
+SPACE_RUN = re.compile(r"[ \t]{2,}")
+NEWLINE_SPACE = re.compile(r" ?\n ?")
+
+
+@lru_cache(maxsize=None)
+def lexicon() -> frozenset:
+    """Lowercased English words for the dictionary checks, loaded on first use.
+
+    Reads the pickled cache if there is one; otherwise builds the set from NLTK's words
+    corpus and writes the cache. Without NLTK the fallback set is used and nothing is
+    cached, so installing the corpus later still takes effect.
+    """
+    try:
+        with open(LEXICON_CACHE, "rb") as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        pass
     try:
-        s = s.encode("utf-8").decode("unicode_escape")
+        from nltk.corpus import words as nltk_words
+
+        words = frozenset(w.lower() for w in nltk_words.words())
     except Exception:
+        return FALLBACK_WORDS
+    try:
+        tmp = LEXICON_CACHE.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(words, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, LEXICON_CACHE)
+    except OSError:
         pass
+    return words
+
 
-    # 2) Normalize common Unicode issues
-    s = fix_text(s)
+def normalize_unicode(s: str) -> str:
+    """fix_text(s), handing fix_text only the lines it can change."""
+    if not NEEDS_FIX.search(s):
+        return s
+    lines = LINE.findall(s)
+    html = True  # like fix_text, stop decoding entities from the first line with a tag in it
+    for i, line in enumerate(lines):
+        html = html and "<" not in line
+        if NEEDS_FIX.search(line):
+            lines[i] = fix_text(line) if html else fix_text(line, unescape_html=False)
+    return "".join(lines)
 
-    # 3) Remove invisible / weird space chars (non-breaking, zero-width, etc.)
-    s = re.sub(r"[\u200B\u200C\u200D\uFEFF\u2060\u00A0]", "", s)
 
-    # 4) Remove spaces around common punctuation (keep reasonable spacing)
+def repair_line(s: str) -> str:
+    words = lexicon()
+
+    # 1) Normalize common Unicode issues (escapes were already decoded by the JSON parser)
+    s = normalize_unicode(s)
+
+    # 2) Remove invisible / weird space chars (non-breaking, zero-width, etc.)
+    s = INVISIBLE.sub("", s)
+
+    # 3) Fix spacing around common punctuation, in one pass:
     #    - remove space before , . : ; ? ! ) ] %
-    s = re.sub(r"\s+([,.:;?!%\)\]\}])", r"\1", s)
     #    - remove space after opening punctuation ( ( [ { ) if present excessive
-    s = re.sub(r"([(\[\{])\s+", r"\1", s)
     #    - ensure one space after punctuation if it's letter/digit next
-    s = re.sub(r'([,.:;?!])([A-Za-z0-9"“‘])', r"\1 \2", s)
+    s = SPACING.sub(_spacing, s)
 
-    # 5) Fix spaced apostrophes / contractions: "can 't" -> "can't", "I 'm" -> "I'm"
+    # 4) Fix spaced apostrophes / contractions: "can 't" -> "can't", "I 'm" -> "I'm"
     #    handle patterns like: word <spaces> ' <spaces> wordpart
-    s = re.sub(r"\b([A-Za-z]+)\s*'\s*([A-Za-z]+)\b", r"\1'\2", s)
+    s = APOSTROPHE.sub(r"\1'\2", s)
     #    also fix odd splits like "I can ' t" -> "I can't"
-    s = re.sub(r"\b([A-Za-z]+)\s+'?\s+([A-Za-z]+)\b", lambda m: _join_contraction(m), s)
+    s = SPLIT_CONTRACTION.sub(lambda m: _join_contraction(m, words), s)
 
-    # 6) Fix sequences of spaced single letters (H y d r a -> Hydra)
+    # 5) Fix sequences of spaced single letters (H y d r a -> Hydra)
     #    Only join if sequence length >= 3 letters and they are single-letter tokens separated by single spaces
-    s = re.sub(
-        r"\b(?:[A-Za-z]\s){2,}[A-Za-z]\b", lambda m: m.group(0).replace(" ", ""), s
-    )
-
-    # 7) Join short broken subtokens but use dictionary check to avoid joining valid word pairs
-    def join_if_broken(m):
-        a, b = m.group(1), m.group(2)
-        # only consider short-ish pieces
-        if 2 <= len(a) <= 6 and 2 <= len(b) <= 6:
-            joined = a + b
-            # join if joined form is a known English word OR both halves are unknown
-            if joined.lower() in ENGLISH_WORDS or (
-                a.lower() not in ENGLISH_WORDS and b.lower() not in ENGLISH_WORDS
-            ):
-                return joined
-        return m.group(0)
-
-    # run twice to catch multi-breaks (com pan ies -> companies)
-    for _ in range(2):
-        s = re.sub(r"\b([A-Za-z]{2,6})\s+([A-Za-z]{2,6})\b", join_if_broken, s)
-
-    # 8) Collapse multiple spaces to single, but preserve newlines
-    s = re.sub(r"[ \t]{2,}", " ", s)
-    s = re.sub(r" ?\n ?", "\n", s)
-
-    # 9) Final trim
-    s = s.strip()
-
-    return s
-
-
-def _join_contraction(m):
+    s = SPACED_LETTERS.sub(lambda m: m.group(0).replace(" ", ""), s)
+
+    # 6) Re-segment runs of short tokens (com pan ies -> companies) in one pass
+    s = segment_runs(s, words)
+
+    # 7) Collapse multiple spaces to single, but preserve newlines
+    s = SPACE_RUN.sub(" ", s)
+    s = NEWLINE_SPACE.sub("\n", s)
+
+    # 8) Final trim
+    return s.strip()
+
+
+@lru_cache(maxsize=1 << 16)
+def group_cost(parts: tuple) -> float:
+    """Unigram cost of reading the lowercased tokens in parts as one word, in units of
+    log(len(lexicon())).
+
+    A single token is a known word (probability 1/N) or an unknown one, which pays another
+    factor of 1/N per letter. Several tokens only make a word when the joined form is in the
+    lexicon and at least one of them isn't: "com pan ies" -> "companies", while known words
+    ("can not") and unknown ones ("tell me which" with a small lexicon) stay apart.
+    """
+    words = lexicon()
+    if len(parts) == 1:
+        return 1 if parts[0] in words else 1 + len(parts[0])
+    if "".join(parts) in words and not all(p in words for p in parts):
+        return 1
+    return float("inf")
+
+
+def segment(tokens: list) -> list:
+    """Cheapest split of tokens into consecutive groups, each group read as one word.
+
+    Viterbi over token boundaries: best[i] is the cost of tokens[:i], a word spans at most
+    SEGMENT_WINDOW tokens, so the work is linear in the number of tokens. Returns the
+    (start, end) token range of every word.
+    """
+    lowered = [t.lower() for t in tokens]
+    best = [0] + [float("inf")] * len(tokens)
+    back = [0] * (len(tokens) + 1)
+    for i in range(1, len(tokens) + 1):
+        # nearest start first, so ties keep the tokens apart
+        for j in range(i - 1, max(0, i - SEGMENT_WINDOW) - 1, -1):
+            cost = best[j] + group_cost(tuple(lowered[j:i]))
+            if cost < best[i]:
+                best[i], back[i] = cost, j
+    words = []
+    i = len(tokens)
+    while i:
+        words.append((back[i], i))
+        i = back[i]
+    return words[::-1]
+
+
+def segment_runs(s: str, words) -> str:
+    # the fallback set is too small to tell a split word from real ones: "can" isn't in it
+    if words is FALLBACK_WORDS:
+        return s
+    return SHORT_RUN.sub(_segment_run, s)
+
+
+def _segment_run(m):
+    # helper used in regex replacement: rejoin the tokens of each segmented word, keeping
+    # the original whitespace between words
+    parts = GAP.split(m.group(0))
+    tokens, gaps = parts[::2], parts[1::2]
+    out = []
+    for start, end in segment(tokens):
+        out.append("".join(tokens[start:end]))
+        if end < len(tokens):
+            out.append(gaps[end - 1])
+    return "".join(out)
+
+
+def _spacing(m):
+    # helper used in regex replacement: which SPACING branch matched decides the repair
+    punct, closer, opener = m.groups()
+    return punct + " " if punct else closer or opener
+
+
+def _join_contraction(m, words):
     # helper used in regex replacement for contraction attempts
     a, b = m.group(1), m.group(2)
     candidate = f"{a}'{b}"
-    if candidate.lower() in ENGLISH_WORDS or b.lower() in {
-        "m",
-        "re",
-        "ve",
-        "ll",
-        "d",
-        "t",
-        "s",
-    }:
+    if candidate.lower() in words or b.lower() in CONTRACTION_TAILS:
         return candidate
     # fallback: don't join if it yields nonsense
     return f"{a} {b}"
 
 
-matches = []
-current = -1
-with open(input, "r", encoding="utf-8") as f:
-    for line in f:
-        match = re.findall(r'"([^"]*)"', line)
-        if line.startswith(beggining):
-            current += 1
-            matches.append(match[-1])
-        elif line.startswith(middle):
-            if match[-1] in delimiters:
-                matches[current] += match[-1]
+def iter_data_events(lines):
+    """Yield the decoded payload of every SSE `data:` line; DONE for the end-of-stream marker."""
+    for line in lines:
+        start = line.find("data: ")
+        # anything in front of the field must be capture junk, not JSON
+        if start == -1 or '"' in line[:start] or "{" in line[:start]:
+            continue
+        payload = line[start + 6:].strip()
+        if payload == DONE:
+            yield DONE
+            continue
+        try:
+            yield json.loads(payload)
+        except ValueError:
+            ops = []
+            for fragment in APPEND_RE.findall(payload):
+                try:
+                    ops.append({"p": CONTENT_PATH, "o": "append", "v": json.loads(f'"{fragment}"')})
+                except ValueError:
+                    pass
+            if ops:
+                yield {"o": "patch", "v": ops}
+
+
+def new_state() -> dict:
+    # fragments of the response being streamed (None outside one) and the op/path that
+    # events carrying only "v" continue; plain JSON so follow mode can checkpoint it
+    return {"parts": None, "path": None, "op": None}
+
+
+def iter_responses(lines, state=None, final=True):
+    """Yield the text of each assistant response as soon as its stream ends.
+
+    Passing the same state dict to consecutive calls resumes a response cut off at the end
+    of the previous lines; with final unset that unfinished response stays in the state
+    instead of being yielded.
+    """
+    state = new_state() if state is None else state
+    for event in iter_data_events(lines):
+        parts = state["parts"]
+        if event == DONE or (isinstance(event, dict) and event.get("type") == "message_stream_complete"):
+            if parts:
+                yield "".join(parts)
+            state["parts"] = None
+            continue
+        if not isinstance(event, dict) or "v" not in event:
+            continue
+        value = event["v"]
+        if isinstance(value, dict) and "message" in value:
+            if parts:
+                yield "".join(parts)
+            message = value["message"]
+            content = message.get("content") or {}
+            is_text = (message.get("author") or {}).get("role") == "assistant" and content.get("content_type") == "text"
+            state["parts"] = [part for part in content.get("parts", [])[:1] if isinstance(part, str)] if is_text else None
+            state["path"], state["op"] = event.get("p"), event.get("o")
+            continue
+        path, op = state["path"], state["op"] = event.get("p", state["path"]), event.get("o", state["op"])
+        ops = value if op == "patch" and isinstance(value, list) else [{"p": path, "o": op, "v": value}]
+        for item in ops:
+            if (parts is not None and isinstance(item, dict) and item.get("p") == CONTENT_PATH
+                    and item.get("o") == "append" and isinstance(item.get("v"), str)):
+                parts.append(item["v"])
+    if final and state["parts"]:
+        yield "".join(state["parts"])
+        state["parts"] = None
+
+
+def write_response(dst, response: str):
+    dst.write("\nNEW RESPONSE\n")
+    dst.write(repair_line(response) + "\n")
+
+
+def iter_http2_responses(src):
+    """Yield the responses of every SSE stream in a raw HTTP/2 capture (see http2_stream.py)."""
+    for stream in iter_streams(src):
+        body = decoded_body(stream)
+        content_type = header(stream, "content-type")
+        # a capture started mid-connection lost the headers; go by the body then
+        if "text/event-stream" in content_type or (not content_type and body.lstrip().startswith((b"data:", b"event:"))):
+            yield from iter_responses(body.decode("utf-8", errors="replace").splitlines())
+
+
+def main(input_path=input, output_path=output, http2=False):
+    # Each response is repaired and written as soon as the parser hands it over
+    count = 0
+    if http2:
+        src = open(input_path, "rb")
+        responses = iter_http2_responses(src)
+    else:
+        src = open(input_path, "r", encoding="utf-8", errors="replace")
+        responses = iter_responses(src)
+    with src, open(output_path, "w", encoding="utf-8") as dst:
+        for response in responses:
+            write_response(dst, response)
+            count += 1
+    return count
+
+
+def output_for(capture, out_dir=None) -> Path:
+    """t2-tls_stream.txt -> t2-tls_stream_cleaned_responses.txt, next to it or in out_dir."""
+    capture = Path(capture)
+    return Path(out_dir or capture.parent) / f"{capture.stem}_cleaned_responses.txt"
+
+
+def clean_job(capture, out_dir=None, http2=False):
+    output_path = output_for(capture, out_dir)
+    try:
+        return str(capture), str(output_path), main(capture, output_path, http2)
+    except (OSError, ValueError) as e:
+        return str(capture), str(output_path), e
+
+
+def clean_all(captures, out_dir=None, jobs=None, http2=False):
+    """Clean every capture, one worker process per capture."""
+    if out_dir:
+        Path(out_dir).mkdir(parents=True, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for capture, output_path, result in pool.map(clean_job, captures, repeat(out_dir), repeat(http2)):
+            if isinstance(result, Exception):
+                print(f"[!] {capture}: {result}")
             else:
-                matches[current] += " " + match[-1]
+                print(f"[+] {capture}: {result} responses -> {output_path}")
+
+
+def load_checkpoint(path: Path, capture) -> dict:
+    try:
+        checkpoint = json.loads(path.read_text())
+        if checkpoint.get("capture") == str(Path(capture).resolve()):
+            return checkpoint
+    except (OSError, ValueError):
+        pass
+    return {"capture": str(Path(capture).resolve()), "offset": 0, "state": new_state()}
+
+
+def save_checkpoint(path: Path, checkpoint: dict):
+    # written aside and renamed, so an interrupted save never leaves half a checkpoint
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(checkpoint))
+    os.replace(tmp, path)
+
+
+def catch_up(capture, output_path, checkpoint: dict) -> int:
+    """Parse the complete lines appended to capture since the checkpoint, append the
+    responses that finished in them to output_path and advance the checkpoint."""
+    with open(capture, "rb") as src:
+        size = os.fstat(src.fileno()).st_size
+        if size < checkpoint["offset"]:  # truncated or replaced: start over
+            checkpoint.update(offset=0, state=new_state())
+        src.seek(checkpoint["offset"])
+        data = src.read(size - checkpoint["offset"])
+    # a line still being written is left for the next round
+    data = data[:data.rfind(b"\n") + 1]
+    if not data:
+        return 0
+    count = 0
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    with open(output_path, "a", encoding="utf-8") as dst:
+        for response in iter_responses(lines, checkpoint["state"], final=False):
+            write_response(dst, response)
+            count += 1
+    checkpoint["offset"] += len(data)
+    return count
+
+
+def follow(capture, output_path=None, checkpoint_path=None, interval=FOLLOW_INTERVAL, once=False):
+    """Tail a growing capture, appending responses to output_path as their streams end.
+
+    The byte offset reached and the response still being streamed are checkpointed after
+    every round, so a rerun picks up exactly where the last one stopped.
+    """
+    output_path = Path(output_path or output_for(capture))
+    checkpoint_path = Path(checkpoint_path or f"{output_path}.checkpoint")
+    checkpoint = load_checkpoint(checkpoint_path, capture)
+    try:
+        while True:
+            offset = checkpoint["offset"]
+            count = catch_up(capture, output_path, checkpoint)
+            if checkpoint["offset"] != offset or not checkpoint_path.exists():
+                save_checkpoint(checkpoint_path, checkpoint)
+            if count:
+                print(f"[+] {count} new responses -> {output_path} (offset {checkpoint['offset']})")
+            if once:
+                return
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
 
-for i, m in enumerate(matches):
-    matches[i] = repair_line(m)
 
-with open(output, "w", encoding="utf-8") as f:
-    for item in matches:
-        f.write("\nNEW RESPONSE\n")
-        f.write(item + "\n")
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Rebuild and clean the assistant responses in captured ChatGPT TLS streams.")
+    parser.add_argument("captures", nargs="*", help=f"TLS stream captures (Default: {input})")
+    parser.add_argument("-o", "--out-dir", help="Where the cleaned responses go (Default: next to each capture)")
+    parser.add_argument("-j", "--jobs", type=int, help="Worker processes (Default: CPU count)")
+    parser.add_argument("--http2", action="store_true", help="Captures are raw HTTP/2 bytes (see http2_stream.py), not text dumps")
+    parser.add_argument("-f", "--follow", action="store_true", help="Tail a single growing capture, resuming from its checkpoint")
+    parser.add_argument("--checkpoint", help="(--follow) Checkpoint file (Default: <output>.checkpoint)")
+    parser.add_argument("--interval", type=float, default=FOLLOW_INTERVAL, help=f"(--follow) Seconds between polls (Default: {FOLLOW_INTERVAL})")
+    parser.add_argument("--once", action="store_true", help="(--follow) Process what is new since the checkpoint and exit")
+    args = parser.parse_args()
+
+    if args.follow:
+        if args.http2:
+            parser.error("--follow reads text dumps; --http2 captures are cleaned whole")
+        if len(args.captures) > 1:
+            parser.error("--follow takes a single capture")
+        capture = args.captures[0] if args.captures else input
+        follow(capture, output_for(capture, args.out_dir), args.checkpoint, args.interval, args.once)
+    elif args.captures:
+        clean_all(args.captures, args.out_dir, args.jobs, args.http2)
+    else:
+        main()
@@ -7,40 +7,60 @@ that contain Base64-encoded data (typically from a "file=" parameter in a POST b
 It uses known plaintext attacks and repeating XOR analysis to decrypt the file.
 
 Workflow:
-1. Reads an input `.txt` file containing the intercepted POST data.
-2. Extracts the value of the `file=` parameter.
-3. URL-decodes and Base64-decodes it to obtain the obfuscated binary data.
+1. Memory-maps an input `.txt` file containing the intercepted POST data.
+2. Locates the `file=` parameter(s) without reading the body into memory.
+3. URL-decodes and Base64-decodes the value chunk by chunk to obtain the obfuscated binary data
+   (kept in memory).
 4. If a known original version of the PDF exists (known plaintext), computes a keystream by XORing
-   the obfuscated data with the known PDF bytes.
-5. Applies the keystream to decrypt the obfuscated file.
-6. If the PDF header (“%PDF-”) is not found, tries to brute-force a repeating XOR key (up to 8 bytes).
-7. Appends a valid PDF trailer (from the known original) if missing.
-8. Saves the recovered PDF file.
-9. Cleans up temporary intermediate files.
+   the obfuscated data with the known PDF bytes, and files it in the keystream store. Without one,
+   a stored keystream with the same fingerprint (ciphertext prefix XOR "%PDF-1.") is used.
+5. If the keystream doesn't reveal the PDF header (“%PDF-”), recovers a repeating XOR key
+   (up to 64 bytes) from key-length coincidences and per-column text scoring instead. A key that
+   doesn't decode the header or much of the sample as text is no key: nothing is written.
+6. Appends a valid PDF trailer (from the known original) if missing.
+7. Decrypts the file chunk by chunk straight into the memory-mapped output PDF.
+8. Cleans up temporary files.
 
 Configurable parameters:
 - `which_one`: Selects between `pdf1.txt` (Financial Report) and `pdf2.txt` (Invoice).
 - `MAX_REPXOR_KEYLEN`: Maximum key length to try in repeating XOR search.
 - `MAX_REPXOR_OFFSET`: Maximum offset to search for the PDF header.
 
+Batch mode (`--batch`) runs the same recovery over a directory or glob of captures in a process
+pool. Each capture is matched to a known plaintext from `--plaintexts` that starts with `%PDF-` and
+is at most `MAX_CIPHER_OVERHEAD` bytes shorter than the decoded payload. Captures without a match
+fall back to the repeating-XOR search. A capture holding several requests or several `file=`
+fields yields one PDF per field. Captures left to the XOR search are retried with the keystreams
+the batch stored, and the manifest reports which captures share a keystream (`--reuse CAPTURES`
+prints that report on its own). `--fields CAPTURE` lists the form fields of a capture.
+
 Outputs:
 - A fully recovered and readable PDF file (named `_recovered.pdf`).
 - JSON summary printed to stdout, showing input and output paths.
+- Batch mode: `<capture>_recovered.pdf` per capture and one `manifest.json` for the whole batch.
+- `discoveries/pdfs/keystreams/<fingerprint>.bin`: every keystream recovered so far (`--store`).
 
 Example usage:
 $ python3 recover_pdf.py
+$ python3 decrypt_pdfs.py --batch ../discoveries/pdfs -o /tmp/recovered
 
 Dependencies:
-- Python 3.6+
-- Standard library modules only (no external dependencies)
+- Python 3.8+
+- NumPy
 """
 
 # config
 which_one = 2  # 1 or 2
 
 from pathlib import Path
-from urllib.parse import unquote_plus
-import re, base64, json
+from typing import NamedTuple
+import re, base64, json, mmap, glob, os, hashlib
+from argparse import ArgumentParser
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 # Base directory (one level up from scripts/)
 BASE_DIR = Path(__file__).resolve().parents[1]
@@ -57,77 +77,294 @@ else:
 OUT_DEOBF_PDF = DISCOVERIES_DIR / KNOWN_PLAINTEXT_PDF.name.replace("_original", "_recovered")
 
 # Temporary files (auto-deleted later)
-OUT_RAW_BIN = DISCOVERIES_DIR / f"pdf{which_one}_decoded.bin"
-OUT_KEYSTREAM_BIN = DISCOVERIES_DIR / f"pdf{which_one}_keystream.bin"
 OUT_REPXOR_KEY_HEX = DISCOVERIES_DIR / f"pdf{which_one}_repxor.hex"
 
-MAX_REPXOR_KEYLEN = 8
+# Keystreams recovered from known plaintexts, kept across runs (<fingerprint>.bin)
+KEYSTREAM_STORE = DISCOVERIES_DIR / "keystreams"
+
+MAX_REPXOR_KEYLEN = 64
 MAX_REPXOR_OFFSET = 512
+MAX_CIPHER_OVERHEAD = 64  # batch mode: a capture may be this many bytes longer than its plaintext (IV, tag)
+PLAINTEXT_MAGIC = b"%PDF-"
+FINGERPRINT_CRIB = b"%PDF-1."  # what every PDF plaintext starts with
+REUSE_PREFIX = 4096        # decoded bytes per capture compared when looking for keystream reuse
+REUSE_Z = 4.0              # equal bytes flagging reuse, in standard deviations above the 1/256 of
+                           # independent keystreams (4096 bytes: 16 expected, 32 flag)
+XOR_CHUNK = 1 << 22  # bytes XORed per numpy call
+FORM_CHUNK = 1 << 20  # encoded bytes decoded at a time
 TRAILER_SOURCE_PDF = KNOWN_PLAINTEXT_PDF
 
 def log(msg): print(msg)
 
 # --- Core functions ---
 
-def extract_file_param_from_txt(txtpath: Path):
-    s = txtpath.read_text(errors="ignore")
-    m = re.search(r'file=([^&\s]+)', s)
-    if not m:
-        raise SystemExit(f"No 'file=' parameter found in {txtpath}")
-    return m.group(1)
-
-def urldecode_and_b64decode(s: str):
-    ud = unquote_plus(s)
-    b = ud.encode('utf-8')
-    b = b"".join(b.split())
-    try:
-        return base64.b64decode(b, validate=True)
-    except Exception:
-        pad = (-len(b)) % 4
-        try:
-            return base64.b64decode(b + b"=" * pad)
-        except Exception:
-            filtered = re.sub(rb'[^A-Za-z0-9+/=]', b'', b)
-            pad = (-len(filtered)) % 4
-            return base64.b64decode(filtered + b"=" * pad)
-
-def write_recovered_bin():
-    enc = extract_file_param_from_txt(POST_TXT_PATH)
-    raw = urldecode_and_b64decode(enc)
-    OUT_RAW_BIN.write_bytes(raw)
-    log(f"[+] Decoded POST -> {OUT_RAW_BIN} ({len(raw)} bytes)")
-    return OUT_RAW_BIN
-
-def compute_keystream_known_plain(recovered_bin: Path, known_plain: Path):
-    c = recovered_bin.read_bytes()
-    p = known_plain.read_bytes()
-    n = min(len(c), len(p))
-    ks = bytes([c[i] ^ p[i] for i in range(n)])
-    OUT_KEYSTREAM_BIN.write_bytes(ks)
-    log(f"[+] Keystream computed -> {OUT_KEYSTREAM_BIN}")
-    return OUT_KEYSTREAM_BIN
-
-def repeating_xor_search(recovered_bin: Path, max_keylen=8, max_offset=512, target=b"%PDF-"):
-    data = recovered_bin.read_bytes()
-    n = len(data)
-    for offset in range(0, min(max_offset, n - len(target)) + 1):
-        for klen in range(1, max_keylen + 1):
-            key = bytearray(klen)
-            for j in range(len(target)):
-                key[j % klen] = data[offset + j] ^ target[j]
-            sample_len = min(4096, n)
-            decoded_sample = bytearray(sample_len)
-            for i in range(sample_len):
-                decoded_sample[i] = data[i] ^ key[i % klen]
-            if target in decoded_sample:
-                OUT_REPXOR_KEY_HEX.write_text(key.hex())
-                log(f"[+] Found repeating XOR key: {key.hex()} (len={klen}, offset={offset})")
-                return key.hex()
-    return None
-
-def apply_xor(cipher: bytes, key: bytes) -> bytes:
+# --- Form field extraction ---
+# The capture is memory-mapped and searched with mm.find (memchr speed, no copy of the body),
+# then a field's value is URL- and base64-decoded a chunk at a time. Escapes and base64 quads
+# cut by a chunk boundary are carried to the next chunk; anything outside the base64 alphabet
+# is dropped.
+
+class FormField(NamedTuple):
+    name: str
+    request: int  # 1-based index of the HTTP request the field is in (0 = no request line before it)
+    start: int    # offsets of the encoded value in the capture
+    end: int
+
+REQUEST_LINE = re.compile(rb"[A-Z]+ \S+ HTTP/\d\.\d\r?$")
+VALUE_END = (b"&", b" ", b"\t", b"\r", b"\n")
+B64_ALPHABET = np.zeros(256, dtype=bool)
+B64_ALPHABET[list(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=")] = True
+HEX_VALUE = np.full(256, -1, dtype=np.int16)
+HEX_VALUE[list(b"0123456789")] = np.arange(10)
+HEX_VALUE[list(b"abcdef")] = HEX_VALUE[list(b"ABCDEF")] = np.arange(10, 16)
+
+def find_all(mm, needle: bytes):
+    pos = mm.find(needle)
+    while pos != -1:
+        yield pos
+        pos = mm.find(needle, pos + 1)
+
+def request_offsets(mm):
+    # " HTTP/1.x" ends every request line; base64 bodies can't contain it (no spaces)
+    offsets = []
+    for hit in find_all(mm, b" HTTP/"):
+        line_start = mm.rfind(b"\n", 0, hit) + 1
+        line_end = mm.find(b"\n", hit)
+        if REQUEST_LINE.match(mm[line_start:line_end if line_end != -1 else len(mm)]):
+            offsets.append(line_start)
+    return offsets
+
+def value_end(mm, start: int, chunk=FORM_CHUNK):
+    # First '&' or whitespace after start, looked for one chunk at a time
+    for pos in range(start, len(mm), chunk):
+        limit = min(pos + chunk, len(mm))
+        ends = [e for e in (mm.find(c, pos, limit) for c in VALUE_END) if e != -1]
+        if ends:
+            return min(ends)
+    return len(mm)
+
+def find_form_fields(mm, names=("file",)):
+    """Yield a FormField for every name=value pair with one of the given names, in capture order."""
+    requests = request_offsets(mm)
+    hits = sorted((pos, name) for name in names for pos in find_all(mm, name.encode() + b"="))
+    covered = 0
+    for pos, name in hits:
+        # must start the body or follow a separator, and not sit inside the previous value
+        if pos < covered or (pos > 0 and mm[pos - 1:pos] not in VALUE_END):
+            continue
+        start = pos + len(name) + 1
+        covered = value_end(mm, start)
+        yield FormField(name, bisect_right(requests, pos), start, covered)
+
+def unquote_base64_text(raw: bytes) -> bytes:
+    """URL-decode raw like unquote_plus and keep only the base64 alphabet of the result."""
+    a = np.frombuffer(raw, dtype=np.uint8)
+    out = a.copy()
+    keep = a != ord("+")  # an encoded space; base64's own '+' arrives as %2B
+    # %XX escapes can't overlap (their XX are hex digits, never '%'), so all decode at once
+    pct = np.flatnonzero(a[:len(a) - 2] == ord("%"))
+    hi, lo = HEX_VALUE[a[pct + 1]], HEX_VALUE[a[pct + 2]]
+    valid = (hi >= 0) & (lo >= 0)
+    pct, hi, lo = pct[valid], hi[valid], lo[valid]
+    out[pct] = hi * 16 + lo
+    keep[pct] = True
+    keep[pct + 1] = keep[pct + 2] = False
+    keep &= B64_ALPHABET[out]
+    return out[keep].tobytes()
+
+def iter_field_bytes(mm, field: FormField, chunk=FORM_CHUNK):
+    """Yield the URL- and base64-decoded value of field in pieces of about chunk * 3/4 bytes."""
+    url_carry = b64_carry = b""
+    for pos in range(field.start, field.end, chunk):
+        last = pos + chunk >= field.end
+        raw = url_carry + mm[pos:min(pos + chunk, field.end)]
+        cut = raw.rfind(b"%", max(0, len(raw) - 2))
+        if cut != -1 and not last:
+            raw, url_carry = raw[:cut], raw[cut:]
+        else:
+            url_carry = b""
+        text = b64_carry + unquote_base64_text(raw)
+        padding = text.find(b"=")
+        if padding != -1:
+            # the data ends with the quad holding the first padding character
+            text = text[:(padding // 4 + 1) * 4]
+            yield base64.b64decode(text + b"=" * (-len(text) % 4))
+            return
+        whole = len(text) - len(text) % 4
+        if whole:
+            yield base64.b64decode(text[:whole])
+        b64_carry = text[whole:]
+    if len(b64_carry) > 1:  # a single dangling character can't hold a byte
+        yield base64.b64decode(b64_carry + b"=" * (-len(b64_carry) % 4))
+
+def form_fields(post_txt: Path, names=("file",)):
+    with open(post_txt, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return list(find_form_fields(mm, names))
+
+def decode_field(post_txt: Path, field: FormField) -> bytearray:
+    out = bytearray()
+    with open(post_txt, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for block in iter_field_bytes(mm, field):
+            out += block
+    return out
+
+def decode_post(post_txt: Path = POST_TXT_PATH, index=0):
+    fields = form_fields(post_txt)
+    if index >= len(fields):
+        raise SystemExit(f"No 'file=' parameter found in {post_txt}")
+    raw = decode_field(post_txt, fields[index])
+    log(f"[+] Decoded POST ({len(raw)} bytes)")
+    return raw
+
+# --- XOR layer ---
+# Everything is XORed a chunk at a time with numpy, the key repeating as needed: a short
+# repeating-XOR key or a keystream as long as the file are handled the same way.
+
+def xor_chunks(data, key, phase=0, chunk=XOR_CHUNK):
+    """Yield data ^ key (key repeated over data, data[0] meeting key[phase]) as uint8 arrays of
+    at most chunk bytes."""
+    data = np.frombuffer(data, dtype=np.uint8)
+    key = np.frombuffer(key, dtype=np.uint8)
     klen = len(key)
-    return bytes([cipher[i] ^ key[i % klen] for i in range(len(cipher))])
+    if klen < chunk:
+        # tiled once, so any chunk is a single slice of it whatever its phase
+        key = np.resize(key, chunk + klen)
+    for start in range(0, len(data), chunk):
+        block = data[start:start + chunk]
+        out = np.empty_like(block)
+        at, done = (phase + start) % klen, 0
+        while done < len(block):
+            seg = key[at:at + len(block) - done]
+            np.bitwise_xor(block[done:done + len(seg)], seg, out=out[done:done + len(seg)])
+            done += len(seg)
+            at = 0
+        yield out
+
+def write_xor(out_path: Path, data, key, trailer=b""):
+    """Write data ^ key followed by trailer through an mmap of the output file."""
+    size = len(data) + len(trailer)
+    with open(out_path, "w+b") as f:
+        f.truncate(size)
+        if size:
+            with mmap.mmap(f.fileno(), size) as mm:
+                out = np.frombuffer(mm, dtype=np.uint8)
+                pos = 0
+                for block in xor_chunks(data, key):
+                    out[pos:pos + len(block)] = block
+                    pos += len(block)
+                out[pos:] = np.frombuffer(trailer, dtype=np.uint8)
+                del out
+    return size
+
+def compute_keystream_known_plain(cipher, known_plain: Path):
+    with open(known_plain, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as p:
+        n = min(len(cipher), len(p))
+        ks = np.empty(n, dtype=np.uint8)
+        for start in range(0, n, XOR_CHUNK):
+            end = min(start + XOR_CHUNK, n)
+            np.bitwise_xor(np.frombuffer(cipher, dtype=np.uint8, count=end - start, offset=start),
+                           np.frombuffer(p, dtype=np.uint8, count=end - start, offset=start),
+                           out=ks[start:end])
+    log(f"[+] Keystream computed ({n} bytes)")
+    return ks
+
+# Repeating-XOR cryptanalysis. Without known plaintext the key is recovered from the parts of a
+# PDF that are text (header objects and the xref/trailer at the end): guess the key length from
+# byte coincidences, then solve every key column at once against a printable-text score.
+
+# Score of a decoded byte: PDF text is mostly spaces, digits, newlines, names and brackets
+TEXT_SCORE = np.full(256, -2.0, dtype=np.float32)
+TEXT_SCORE[32:127] = 0.5
+for chars, weight in [(b" ", 4), (b"0123456789\n", 3), (b"/", 2.5),
+                      (b"abcdefghijklmnopqrstuvwxyz<>[]", 2), (b"ABCDEFGHIJKLMNOPQRSTUVWXYZ\r", 1.5)]:
+    TEXT_SCORE[list(chars)] = weight
+PRINTABLE = np.zeros(256, dtype=bool)
+PRINTABLE[32:127] = PRINTABLE[[9, 10, 13]] = True
+# XOR_SCORE[b, k]: score of ciphertext byte b decoded with key byte k
+XOR_SCORE = TEXT_SCORE[np.arange(256)[:, None] ^ np.arange(256)[None, :]]
+
+REPXOR_HEAD = 1024        # bytes sampled from the start of the file...
+REPXOR_TAIL = 4096        # ...and from the end (xref table + trailer)
+COINCIDENCE_WINDOW = 256  # key length is estimated per window, only the most text-like ones count
+TEXT_BLOCK = 32           # granularity used to drop binary stream data from the sample
+LENGTH_TOLERANCE = 0.01   # prefer the shortest key decoding within 1% as printable as the best
+MIN_TEXT_BLOCKS = 0.1     # share of sampled blocks a key must decode as text when the header doesn't
+                          # decode by itself (random data: ~0, the Invoice's binary-heavy tail: 0.29)
+MIN_COLUMN_BYTES = 20     # ...and sampled bytes per key byte, below which any data fits a key that well
+
+def coincidence_by_shift(c: np.ndarray, max_keylen: int):
+    """Index of coincidence for every shift 1..max_keylen, averaged over the 1/16 of windows where
+    it is highest (text regions; compressed streams sit at ~1/256 for every shift)."""
+    n = max(len(c) - max_keylen, 0) // COINCIDENCE_WINDOW * COINCIDENCE_WINDOW
+    if n == 0:
+        return np.zeros(max_keylen)
+    windows = np.stack([(c[:n] == c[k:n + k]).reshape(-1, COINCIDENCE_WINDOW).mean(axis=1)
+                        for k in range(1, max_keylen + 1)], axis=1)
+    return np.sort(windows, axis=0)[-max(1, len(windows) // 16):].mean(axis=0)
+
+def block_scores(vals: np.ndarray, pos: np.ndarray, key: np.ndarray):
+    """Mean TEXT_SCORE of every TEXT_BLOCK of the sample decoded with key, and each byte's block."""
+    _, block = np.unique(pos // TEXT_BLOCK, return_inverse=True)
+    return np.bincount(block, TEXT_SCORE[vals ^ key[pos % len(key)]]) / np.bincount(block), block
+
+def solve_columns(vals: np.ndarray, pos: np.ndarray, klen: int):
+    # Per-column byte histograms, log-damped so a column that keeps seeing the same plaintext byte
+    # (xref lines repeat every 20 bytes) doesn't drown out the rest, scored for all 256 key bytes
+    hist = np.zeros((klen, 256), dtype=np.float32)
+    np.add.at(hist, (pos % klen, vals), 1)
+    return (np.log1p(hist) @ XOR_SCORE).argmax(axis=1).astype(np.uint8)
+
+def repeating_xor_search(cipher, max_keylen=MAX_REPXOR_KEYLEN, max_offset=MAX_REPXOR_OFFSET, target=b"%PDF-",
+                         key_out=OUT_REPXOR_KEY_HEX):
+    c = np.frombuffer(cipher, dtype=np.uint8)
+    if len(c) < len(target):
+        return None
+
+    # Candidate lengths: the 4 shifts with the most coincidences and all their divisors
+    shifts = np.argsort(coincidence_by_shift(c, max_keylen))[::-1][:4] + 1
+    lengths = sorted({d for k in shifts for d in range(1, k + 1) if k % d == 0})
+
+    sample_pos = pos = np.union1d(np.arange(min(len(c), REPXOR_HEAD)), np.arange(max(0, len(c) - REPXOR_TAIL), len(c)))
+    sample = vals = c[pos]
+    keys = {k: solve_columns(vals, pos, k) for k in lengths}
+    printable = {k: PRINTABLE[vals ^ key[pos % k]].mean() for k, key in keys.items()}
+    best = max(printable.values())
+    klen = min(k for k in lengths if printable[k] >= best - LENGTH_TOLERANCE)
+    key = keys[klen]
+
+    # Re-solve on the blocks that decode as text, twice
+    for _ in range(2):
+        block_score, block = block_scores(vals, pos, key)
+        keep = block_score[block] > 1.0
+        if keep.sum() < 4 * klen:
+            break
+        vals, pos = vals[keep], pos[keep]
+        key = solve_columns(vals, pos, klen)
+
+    # Crib: the header has to decode, put it back where it matches best within max_offset. Any
+    # data solves to some key, so one that needs the header forced in must decode text already.
+    n = min(len(c), max_offset + len(target))
+    decoded = c[:n] ^ key[np.arange(n) % klen]
+    offset = decoded.tobytes().find(target)
+    if offset == -1:
+        text_blocks = (block_scores(sample, sample_pos, key)[0] > 1.0).mean()
+        if text_blocks < MIN_TEXT_BLOCKS or len(sample) < MIN_COLUMN_BYTES * klen:
+            log(f"[-] No repeating XOR key: best key (len={klen}) decodes {text_blocks:.0%} of {len(sample)} bytes as text")
+            return None
+        t = np.frombuffer(target, dtype=np.uint8)
+        offset = int(np.argmax((sliding_window_view(decoded, len(t)) == t).sum(axis=1)))
+        key[(offset + np.arange(len(t))) % klen] = c[offset:offset + len(t)] ^ t
+
+    if key_out:
+        key_out.write_text(key.tobytes().hex())
+    log(f"[+] Found repeating XOR key: {key.tobytes().hex()} (len={klen}, offset={offset})")
+    return key.tobytes().hex()
+
+def apply_xor(cipher: bytes, key: bytes, phase=0) -> bytes:
+    return b"".join(block.tobytes() for block in xor_chunks(cipher, key, phase))
 
 def extract_trailer_bytes(pdf_path: Path):
     b = pdf_path.read_bytes()
@@ -137,15 +374,21 @@ def extract_trailer_bytes(pdf_path: Path):
             return b[idx:]
     return None
 
-def append_trailer(source_pdf: Path, target_bytes: bytes) -> bytes:
+def missing_trailer(source_pdf: Path, tail: bytes) -> bytes:
+    # What append_trailer would add after a file ending in tail
     trailer = extract_trailer_bytes(source_pdf)
-    if trailer and b"%EOF" not in target_bytes[-1024:]:
+    if trailer and b"%EOF" not in tail[-1024:]:
+        return trailer
+    return b""
+
+def append_trailer(source_pdf: Path, target_bytes: bytes) -> bytes:
+    trailer = missing_trailer(source_pdf, target_bytes)
+    if trailer:
         log("[+] Appended trailer from source PDF.")
-        return target_bytes + trailer
-    return target_bytes
+    return target_bytes + trailer
 
 def cleanup_temp_files():
-    for f in [OUT_RAW_BIN, OUT_KEYSTREAM_BIN, OUT_REPXOR_KEY_HEX]:
+    for f in [OUT_REPXOR_KEY_HEX]:
         try:
             if f.exists():
                 f.unlink()
@@ -153,25 +396,129 @@ def cleanup_temp_files():
         except Exception:
             pass
 
-# --- Main flow ---
-
-def main():
-    recovered_bin = write_recovered_bin()
-    c_bytes = recovered_bin.read_bytes()
+# --- Keystream store ---
+# A keystream is filed under the fingerprint of its first bytes, which any PDF encrypted with it
+# gives away: ciphertext prefix XOR "%PDF-1.". Every capture sharing the keystream maps to the
+# same file, so one known plaintext decrypts all of them and a lookup is one path check.
+
+def keystream_fingerprint(cipher) -> str:
+    head = bytes(c ^ p for c, p in zip(bytes(cipher[:len(FINGERPRINT_CRIB)]), FINGERPRINT_CRIB))
+    return hashlib.blake2b(head, digest_size=8).hexdigest()
+
+def store_keystream(cipher, ks, store: Path = KEYSTREAM_STORE):
+    path = store / f"{keystream_fingerprint(cipher)}.bin"
+    if path.exists() and path.stat().st_size >= len(ks):
+        return path
+    store.mkdir(parents=True, exist_ok=True)
+    # written aside and renamed, batch workers may store the same keystream concurrently
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_bytes(memoryview(ks))
+    os.replace(tmp, path)
+    log(f"[+] Keystream stored -> {path}")
+    return path
+
+def load_keystream(cipher, store: Path = KEYSTREAM_STORE):
+    path = store / f"{keystream_fingerprint(cipher)}.bin"
+    return path.read_bytes() if path.exists() else None
+
+def field_prefix(post_txt: Path, field: FormField, size=REUSE_PREFIX) -> bytes:
+    # Only the first chunk of the value is decoded
+    with open(post_txt, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return next(iter_field_bytes(mm, field, chunk=size * 4 // 3 + 8), b"")[:size]
+
+def find_keystream_reuse(prefixes):
+    """Pairs (i, j, coincidence, z) of ciphertexts whose bytes agree far more often than independent
+    keystreams allow: c_i ^ c_j = p_i ^ p_j, which is zero wherever the plaintexts agree. Equal
+    bytes are binomial(length, 1/256) for independent keystreams; z is the count's distance from
+    that mean in standard deviations, so the cutoff scales with the compared length."""
+    length = min([len(p) for p in prefixes if len(p) >= 64], default=0)
+    rows = [i for i, p in enumerate(prefixes) if length and len(p) >= length]
+    if len(rows) < 2:
+        return []
+    m = np.stack([np.frombuffer(prefixes[i][:length], dtype=np.uint8) for i in rows])
+    mean = length / 256
+    sd = (length * (1 / 256) * (255 / 256)) ** 0.5
+    pairs = []
+    for a in range(len(rows) - 1):
+        equal = (m[a + 1:] == m[a]).sum(axis=1)
+        z = (equal - mean) / sd
+        for b in np.flatnonzero(z > REUSE_Z):
+            pairs.append((rows[a], rows[a + 1 + b], round(float(equal[b] / length), 4), round(float(z[b]), 1)))
+    return pairs
+
+def keystream_reuse_report(captures):
+    """Group every file= payload of the captures by shared keystream (fingerprint or coincidence)."""
+    members = [(post_txt, i, field) for post_txt in captures for i, field in enumerate(form_fields(post_txt))]
+    prefixes = [field_prefix(post_txt, field) for post_txt, _, field in members]
+    pairs = find_keystream_reuse(prefixes)
+
+    parent = list(range(len(members)))
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    by_fingerprint = {}
+    for i, prefix in enumerate(prefixes):
+        if len(prefix) >= len(FINGERPRINT_CRIB):
+            first = by_fingerprint.setdefault(keystream_fingerprint(prefix), i)
+            parent[root(i)] = root(first)
+    for a, b, *_ in pairs:
+        parent[root(b)] = root(a)
+
+    groups = {}
+    for i, (post_txt, index, _) in enumerate(members):
+        groups.setdefault(root(i), []).append({"input": str(post_txt), "field": index,
+                                               "fingerprint": keystream_fingerprint(prefixes[i])})
+    return {"groups": [g for g in groups.values() if len(g) > 1],
+            "pairs": [{"a": members[a][0].name + f"#{members[a][1]}", "b": members[b][0].name + f"#{members[b][1]}",
+                       "coincidence": c, "z": z} for a, b, c, z in pairs]}
 
-    ks_path = compute_keystream_known_plain(recovered_bin, KNOWN_PLAINTEXT_PDF)
-    ks = ks_path.read_bytes()
-    decrypted = apply_xor(c_bytes, ks)
+# --- Main flow ---
 
-    if b"%PDF-" not in decrypted[:1024]:
+def recover(post_txt: Path, known_plain, out_pdf: Path, key_out=OUT_REPXOR_KEY_HEX, index=0, c_bytes=None,
+            store=KEYSTREAM_STORE):
+    """Decrypt the index-th file= payload of one capture into out_pdf, with the keystream from
+    known_plain, else a stored keystream for the same fingerprint, else the repeating-XOR search.
+    Returns what was done."""
+    if c_bytes is None:
+        c_bytes = decode_post(post_txt, index)
+    result = {"input": str(post_txt), "field": index, "original": str(known_plain) if known_plain else None,
+              "size": len(c_bytes), "fingerprint": keystream_fingerprint(c_bytes), "method": "keystream"}
+    key = b""
+    if known_plain:
+        key = compute_keystream_known_plain(c_bytes, known_plain)
+    elif store and (stored := load_keystream(c_bytes, store)):
+        key = stored
+        result["method"] = "stored keystream"
+        log(f"[+] Using stored keystream {result['fingerprint']} ({len(key)} bytes)")
+
+    # Only the head and tail are needed to pick the key and the trailer; the body is decrypted
+    # straight into the output file
+    if not len(key) or b"%PDF-" not in apply_xor(c_bytes[:1024], key):
         log("[!] Keystream method didn’t reveal PDF header. Trying repeating-XOR search...")
-        key_hex = repeating_xor_search(recovered_bin, MAX_REPXOR_KEYLEN, MAX_REPXOR_OFFSET)
+        key_hex = repeating_xor_search(c_bytes, MAX_REPXOR_KEYLEN, MAX_REPXOR_OFFSET, key_out=key_out)
         if key_hex:
-            decrypted = apply_xor(c_bytes, bytes.fromhex(key_hex))
+            key = bytes.fromhex(key_hex)
+            result.update(method="repxor", key=key_hex)
+        elif not len(key):
+            raise ValueError(f"No key found for {post_txt}")
+    elif known_plain and store:
+        store_keystream(c_bytes, key, store)
+
+    tail_start = max(0, len(c_bytes) - 1024)
+    trailer = b""
+    if known_plain:
+        trailer = missing_trailer(known_plain, apply_xor(c_bytes[tail_start:], key, tail_start))
+    if trailer:
+        log("[+] Appended trailer from source PDF.")
+    write_xor(out_pdf, c_bytes, key, trailer)
+    log(f"[+] Final recovered PDF written to {out_pdf}")
+    result.update(output_pdf=str(out_pdf), trailer_appended=bool(trailer))
+    return result
 
-    decrypted = append_trailer(TRAILER_SOURCE_PDF, decrypted)
-    OUT_DEOBF_PDF.write_bytes(decrypted)
-    log(f"[+] Final recovered PDF written to {OUT_DEOBF_PDF}")
+def main(store=KEYSTREAM_STORE):
+    recover(POST_TXT_PATH, KNOWN_PLAINTEXT_PDF, OUT_DEOBF_PDF, store=store)
 
     cleanup_temp_files()
 
@@ -183,5 +530,101 @@ def main():
     }
     print(json.dumps(summary, indent=2))
 
+# --- Batch mode ---
+
+def expand_paths(spec: str, default_glob: str):
+    # A directory (searched with default_glob) or a glob pattern
+    path = Path(spec)
+    if path.is_dir():
+        return sorted(path.glob(default_glob))
+    return sorted(Path(p) for p in glob.glob(spec, recursive=True))
+
+def index_plaintexts(paths):
+    """(size, path) of every candidate plaintext with the expected header, sorted by size."""
+    index = []
+    for path in paths:
+        with open(path, "rb") as f:
+            if f.read(len(PLAINTEXT_MAGIC)) == PLAINTEXT_MAGIC:
+                index.append((path.stat().st_size, path))
+    return sorted(index)
+
+def match_plaintext(cipher_len: int, index):
+    # Largest plaintext that fits: the capture is the plaintext plus at most MAX_CIPHER_OVERHEAD bytes
+    i = bisect_right([size for size, _ in index], cipher_len) - 1
+    if i >= 0 and cipher_len - index[i][0] <= MAX_CIPHER_OVERHEAD:
+        return index[i][1]
+    return None
+
+def recover_field(post_txt: Path, i: int, field: FormField, out_pdf: Path, index, store):
+    try:
+        c_bytes = decode_field(post_txt, field)
+        known_plain = match_plaintext(len(c_bytes), index)
+        result = recover(post_txt, known_plain, out_pdf, key_out=None, index=i, c_bytes=c_bytes, store=store)
+        result["request"] = field.request
+    except Exception as e:
+        result = {"input": str(post_txt), "field": i, "request": field.request, "error": f"{type(e).__name__}: {e}"}
+    return result
+
+def recover_job(post_txt: Path, index, out_dir: Path, store=KEYSTREAM_STORE):
+    # Every file= field of the capture (one per exfiltrating request) is recovered
+    fields = form_fields(post_txt)
+    if not fields:
+        return [{"input": str(post_txt), "error": "no 'file=' parameter"}]
+    results = []
+    for i, field in enumerate(fields):
+        name = f"{post_txt.stem}_recovered.pdf" if len(fields) == 1 else f"{post_txt.stem}_{i}_recovered.pdf"
+        result = recover_field(post_txt, i, field, out_dir / name, index, store)
+        result["output_name"] = name
+        results.append(result)
+    return results
+
+def retry_job(result, index, out_dir: Path, store):
+    post_txt = Path(result["input"])
+    field = form_fields(post_txt)[result["field"]]
+    retried = recover_field(post_txt, result["field"], field, out_dir / result["output_name"], index, store)
+    retried["output_name"] = result["output_name"]
+    return retried
+
+def batch(captures, plaintexts, out_dir: Path, manifest: Path, jobs=None, store=KEYSTREAM_STORE):
+    index = index_plaintexts(plaintexts)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = [r for job in pool.map(recover_job, captures, repeat(index), repeat(out_dir), repeat(store)) for r in job]
+        # Captures that fell back to the XOR search but share a keystream one of their siblings
+        # just stored get decrypted with it instead
+        retry = [i for i, r in enumerate(results)
+                 if store and r.get("method") == "repxor" and (store / f"{r['fingerprint']}.bin").exists()]
+        for i, r in zip(retry, pool.map(retry_job, [results[i] for i in retry], repeat(index), repeat(out_dir), repeat(store))):
+            results[i] = r
+    report = {"plaintexts": [str(p) for _, p in index], "recovered": results,
+              "keystream_reuse": keystream_reuse_report(captures)}
+    manifest.write_text(json.dumps(report, indent=2))
+    failed = sum("error" in r for r in results)
+    log(f"[+] {len(results) - failed}/{len(results)} payloads recovered, manifest written to {manifest}")
+    return results
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = ArgumentParser(description="Recover obfuscated PDFs from captured POST bodies.")
+    parser.add_argument("--batch", metavar="CAPTURES", help="Directory (*.txt) or glob of captured POST bodies; without it the which_one capture is recovered")
+    parser.add_argument("--plaintexts", metavar="POOL", default=str(DISCOVERIES_DIR / "*_original.pdf"), help="Directory (*.pdf) or glob of candidate known plaintexts (Default: discoveries/pdfs/*_original.pdf)")
+    parser.add_argument("-o", "--out-dir", default=str(DISCOVERIES_DIR / "recovered"), help="Where batch mode writes the recovered PDFs")
+    parser.add_argument("-m", "--manifest", help="Batch JSON manifest path (Default: <out-dir>/manifest.json)")
+    parser.add_argument("-j", "--jobs", type=int, help="Worker processes (Default: CPU count)")
+    parser.add_argument("--fields", metavar="CAPTURE", help="List the form fields in a capture and exit")
+    parser.add_argument("--names", nargs="+", default=["file"], help="(--fields) Field names to look for (Default: file)")
+    parser.add_argument("--store", default=str(KEYSTREAM_STORE), help="Keystream store directory, '' to disable (Default: discoveries/pdfs/keystreams)")
+    parser.add_argument("--reuse", metavar="CAPTURES", help="Report captures encrypted with the same keystream and exit")
+    args = parser.parse_args()
+    store = Path(args.store) if args.store else None
+
+    if args.fields:
+        for field in form_fields(Path(args.fields), args.names):
+            print(f"request {field.request:>4}  {field.name:<16} offset {field.start:>12}  length {field.end - field.start:>12}")
+    elif args.reuse:
+        print(json.dumps(keystream_reuse_report(expand_paths(args.reuse, "*.txt")), indent=2))
+    elif args.batch:
+        out_dir = Path(args.out_dir)
+        batch(expand_paths(args.batch, "*.txt"), expand_paths(args.plaintexts, "*.pdf"), out_dir,
+              Path(args.manifest) if args.manifest else out_dir / "manifest.json", args.jobs, store)
+    else:
+        main(store)
@@ -0,0 +1,402 @@
+"""
+HTTP/2 Frame and HPACK Decoder
+------------------------------
+
+Reads one direction of a decrypted HTTP/2 connection as raw bytes and demultiplexes it
+into per-stream header lists and bodies, which `chatgpt_responses.py --http2` then parses
+as SSE. Export the capture from Wireshark with Follow > TLS Stream, showing only the
+server's side (or the client's), as Raw.
+
+- Frames are parsed out of fixed-size reads, so the capture is never loaded whole; only
+  the bodies of the streams still open are buffered.
+- DATA/HEADERS padding and priority fields are stripped, CONTINUATION frames are joined
+  to their header block, and every header block (PUSH_PROMISE too) goes through one HPACK
+  decoder so its dynamic table stays in sync with the sender's.
+- A client connection preface at the start is skipped.
+
+The t*-tls_stream.txt dumps in discoveries/chatgpt are printable text with '.' in place of
+every other byte, so their frame headers are gone; they need the raw export for this.
+
+    python3 http2_stream.py server.bin              # list the streams
+    python3 http2_stream.py server.bin -x bodies/   # and write every body out
+"""
+
+import os
+import struct
+import zlib
+from argparse import ArgumentParser
+from collections import deque
+from typing import NamedTuple
+
+PREFACE = b"PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n"
+CHUNK_SIZE = 1 << 20
+FRAME_HEADER = struct.Struct(">BHBBL")  # 24-bit length as 8 + 16 bits, type, flags, stream id
+
+DATA, HEADERS, PRIORITY, RST_STREAM, SETTINGS, PUSH_PROMISE, PING, GOAWAY, WINDOW_UPDATE, CONTINUATION = range(10)
+END_STREAM, END_HEADERS, PADDED, PRIORITY_FLAG = 0x1, 0x4, 0x8, 0x20
+
+# RFC 7541: dynamic table entries are charged 32 bytes on top of name and value, and the
+# table starts at 4096 bytes until the encoder sends a size update
+ENTRY_OVERHEAD = 32
+DEFAULT_TABLE_SIZE = 4096
+
+# Code length of every symbol (256 is EOS) of the HPACK Huffman code, RFC 7541 Appendix B.
+# The code is canonical, so the codes themselves follow from the lengths.
+HUFFMAN_LENGTHS = (
+    13, 23, 28, 28, 28, 28, 28, 28, 28, 24, 30, 28, 28, 30, 28, 28,
+    28, 28, 28, 28, 28, 28, 30, 28, 28, 28, 28, 28, 28, 28, 28, 28,
+    6, 10, 10, 12, 13, 6, 8, 11, 10, 10, 8, 11, 8, 6, 6, 6,
+    5, 5, 5, 6, 6, 6, 6, 6, 6, 6, 7, 8, 15, 6, 12, 10,
+    13, 6, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7, 7,
+    7, 7, 7, 7, 7, 7, 7, 7, 8, 7, 8, 13, 19, 13, 14, 6,
+    15, 5, 6, 5, 6, 5, 6, 6, 6, 5, 7, 7, 6, 6, 6, 5,
+    6, 7, 6, 5, 5, 6, 7, 7, 7, 7, 7, 15, 11, 14, 13, 28,
+    20, 22, 20, 20, 22, 22, 22, 23, 22, 23, 23, 23, 23, 23, 24, 23,
+    24, 24, 22, 23, 24, 23, 23, 23, 23, 21, 22, 23, 22, 23, 23, 24,
+    22, 21, 20, 22, 22, 23, 23, 21, 23, 22, 22, 24, 21, 22, 23, 23,
+    21, 21, 22, 21, 23, 22, 23, 23, 20, 22, 22, 22, 23, 22, 22, 23,
+    26, 26, 20, 19, 22, 23, 22, 25, 26, 26, 26, 27, 27, 26, 24, 25,
+    19, 21, 26, 27, 27, 26, 27, 24, 21, 21, 26, 26, 28, 27, 27, 27,
+    20, 24, 20, 21, 22, 21, 21, 23, 22, 22, 25, 25, 24, 24, 26, 23,
+    26, 27, 26, 26, 27, 27, 27, 27, 27, 28, 27, 27, 27, 27, 27, 26,
+    30,
+)
+STATIC_TABLE = (
+    (':authority', ''),
+    (':method', 'GET'),
+    (':method', 'POST'),
+    (':path', '/'),
+    (':path', '/index.html'),
+    (':scheme', 'http'),
+    (':scheme', 'https'),
+    (':status', '200'),
+    (':status', '204'),
+    (':status', '206'),
+    (':status', '304'),
+    (':status', '400'),
+    (':status', '404'),
+    (':status', '500'),
+    ('accept-charset', ''),
+    ('accept-encoding', 'gzip, deflate'),
+    ('accept-language', ''),
+    ('accept-ranges', ''),
+    ('accept', ''),
+    ('access-control-allow-origin', ''),
+    ('age', ''),
+    ('allow', ''),
+    ('authorization', ''),
+    ('cache-control', ''),
+    ('content-disposition', ''),
+    ('content-encoding', ''),
+    ('content-language', ''),
+    ('content-length', ''),
+    ('content-location', ''),
+    ('content-range', ''),
+    ('content-type', ''),
+    ('cookie', ''),
+    ('date', ''),
+    ('etag', ''),
+    ('expect', ''),
+    ('expires', ''),
+    ('from', ''),
+    ('host', ''),
+    ('if-match', ''),
+    ('if-modified-since', ''),
+    ('if-none-match', ''),
+    ('if-range', ''),
+    ('if-unmodified-since', ''),
+    ('last-modified', ''),
+    ('link', ''),
+    ('location', ''),
+    ('max-forwards', ''),
+    ('proxy-authenticate', ''),
+    ('proxy-authorization', ''),
+    ('range', ''),
+    ('referer', ''),
+    ('refresh', ''),
+    ('retry-after', ''),
+    ('server', ''),
+    ('set-cookie', ''),
+    ('strict-transport-security', ''),
+    ('transfer-encoding', ''),
+    ('user-agent', ''),
+    ('vary', ''),
+    ('via', ''),
+    ('www-authenticate', ''),
+)
+
+EOS = 256
+
+
+def canonical_decoding(lengths):
+    """(length, first code, code past the last, symbols) for every code length in use,
+    shortest first. In a canonical code the codes of one length are consecutive, and any
+    longer code starts with a value past the last of them."""
+    table = []
+    code = prev = 0
+    for length in sorted(set(lengths)):
+        symbols = [s for s, l in enumerate(lengths) if l == length]
+        code <<= length - prev
+        table.append((length, code, code + len(symbols), symbols))
+        code += len(symbols)
+        prev = length
+    return table
+
+
+HUFFMAN_DECODE = canonical_decoding(HUFFMAN_LENGTHS)
+
+
+def huffman_decode(data: bytes) -> bytes:
+    out = bytearray()
+    acc = nbits = 0
+    for byte in data:
+        acc = (acc << 8) | byte
+        nbits += 8
+        while True:
+            symbol = None
+            for length, first, limit, symbols in HUFFMAN_DECODE:
+                if length > nbits:
+                    break  # needs more input
+                code = acc >> (nbits - length)
+                if code < limit:
+                    symbol = symbols[code - first]
+                    break
+            if symbol is None:
+                break
+            if symbol == EOS:
+                raise ValueError("EOS inside a Huffman string")
+            out.append(symbol)
+            nbits -= length
+            acc &= (1 << nbits) - 1
+    # what is left must be padding: the top bits of EOS, all ones
+    if nbits > 7 or acc != (1 << nbits) - 1:
+        raise ValueError("invalid Huffman padding")
+    return bytes(out)
+
+
+def decode_int(data: bytes, pos: int, prefix: int):
+    """HPACK integer with a prefix-bit first byte; returns (value, next position)."""
+    mask = (1 << prefix) - 1
+    value = data[pos] & mask
+    pos += 1
+    if value < mask:
+        return value, pos
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value += (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def decode_string(data: bytes, pos: int):
+    huffman = data[pos] & 0x80
+    length, pos = decode_int(data, pos, 7)
+    raw = data[pos:pos + length]
+    if len(raw) < length:
+        raise ValueError("truncated header string")
+    return (huffman_decode(raw) if huffman else raw).decode("utf-8", errors="replace"), pos + length
+
+
+class HpackDecoder:
+    """Header block decoder for one direction of a connection (RFC 7541)."""
+
+    def __init__(self, max_size: int = DEFAULT_TABLE_SIZE):
+        self.dynamic = deque()  # newest entry first
+        self.size = 0
+        self.max_size = max_size
+
+    def entry(self, index: int):
+        if 0 < index <= len(STATIC_TABLE):
+            return STATIC_TABLE[index - 1]
+        if 0 < index - len(STATIC_TABLE) <= len(self.dynamic):
+            return self.dynamic[index - len(STATIC_TABLE) - 1]
+        raise ValueError(f"header table index {index} out of range")
+
+    def evict(self):
+        while self.size > self.max_size:
+            name, value = self.dynamic.pop()
+            self.size -= len(name.encode()) + len(value.encode()) + ENTRY_OVERHEAD
+
+    def add(self, name: str, value: str):
+        self.dynamic.appendleft((name, value))
+        self.size += len(name.encode()) + len(value.encode()) + ENTRY_OVERHEAD
+        self.evict()
+
+    def decode(self, block: bytes) -> list:
+        """The (name, value) pairs of a complete header block, updating the dynamic table."""
+        headers = []
+        pos = 0
+        try:
+            while pos < len(block):
+                byte = block[pos]
+                if byte & 0x80:  # indexed field
+                    index, pos = decode_int(block, pos, 7)
+                    headers.append(self.entry(index))
+                    continue
+                if byte & 0xE0 == 0x20:  # dynamic table size update
+                    self.max_size, pos = decode_int(block, pos, 5)
+                    self.evict()
+                    continue
+                indexing = byte & 0x40  # else literal without indexing or never indexed
+                index, pos = decode_int(block, pos, 6 if indexing else 4)
+                if index:
+                    name = self.entry(index)[0]
+                else:
+                    name, pos = decode_string(block, pos)
+                value, pos = decode_string(block, pos)
+                if indexing:
+                    self.add(name, value)
+                headers.append((name, value))
+        except IndexError:
+            raise ValueError("truncated header block") from None
+        return headers
+
+
+class Frame(NamedTuple):
+    type: int
+    flags: int
+    stream_id: int
+    payload: bytes
+
+
+class Stream(NamedTuple):
+    stream_id: int
+    headers: list  # (name, value) pairs of every header block, trailers included
+    body: bytes
+    complete: bool  # ended with END_STREAM, not reset or cut off by the end of the capture
+
+
+def iter_frames(src, chunk_size: int = CHUNK_SIZE):
+    """Yield every complete frame read from the binary file src, chunk_size bytes at a time."""
+    buf = bytearray()
+    pos = 0
+    start = True
+    while True:
+        chunk = src.read(chunk_size)
+        buf += chunk
+        if start and (len(buf) >= len(PREFACE) or not chunk):
+            pos = len(PREFACE) if buf.startswith(PREFACE) else 0
+            start = False
+        while not start and len(buf) - pos >= FRAME_HEADER.size:
+            high, low, ftype, flags, stream_id = FRAME_HEADER.unpack_from(buf, pos)
+            end = pos + FRAME_HEADER.size + (high << 16 | low)
+            if end > len(buf):
+                break
+            yield Frame(ftype, flags, stream_id & 0x7FFFFFFF, bytes(buf[pos + FRAME_HEADER.size:end]))
+            pos = end
+        if not chunk:
+            return
+        del buf[:pos]
+        pos = 0
+
+
+def frame_content(frame: Frame) -> bytes:
+    """Payload of a DATA, HEADERS or PUSH_PROMISE frame without padding, priority fields or
+    promised stream id."""
+    payload = frame.payload
+    start, end = 0, len(payload)
+    if frame.flags & PADDED:
+        start, end = 1, end - payload[0]
+    if frame.type == HEADERS and frame.flags & PRIORITY_FLAG:
+        start += 5
+    elif frame.type == PUSH_PROMISE:
+        start += 4
+    if start > end:
+        raise ValueError(f"frame on stream {frame.stream_id} shorter than its padding")
+    return payload[start:end]
+
+
+def iter_streams(src, chunk_size: int = CHUNK_SIZE):
+    """Demultiplex the frames read from src; yield a Stream as soon as each stream ends, then
+    the ones still open when the capture does (complete=False)."""
+    hpack = HpackDecoder()
+    streams = {}  # stream id -> (header pairs, body fragments), in order of first frame
+    block = None  # (stream id, fragments, end stream) of a header block awaiting CONTINUATION
+
+    def finish(stream_id, complete):
+        headers, body = streams.pop(stream_id, ([], []))
+        return Stream(stream_id, headers, b"".join(body), complete)
+
+    for frame in iter_frames(src, chunk_size):
+        if frame.type == DATA:
+            streams.setdefault(frame.stream_id, ([], []))[1].append(frame_content(frame))
+            if frame.flags & END_STREAM:
+                yield finish(frame.stream_id, True)
+            continue
+        if frame.type in (HEADERS, PUSH_PROMISE):
+            # a pushed request's headers belong to the promised stream
+            if frame.type == HEADERS:
+                stream_id = frame.stream_id
+            else:
+                start = 1 if frame.flags & PADDED else 0
+                stream_id = int.from_bytes(frame.payload[start:start + 4], "big") & 0x7FFFFFFF
+            block = (stream_id, [frame_content(frame)], frame.type == HEADERS and frame.flags & END_STREAM)
+        elif frame.type == CONTINUATION and block:
+            block[1].append(frame.payload)
+        elif frame.type == RST_STREAM and frame.stream_id in streams:
+            yield finish(frame.stream_id, False)
+            continue
+        else:
+            continue
+        if frame.flags & END_HEADERS:
+            stream_id, fragments, end_stream = block
+            block = None
+            streams.setdefault(stream_id, ([], []))[0].extend(hpack.decode(b"".join(fragments)))
+            if end_stream:
+                yield finish(stream_id, True)
+    for stream_id in list(streams):
+        yield finish(stream_id, False)
+
+
+def header(stream: Stream, name: str, default: str = "") -> str:
+    """Last value of a header (names are lowercase in HTTP/2)."""
+    for key, value in reversed(stream.headers):
+        if key == name:
+            return value
+    return default
+
+
+def decoded_body(stream: Stream) -> bytes:
+    """Body with its gzip/deflate (or, if the brotli package is installed, br) content
+    encoding undone; other encodings and bodies cut short come back as captured."""
+    encoding = header(stream, "content-encoding").strip().lower()
+    if encoding in ("gzip", "x-gzip", "deflate"):
+        try:
+            # decompressobj rather than decompress, so a truncated body yields what it holds
+            wbits = 16 + zlib.MAX_WBITS if encoding != "deflate" else zlib.MAX_WBITS
+            return zlib.decompressobj(wbits).decompress(stream.body)
+        except zlib.error:
+            pass
+    elif encoding == "br":
+        try:
+            import brotli
+
+            return brotli.decompress(stream.body)
+        except ImportError:
+            pass
+        except brotli.error:
+            pass
+    return stream.body
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="List (and extract) the streams of a raw HTTP/2 capture, one direction of a connection.")
+    parser.add_argument("input", help="Decrypted HTTP/2 bytes, e.g. Wireshark's Follow TLS Stream saved as Raw")
+    parser.add_argument("-x", "--extract", help="Directory to write each stream's decoded body to")
+    args = parser.parse_args()
+
+    if args.extract:
+        os.makedirs(args.extract, exist_ok=True)
+    with open(args.input, "rb") as f:
+        print(f"{'stream':>8} {'body':>10}  status  request / content-type")
+        for stream in iter_streams(f):
+            body = decoded_body(stream)
+            what = header(stream, ":status") or f"{header(stream, ':method')} {header(stream, ':path')}"
+            state = "" if stream.complete else "  (incomplete)"
+            print(f"{stream.stream_id:>8} {len(body):>10}  {what:<6}  {header(stream, 'content-type')}{state}")
+            if args.extract:
+                with open(os.path.join(args.extract, f"stream_{stream.stream_id}.bin"), "wb") as out:
+                    out.write(body)
@@ -0,0 +1,187 @@
+"""
+IRC Timeline Rebuilder
+----------------------
+
+Rebuilds the chat of the chat.freenode.net TCP stream exports as one timeline, in the
+format of `cleaned_full_chat_freenode.txt`: the capturing client's own messages are
+labelled `PRIVMSG`, everyone else's by nick, with `# <day> <part of day>` headings and
+an `# end of <stream>` line when a capture's connection ends.
+
+- Every export is read line by line with one compiled IRC line parser
+  (`[@tags] [:prefix] COMMAND params`). Server lines carry an IRCv3 `time` tag; the
+  client's own lines have none and take the time of the last server line before them.
+- PRIVMSG, JOIN, NICK, PART and QUIT are kept. NICK tracks the client's current nick so
+  echoed copies of its own messages are dropped; CTCP requests (VERSION probes, shown
+  as `.VERSION.` in the dumps) are skipped.
+- The per-stream event generators are merged by (time, stream, line) with a heap, so
+  any number of captures is rebuilt in one pass holding one pending event per capture.
+
+    python3 irc_timeline.py                                  # all t*-tcp_stream_*.txt
+    python3 irc_timeline.py caps/*.txt -o timeline.txt --events --utc-offset 1
+"""
+
+import heapq
+import re
+import sys
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+from glob import glob
+from pathlib import Path
+from typing import NamedTuple
+
+CAPTURES = "../discoveries/chat.freenode.net/t*-tcp_stream_*.txt"
+OWN = "PRIVMSG"  # speaker label for the capturing client, as in cleaned_full_chat_freenode.txt
+COMMANDS = {"PRIVMSG", "JOIN", "NICK", "PART", "QUIT"}
+
+# [@tags] [:prefix] COMMAND [params]
+LINE = re.compile(r"(?:@(\S+) +)?(?::(\S+) +)?([A-Za-z]+|\d{3})(?: +(.*))?$")
+TIME_TAG = re.compile(r"(?:^|;)time=([^;]+)")
+# the dumps print CTCP's \x01 delimiters as '.'
+CTCP = re.compile(r"[.\x01][A-Z]+(?: .*)?[.\x01]$")
+
+
+class Event(NamedTuple):
+    time: str  # ISO 8601 UTC from the server-time tag, "" before the first one
+    stream: int
+    seq: int
+    kind: str  # PRIVMSG, JOIN, NICK, PART, QUIT, or END when the capture runs out
+    nick: str
+    target: str
+    text: str
+
+
+def parse_params(params: str) -> list:
+    if not params:
+        return []
+    if params.startswith(":"):
+        return [params[1:]]
+    middle, colon, trailing = params.partition(" :")
+    return middle.split() + ([trailing] if colon else [])
+
+
+def iter_events(path, stream: int = 0):
+    """Yield the Events of one capture in order, ending with an END event."""
+    own = None  # the client's current nick
+    time = ""
+    seq = 0
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            m = LINE.match(line.rstrip("\r\n"))
+            if not m:
+                continue
+            tags, prefix, command, params = m.groups()
+            if tags:
+                tag = TIME_TAG.search(tags)
+                if tag:
+                    time = tag.group(1)
+            command = command.upper()
+            if command not in COMMANDS:
+                continue
+            args = parse_params(params)
+            nick = prefix.split("!", 1)[0] if prefix else None  # None: sent by the client
+            if command == "NICK":
+                if not args:
+                    continue
+                if nick is None or nick == own:
+                    own = args[0]
+                    if nick is None:  # the request; the server's NICK reply is the event
+                        continue
+                target, text = "", args[0]
+            elif command == "PRIVMSG":
+                if len(args) < 2 or CTCP.match(args[1]):
+                    continue
+                if nick is not None and nick == own:
+                    continue  # echo-message copy of a line the client sent
+                target, text = args[0], args[1].rstrip()
+            elif command == "QUIT":
+                target, text = "", args[0] if args else ""
+            else:  # JOIN / PART; the server's reply carries the nick
+                if nick is None or not args:
+                    continue
+                target, text = args[0], args[1] if command == "PART" and len(args) > 1 else ""
+            yield Event(time, stream, seq, command, OWN if nick is None else nick, target, text)
+            seq += 1
+    yield Event(time, stream, seq, "END", "", "", "")
+
+
+def merge_streams(paths):
+    """k-way merge of the captures' events by (time, stream, line)."""
+    return heapq.merge(*(iter_events(path, i) for i, path in enumerate(paths)))
+
+
+def period(time: str, utc_offset: float = 0):
+    """'7 of october 2025 afternoon' for a server-time tag, None without one."""
+    if not time:
+        return None
+    when = datetime.strptime(time[:19], "%Y-%m-%dT%H:%M:%S") + timedelta(hours=utc_offset)
+    part = "morning" if when.hour < 12 else "afternoon" if when.hour < 18 else "evening" if when.hour < 22 else "night"
+    return f"{when.day} of {when.strftime('%B').lower()} {when.year} {part}"
+
+
+def event_line(event: Event) -> str:
+    if event.kind == "PRIVMSG":
+        return f"{event.nick}: {event.text}"
+    if event.kind == "JOIN":
+        return f"* {event.nick} joined {event.target}"
+    if event.kind == "PART":
+        return f"* {event.nick} left {event.target}" + (f" ({event.text})" if event.text else "")
+    if event.kind == "NICK":
+        return f"* {event.nick} is now known as {event.text}"
+    return f"* {event.nick} quit" + (f" ({event.text})" if event.text else "")
+
+
+def write_timeline(events, names, dst, channels=None, show_events=False, utc_offset: float = 0) -> int:
+    """Write the merged events in the cleaned chat format; returns the messages written."""
+    section = None
+    last = None  # kind of the previous thing written: "line", "end" or None
+    count = 0
+    for event in events:
+        if event.kind == "END":
+            if last == "line":
+                dst.write("\n")
+            dst.write(f"# end of {names[event.stream]}\n")
+            last = "end"
+            continue
+        if event.kind == "PRIVMSG":
+            if channels is not None and event.target not in channels:
+                continue
+            count += 1
+        elif not show_events:
+            continue
+        label = period(event.time, utc_offset)
+        if label and label != section:
+            if last == "line":
+                dst.write("\n")
+            dst.write(f"# {label}\n\n")
+            section = label
+        elif last == "end":
+            dst.write("\n")
+        dst.write(event_line(event) + "\n")
+        last = "line"
+    return count
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Merge IRC TCP stream exports into one cleaned chat timeline.")
+    parser.add_argument("captures", nargs="*", help=f"TCP stream exports (Default: {CAPTURES})")
+    parser.add_argument("-o", "--output", help="Output file (Default: stdout)")
+    parser.add_argument("-c", "--channel", action="append", help="Only messages to this channel or nick, repeatable (Default: channels)")
+    parser.add_argument("--events", action="store_true", help="Also write joins, parts, nick changes and quits")
+    parser.add_argument("--utc-offset", type=float, default=0, help="Hours added to the UTC timestamps for the headings (Default: 0)")
+    args = parser.parse_args()
+
+    paths = args.captures or sorted(glob(CAPTURES))
+    names = [Path(p).stem for p in paths]
+    dst = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        # without -c, private messages are left out like the CTCP noise they mostly are
+        channels = set(args.channel) if args.channel else None
+        events = merge_streams(paths)
+        if channels is None:
+            events = (e for e in events if e.kind != "PRIVMSG" or e.target[:1] in "#&")
+        count = write_timeline(events, names, dst, channels, args.events, args.utc_offset)
+    finally:
+        if args.output:
+            dst.close()
+    if args.output:
+        print(f"[+] {count} messages from {len(paths)} captures -> {args.output}")
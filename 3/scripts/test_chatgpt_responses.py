@@ -0,0 +1,39 @@
+import pytest
+
+import chatgpt_responses
+
+WORDS = frozenset({"you", "can", "use", "to", "do", "tell", "me", "which", "parts", "want", "help", "create",
+                   "an", "algorithm", "not", "cannot", "in", "into", "form", "information", "companies", "the"})
+
+
+def use_lexicon(monkeypatch, words):
+    monkeypatch.setattr(chatgpt_responses, "lexicon", lambda: words)
+    chatgpt_responses.group_cost.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def fresh_costs():
+    yield
+    chatgpt_responses.group_cost.cache_clear()
+
+
+@pytest.mark.parametrize("words", [chatgpt_responses.FALLBACK_WORDS, WORDS], ids=["fallback", "lexicon"])
+@pytest.mark.parametrize("line", [
+    "you can use to do lawful",
+    "Tell me which parts you want",
+    "I can't help create an algorithm",
+    "Hashcat can not run in to the box",
+])
+def test_ordinary_sentences_unchanged(monkeypatch, words, line):
+    use_lexicon(monkeypatch, words)
+    assert chatgpt_responses.repair_line(line) == line
+
+
+def test_split_words_rejoined(monkeypatch):
+    use_lexicon(monkeypatch, WORDS)
+    assert chatgpt_responses.repair_line("the com pan ies want in form ation") == "the companies want information"
+
+
+def test_segment_keeps_unknown_tokens_apart(monkeypatch):
+    use_lexicon(monkeypatch, WORDS)
+    assert chatgpt_responses.segment(["foo", "bar", "baz"]) == [(0, 1), (1, 2), (2, 3)]
@@ -0,0 +1,80 @@
+import base64
+import mmap
+import re
+from urllib.parse import quote, unquote_plus
+
+import numpy as np
+
+import decrypt_pdfs
+
+FINANCIAL_REPORT = decrypt_pdfs.DISCOVERIES_DIR / "FinancialReport_original.pdf"
+INVOICE = decrypt_pdfs.DISCOVERIES_DIR / "Invoice_original.pdf"
+
+
+def legacy_decode(capture) -> bytes:
+    # unquote_plus the first file= value, keep the base64 alphabet, b64decode
+    value = re.search(rb"file=([^&\s]+)", capture.read_bytes()).group(1).decode()
+    b = re.sub(rb"[^A-Za-z0-9+/=]", b"", unquote_plus(value).encode())
+    return base64.b64decode(b + b"=" * (-len(b) % 4))
+
+
+def post(body: bytes) -> bytes:
+    return b"POST / HTTP/1.1\r\nContent-type: application/x-www-form-urlencoded\r\n\r\n" + body + b"\r\n"
+
+
+def test_decode_post_matches_legacy_decoder():
+    for capture in sorted(decrypt_pdfs.DISCOVERIES_DIR.glob("pdf*.txt")):
+        assert decrypt_pdfs.decode_post(capture) == legacy_decode(capture)
+
+
+def test_every_field_decoded_across_chunk_boundaries(tmp_path):
+    rng = np.random.default_rng(3)
+    payloads = [rng.bytes(3000), rng.bytes(1001)]
+    bodies = [b"id=7&file=" + quote(base64.b64encode(p)).encode() + b"&x=1" for p in payloads]
+    capture = tmp_path / "capture.txt"
+    capture.write_bytes(post(bodies[0]) + post(bodies[1]))
+
+    fields = decrypt_pdfs.form_fields(capture)
+    assert [f.request for f in fields] == [1, 2]
+    with open(capture, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for field, payload in zip(fields, payloads):
+            for chunk in (1, 2, 3, 5, 64, 1 << 20):  # boundaries inside %XX escapes and base64 quads
+                assert b"".join(decrypt_pdfs.iter_field_bytes(mm, field, chunk)) == payload
+
+
+def test_repeating_xor_key_recovered():
+    plain = FINANCIAL_REPORT.read_bytes()
+    key = bytes(np.random.default_rng(1).integers(0, 256, 17, dtype=np.uint8))
+    found = decrypt_pdfs.repeating_xor_search(decrypt_pdfs.apply_xor(plain, key), key_out=None)
+    assert bytes.fromhex(found) == key
+
+
+def test_repeating_xor_search_rejects_random_data():
+    rng = np.random.default_rng(2)
+    for size in (600, 5000, 100_000):
+        cipher = rng.integers(0, 256, size, dtype=np.uint8).tobytes()
+        assert decrypt_pdfs.repeating_xor_search(cipher, key_out=None) is None
+
+
+def test_keystream_store_round_trip(tmp_path):
+    rng = np.random.default_rng(4)
+    ks = np.frombuffer(rng.bytes(8192), dtype=np.uint8)
+    report = decrypt_pdfs.apply_xor(FINANCIAL_REPORT.read_bytes()[:8192], ks)
+    invoice = decrypt_pdfs.apply_xor(INVOICE.read_bytes()[:8192], ks)
+
+    decrypt_pdfs.store_keystream(report, ks, tmp_path)
+    # any PDF under the same keystream has the same fingerprint
+    assert decrypt_pdfs.load_keystream(invoice, tmp_path) == ks.tobytes()
+    assert decrypt_pdfs.load_keystream(rng.bytes(8192), tmp_path) is None
+
+
+def test_keystream_reuse_between_two_pdfs():
+    rng = np.random.default_rng(5)
+    size = decrypt_pdfs.REUSE_PREFIX
+    report, invoice = FINANCIAL_REPORT.read_bytes()[:size], INVOICE.read_bytes()[:size]
+    ks, other = rng.bytes(size), rng.bytes(size)
+    prefixes = [decrypt_pdfs.apply_xor(report, ks), decrypt_pdfs.apply_xor(invoice, other),
+                decrypt_pdfs.apply_xor(invoice, ks), rng.bytes(size)]
+
+    pairs = decrypt_pdfs.find_keystream_reuse(prefixes)
+    assert [(a, b) for a, b, *_ in pairs] == [(0, 2)]
@@ -0,0 +1,59 @@
+import gzip
+import io
+import struct
+
+import http2_stream as h2
+
+
+def frame(ftype: int, flags: int, stream_id: int, payload: bytes) -> bytes:
+    return struct.pack(">BHBBL", len(payload) >> 16, len(payload) & 0xFFFF, ftype, flags, stream_id) + payload
+
+
+def literal(name: str, value: str) -> bytes:
+    # literal header field with incremental indexing, new name, no Huffman
+    return bytes([0x40, len(name)]) + name.encode() + bytes([len(value)]) + value.encode()
+
+
+def test_decode_int_rfc7541_c1():
+    assert h2.decode_int(bytes([0x0A]), 0, 5) == (10, 1)
+    assert h2.decode_int(bytes([0x1F, 0x9A, 0x0A]), 0, 5) == (1337, 3)
+    assert h2.decode_int(bytes([0x2A]), 0, 8) == (42, 1)
+
+
+def test_hpack_requests_with_huffman_rfc7541_c4():
+    decoder = h2.HpackDecoder()
+    first = decoder.decode(bytes.fromhex("828684418cf1e3c2e5f23a6ba0ab90f4ff"))
+    assert first == [(":method", "GET"), (":scheme", "http"), (":path", "/"), (":authority", "www.example.com")]
+    # the second request refers to :authority through the dynamic table
+    second = decoder.decode(bytes.fromhex("828684be5886a8eb10649cbf"))
+    assert second == first + [("cache-control", "no-cache")]
+    assert decoder.size == 110
+
+
+def test_hpack_evicts_past_the_table_size():
+    decoder = h2.HpackDecoder(max_size=60)
+    decoder.decode(literal("a", "1") + literal("b", "2"))  # 34 bytes each
+    assert list(decoder.dynamic) == [("b", "2")]
+
+
+def test_streams_demultiplexed_across_reads():
+    body = b'data: {"v": "hi"}\n\ndata: [DONE]\n\n'
+    zipped = gzip.compress(body)
+    block = literal(":status", "200") + literal("content-encoding", "gzip")
+    capture = h2.PREFACE + b"".join([
+        frame(h2.SETTINGS, 0, 0, b""),
+        # padded, with priority, and split into a CONTINUATION
+        frame(h2.HEADERS, h2.PADDED | h2.PRIORITY_FLAG, 1, bytes([3]) + bytes(5) + block[:10] + bytes(3)),
+        frame(h2.CONTINUATION, h2.END_HEADERS, 1, block[10:]),
+        frame(h2.HEADERS, h2.END_HEADERS, 3, bytes([0x88])),  # :status 200 from the static table
+        frame(h2.DATA, h2.PADDED, 1, bytes([2]) + zipped[:20] + bytes(2)),
+        frame(h2.DATA, 0, 3, b"partial"),
+        frame(h2.DATA, h2.END_STREAM, 1, zipped[20:]),
+    ])
+
+    streams = list(h2.iter_streams(io.BytesIO(capture), chunk_size=7))
+
+    assert [(s.stream_id, s.complete) for s in streams] == [(1, True), (3, False)]
+    assert streams[0].headers == [(":status", "200"), ("content-encoding", "gzip")]
+    assert h2.decoded_body(streams[0]) == body
+    assert h2.header(streams[1], ":status") == "200" and streams[1].body == b"partial"